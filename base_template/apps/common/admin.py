@@ -1,3 +1,66 @@
+import json
+
+from django.conf import settings
 from django.contrib import admin
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from . import profiling
+from .models import ChangeLog, TableVersion
+
+
+@admin.register(TableVersion)
+class TableVersionAdmin(admin.ModelAdmin):
+    list_display = ('name', 'version', 'updated_at')
+    ordering = ('name',)
+
+
+@admin.register(ChangeLog)
+class ChangeLogAdmin(admin.ModelAdmin):
+    list_display = ('id', 'model', 'object_id', 'action', 'changed_at')
+    list_filter = ('model', 'action')
+    search_fields = ('object_id',)
+    ordering = ('-id',)
+
+
+# ──────────────────────────────────────────────
+# Request profiles (apps.common.profiling) - stored on disk, not in a model
+# ──────────────────────────────────────────────
+def profile_list_view(request):
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Request profiles',
+        'profiles': profiling.list_profiles(),
+        'token': profiling.make_token(request.user),
+        'token_header': profiling.HEADER,
+        'token_param': profiling.QUERY_PARAM,
+        'token_max_age': getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 3600),
+    }
+    return TemplateResponse(request, 'admin/common/profile_list.html', context)
+
+
+def profile_detail_view(request, profile_id):
+    path = profiling.profile_path(profile_id, '.json')
+    if path is None:
+        raise Http404('Profile not found')
+    context = {
+        **admin.site.each_context(request),
+        'title': f'Profile {profile_id}',
+        'profile': json.loads(path.read_text()),
+    }
+    return TemplateResponse(request, 'admin/common/profile_detail.html', context)
+
+
+def profile_download_view(request, profile_id, fmt):
+    path = profiling.profile_path(profile_id, f'.{fmt}') if fmt in ('prof', 'json') else None
+    if path is None:
+        raise Http404('Profile not found')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=path.name)
+
 
-# Register your models here.
+profile_urls = [
+    path('', admin.site.admin_view(profile_list_view), name='profile_list'),
+    path('<str:profile_id>/', admin.site.admin_view(profile_detail_view), name='profile_detail'),
+    path('<str:profile_id>.<str:fmt>', admin.site.admin_view(profile_download_view), name='profile_download'),
+]
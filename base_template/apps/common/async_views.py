@@ -0,0 +1,55 @@
+"""
+Async APIViews for the read-hot endpoints.
+
+DRF's APIView only runs synchronous handlers. AsyncAPIView lets them be
+coroutines (``async def get``) so that under ASGI (core.asgi, uvicorn
+workers) a request waiting on the database does not hold a worker thread.
+
+Authentication, permission and throttle checks, and ``initial()``
+overrides such as TableVersionETagMixin, stay synchronous. They run
+together in a single sync_to_async hop before the handler. Handlers must
+use the async ORM (``aget``, ``acount``, ``async for``) or wrap sync
+helpers in sync_to_async; a lazy query in a serializer raises
+SynchronousOnlyOperation, so prefetch everything it reads.
+
+Under WSGI the views still work: Django runs them through async_to_sync.
+"""
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """
+    Usage:
+        class ProfileView(AsyncAPIView):
+            async def get(self, request):
+                user = await User.objects.aget(pk=request.user.pk)
+                return Response(UserSerializer(user).data)
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            # OPTIONS (metadata) stays synchronous and needs no database
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = await sync_to_async(self.handle_exception)(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
@@ -0,0 +1,26 @@
+import hmac
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+METRICS_SCRAPER = 'metrics-scraper'
+
+
+class MetricsTokenAuthentication(BaseAuthentication):
+    """
+    ``Authorization: Bearer <settings.METRICS_TOKEN>`` for scrapers (Prometheus
+    cannot refresh JWTs). Any other header falls through to JWTAuthentication.
+    """
+
+    def authenticate(self, request):
+        token = getattr(settings, 'METRICS_TOKEN', '')
+        if not token:
+            return None
+        parts = get_authorization_header(request).split()
+        if len(parts) == 2 and parts[0].lower() == b'bearer' and hmac.compare_digest(parts[1], token.encode()):
+            return AnonymousUser(), METRICS_SCRAPER
+        return None
+
+    def authenticate_header(self, request):
+        return 'Bearer realm="api"'
@@ -0,0 +1,41 @@
+"""
+Change-log recording for the mobile delta sync (GET /api/sync/).
+
+Entries are written inside the caller's transaction, so a rolled-back
+change never reaches the feed. Bulk queryset operations bypass signals
+and should call record_changes() themselves.
+
+The entry id is the sync cursor, so ids must become visible in order: a
+client that was handed cursor N must never see an id below N commit
+later. SQLite serializes write transactions, which gives that for free.
+On PostgreSQL writers take a transaction-level advisory lock before
+inserting, so transactions that log changes commit their ids one after
+the other (the lock is held until commit or rollback).
+"""
+from django.db import connections, router, transaction
+
+from .models import ChangeLog
+
+# pg_advisory_xact_lock key reserved for change-log writers
+CHANGE_LOG_LOCK_KEY = 0x6368676C
+
+
+def record_changes(model, object_ids, action=ChangeLog.UPSERT):
+    """Append one entry per id for ``model`` (a model class)."""
+    entries = [
+        ChangeLog(model=model._meta.db_table, object_id=pk, action=action)
+        for pk in object_ids
+    ]
+    if not entries:
+        return
+    using = router.db_for_write(ChangeLog)
+    with transaction.atomic(using=using, savepoint=False):
+        if connections[using].vendor == 'postgresql':
+            with connections[using].cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_xact_lock(%s)', [CHANGE_LOG_LOCK_KEY])
+        ChangeLog.objects.using(using).bulk_create(entries, batch_size=1000)
+
+
+def oldest_cursor(using=None):
+    """Id of the oldest entry left by prune_change_log, or None for an empty log."""
+    return ChangeLog.objects.using(using).order_by('id').values_list('id', flat=True).first()
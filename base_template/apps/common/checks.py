@@ -0,0 +1,76 @@
+"""
+System checks for settings the caching layers depend on.
+
+Fragment invalidation (apps.common.signals) deletes keys in the cache it
+runs against. With a per-process backend the other workers keep serving
+the stale fragments until they expire, so a deployment with several
+workers needs a shared backend (CACHE_URL). A single worker is served
+correctly by the per-process cache, so this is a deploy warning: the
+release phase (check --deploy --fail-level ERROR) does not fail on it.
+
+The read-your-writes pin of the replica router (apps.common.db_router)
+lives in the default cache too. A pin only the writing worker can see
+sends the client's next read to a replica that may not have its write
+yet, so configured replicas always require a shared default cache.
+
+single_flight() coordinates processes through a lease in the default
+cache; on a per-process cache it only coalesces the threads of one worker,
+which costs duplicate work but serves correct payloads, so deployments get
+the same warning for the default cache.
+"""
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+PROCESS_LOCAL_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+SHARED_CACHE_HINT = (
+    'Set CACHE_URL (e.g. redis://host:6379/0). A deployment that runs a single worker '
+    'process may silence this check in SILENCED_SYSTEM_CHECKS.'
+)
+
+
+def is_process_local(alias):
+    return settings.CACHES.get(alias, {}).get('BACKEND') in PROCESS_LOCAL_BACKENDS
+
+
+@register(Tags.caches, deploy=True)
+def check_fragment_cache_shared(app_configs, **kwargs):
+    from .fragment_cache import FRAGMENT_CACHE_ALIAS
+
+    if not is_process_local(FRAGMENT_CACHE_ALIAS):
+        return []
+    return [Warning(
+        f'The "{FRAGMENT_CACHE_ALIAS}" cache is local to each process, so invalidated '
+        'fragments stay cached in the other workers.',
+        hint=SHARED_CACHE_HINT,
+        id='common.W001',
+    )]
+
+
+@register(Tags.caches, deploy=True)
+def check_default_cache_shared(app_configs, **kwargs):
+    if not is_process_local('default'):
+        return []
+    return [Warning(
+        'The "default" cache is local to each process, so single-flight leases only '
+        'coalesce the threads of one worker and every worker recomputes missed payloads.',
+        hint=SHARED_CACHE_HINT,
+        id='common.W002',
+    )]
+
+
+@register(Tags.caches, Tags.database)
+def check_replica_pin_cache_shared(app_configs, **kwargs):
+    from .db_router import replica_aliases
+
+    if not replica_aliases() or not is_process_local('default'):
+        return []
+    return [Error(
+        'Read replicas are configured but the "default" cache is local to each process, '
+        'so a client pinned to the primary after a write is only pinned on one worker.',
+        hint=SHARED_CACHE_HINT,
+        id='common.E002',
+    )]
@@ -0,0 +1,212 @@
+"""
+Read-replica routing.
+
+Replicas are the ``replica_N`` aliases built from DATABASE_REPLICA_URLS in
+settings. ReplicaMiddleware picks the database reads go to for each
+request and ReplicaRouter applies it; writes always go to ``default``.
+
+- Safe requests (GET, HEAD, OPTIONS) read from a random healthy replica.
+- Anything else reads from the primary, and so does the rest of a request
+  once it has written. Reads inside a transaction on the primary stay on it
+  too, so they see the transaction's own state.
+- A client that wrote is pinned to the primary for REPLICA_PIN_SECONDS so it
+  reads its own changes. Clients are told apart by their Authorization
+  header (or session cookie); the pin lives in the default cache, which must
+  be shared between workers for the pin to follow the client across them.
+  A system check (common.E002) fails while replicas are configured on a
+  per-process cache.
+- A replica more than REPLICA_MAX_LAG_SECONDS behind, or unreachable, is
+  skipped; with no healthy replica reads fall back to the primary.
+
+Lag is measured without database-specific functions, so it works the same
+on PostgreSQL and on two SQLite files: every REPLICA_LAG_CHECK_SECONDS a
+worker reads a monotonic change marker (newest change-log id plus the sum
+of all table versions) from the primary and from each replica. A replica's
+lag is the time since this worker first saw the primary at a marker the
+replica has not reached yet.
+
+Outside ReplicaMiddleware (management commands, shells, Celery-style
+jobs) every read goes to the primary.
+"""
+import hashlib
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Max, Sum
+
+from . import metrics
+from .models import ChangeLog, TableVersion
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_read_alias = ContextVar('read_alias', default=None)
+_wrote = ContextVar('wrote', default=False)
+
+
+def replica_aliases():
+    """Configured replicas, except those mirroring the primary (tests, benchmark)."""
+    primary = connections[DEFAULT_DB_ALIAS].settings_dict
+    return [
+        alias for alias in settings.DATABASES
+        if alias.startswith('replica_') and connections[alias].settings_dict is not primary
+    ]
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias not in (None, DEFAULT_DB_ALIAS) and connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        if _read_alias.get() not in (None, DEFAULT_DB_ALIAS):
+            _read_alias.set(DEFAULT_DB_ALIAS)  # read your own writes for the rest of the request
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # every alias holds the same data
+
+    def allow_migrate(self, db, app_label, **hints):
+        return False if db.startswith('replica_') else None
+
+
+class ReplicaMiddleware:
+    # Async requests keep the routing: sync_to_async copies the context
+    # variables into the ORM's thread and copies them back afterwards
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not replica_aliases():
+            return self.get_response(request)
+
+        alias_token, wrote_token = self._route(request)
+        try:
+            response = self.get_response(request)
+            if _wrote.get():
+                self._pin(request)
+        finally:
+            _read_alias.reset(alias_token)
+            _wrote.reset(wrote_token)
+        return response
+
+    async def __acall__(self, request):
+        if not replica_aliases():
+            return await self.get_response(request)
+
+        # Lag checks query the databases: one thread hop before the view
+        alias, reason = await sync_to_async(self._read_alias)(request)
+        alias_token, wrote_token = self._route(request, alias, reason)
+        try:
+            response = await self.get_response(request)
+            if _wrote.get():
+                await sync_to_async(self._pin)(request)
+        finally:
+            _read_alias.reset(alias_token)
+            _wrote.reset(wrote_token)
+        return response
+
+    def _route(self, request, alias=None, reason=None):
+        if alias is None:
+            alias, reason = self._read_alias(request)
+        metrics.db_read_routing.inc((('database', alias), ('reason', reason)))
+        return _read_alias.set(alias), _wrote.set(False)
+
+    def _pin(self, request):
+        key = _pin_key(request)
+        if key:
+            cache.set(key, True, self.pin_seconds)
+
+    def _read_alias(self, request):
+        if request.method not in SAFE_METHODS:
+            return DEFAULT_DB_ALIAS, 'write'
+        key = _pin_key(request)
+        if key and cache.get(key):
+            return DEFAULT_DB_ALIAS, 'pinned'
+        healthy = [alias for alias in replica_aliases() if monitor.is_healthy(alias)]
+        if not healthy:
+            return DEFAULT_DB_ALIAS, 'lagging'
+        return random.choice(healthy), 'replica'
+
+
+def _pin_key(request):
+    credential = request.headers.get('Authorization') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not credential:
+        return None
+    return 'replica-pin:' + hashlib.sha1(credential.encode()).hexdigest()
+
+
+class ReplicationMonitor:
+    """Per-worker replica lag, measured at most every REPLICA_LAG_CHECK_SECONDS."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._primary_markers = deque(maxlen=1000)  # (marker, first seen) in marker order
+        self._lag = {}                               # alias → (lag seconds, checked at)
+
+    def is_healthy(self, alias):
+        return self.lag(alias) <= getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 5)
+
+    def lag(self, alias):
+        interval = getattr(settings, 'REPLICA_LAG_CHECK_SECONDS', 1)
+        lag, checked_at = self._lag.get(alias, (None, 0))
+        if lag is not None and time.monotonic() - checked_at < interval:
+            return lag
+        with self._lock:
+            lag, checked_at = self._lag.get(alias, (None, 0))
+            if lag is None or time.monotonic() - checked_at >= interval:
+                lag = self._measure(alias)
+                self._lag[alias] = (lag, time.monotonic())
+        return lag
+
+    def _measure(self, alias):
+        now = time.monotonic()
+        try:
+            primary = _change_marker(DEFAULT_DB_ALIAS)
+            replica = _change_marker(alias)
+        except DatabaseError:
+            connections[alias].close()
+            return float('inf')
+        if not self._primary_markers or primary > self._primary_markers[-1][0]:
+            self._primary_markers.append((primary, now))
+        behind = [seen for marker, seen in self._primary_markers if marker > replica]
+        return now - behind[0] if behind else 0.0
+
+
+def _change_marker(alias):
+    """A number that grows with every tracked write (see module docstring)."""
+    newest = ChangeLog.objects.using(alias).aggregate(newest=Max('id'))['newest'] or 0
+    versions = TableVersion.objects.using(alias).aggregate(total=Sum('version'))['total'] or 0
+    return newest + versions
+
+
+def mirror_replicas(using=DEFAULT_DB_ALIAS):
+    """
+    Point every replica alias at ``using``, for commands that create a test
+    database themselves (benchmark, loadtest) - like TEST['MIRROR'] does for
+    the test runner. Mirrored replicas are no longer routed to.
+    """
+    for alias in replica_aliases():
+        connections[alias].close()
+        connections.settings[alias] = connections[using].settings_dict
+        connections[alias].settings_dict = connections[using].settings_dict
+
+
+monitor = ReplicationMonitor()
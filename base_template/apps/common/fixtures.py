@@ -0,0 +1,163 @@
+"""
+Streaming helpers for Django JSON fixtures (the data.json format).
+
+Used by the fast_loaddata / fast_dumpdata management commands. Fixtures
+are read and written one object at a time, so memory stays flat no matter
+how large the file is.
+"""
+import codecs
+import gzip
+import io
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils.encoding import is_protected_type
+
+
+READ_CHUNK_CHARS = 1 << 20
+
+# Longest BOMs first: the UTF-32 LE BOM starts with the UTF-16 LE one
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+def detect_encoding(head):
+    """
+    Encoding of a JSON document from its first bytes: a BOM if there is
+    one, otherwise the NUL pattern of the leading ASCII character.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    if len(head) >= 2:
+        if head[0] and not head[1]:
+            return 'utf-16-le'
+        if not head[0] and head[1]:
+            return 'utf-16-be'
+    return 'utf-8'
+
+
+def open_fixture(path):
+    """Open a (optionally gzipped) fixture as text, detecting its encoding."""
+    raw = open(path, 'rb')
+    if raw.peek(2)[:2] == b'\x1f\x8b':
+        raw = io.BufferedReader(gzip.GzipFile(fileobj=raw))
+    return io.TextIOWrapper(raw, encoding=detect_encoding(raw.peek(4)[:4]))
+
+
+def iter_fixture_objects(stream, chunk_chars=READ_CHUNK_CHARS):
+    """
+    Yield the elements of a top-level JSON array one by one.
+
+    The text is read in chunks and each element is parsed with
+    JSONDecoder.raw_decode; an element cut by a chunk boundary fails to
+    parse and is retried once more text has been read.
+    """
+    decoder = json.JSONDecoder()
+    buf = stream.read(chunk_chars).lstrip()
+    if not buf.startswith('['):
+        raise ValueError('Fixture must be a JSON array')
+    pos = 1
+    eof = False
+
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n,':
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError('Unexpected end of fixture')
+            buf, pos = stream.read(chunk_chars), 0
+            eof = not buf
+            continue
+        if buf[pos] == ']':
+            return
+
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            more = stream.read(chunk_chars)
+            if not more:
+                raise
+            buf, pos = buf[pos:] + more, 0
+            continue
+        yield obj
+        pos = end
+        if pos > chunk_chars:
+            buf, pos = buf[pos:], 0
+
+
+# ──────────────────────────────────────────────
+# DUMP
+# ──────────────────────────────────────────────
+
+def _field_value(obj, field):
+    # Same rules as django.core.serializers.python.Serializer
+    value = field.value_from_object(obj)
+    return value if is_protected_type(value) else field.value_to_string(obj)
+
+
+def iter_model_rows(model, queryset, chunk_size=2000):
+    """
+    Yield {"model", "pk", "fields"} dicts for ``queryset``, matching
+    dumpdata output. Auto-created M2M fields are read per chunk from the
+    through table instead of one query per object.
+    """
+    opts = model._meta
+    local_fields = [
+        f for f in opts.local_fields
+        if f.serialize and not f.primary_key
+    ]
+    m2m_fields = [
+        f for f in opts.local_many_to_many
+        if f.serialize and f.remote_field.through._meta.auto_created
+    ]
+
+    chunk = []
+    for obj in queryset.order_by('pk').iterator(chunk_size=chunk_size):
+        chunk.append(obj)
+        if len(chunk) >= chunk_size:
+            yield from _chunk_rows(opts, chunk, local_fields, m2m_fields)
+            chunk = []
+    if chunk:
+        yield from _chunk_rows(opts, chunk, local_fields, m2m_fields)
+
+
+def _chunk_rows(opts, objs, local_fields, m2m_fields):
+    m2m_values = {}
+    pks = [obj.pk for obj in objs]
+    for field in m2m_fields:
+        through = field.remote_field.through
+        source = through._meta.get_field(field.m2m_field_name()).attname
+        target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+        values = {}
+        for source_id, target_id in (
+            through._base_manager.using(objs[0]._state.db)
+            .filter(**{f'{source}__in': pks})
+            .order_by(source, target)
+            .values_list(source, target)
+        ):
+            values.setdefault(source_id, []).append(target_id)
+        m2m_values[field.name] = values
+
+    for obj in objs:
+        fields = {field.name: _field_value(obj, field) for field in local_fields}
+        for field in m2m_fields:
+            fields[field.name] = m2m_values[field.name].get(obj.pk, [])
+        yield {'model': opts.label_lower, 'pk': _field_value(obj, opts.pk), 'fields': fields}
+
+
+def write_fixture(stream, rows, indent=None):
+    """Write ``rows`` as a JSON array in the layout dumpdata produces."""
+    count = 0
+    stream.write('[')
+    for row in rows:
+        stream.write(',\n' if count else '\n')
+        stream.write(json.dumps(row, cls=DjangoJSONEncoder, indent=indent, ensure_ascii=False))
+        count += 1
+    stream.write('\n]\n')
+    return count
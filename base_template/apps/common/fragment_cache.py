@@ -0,0 +1,73 @@
+"""
+Per-object serialized fragment cache.
+
+Each object's serialized dict is stored under
+(model, serializer variant, pk, updated_at). Editing a row changes its
+updated_at, so the old fragment simply stops being looked up and ages out
+of the LRU. Objects whose output also depends on related rows (a user's
+roles, a module's children) are invalidated explicitly from
+apps.common.signals.
+"""
+from django.conf import settings
+from django.core.cache import caches
+
+
+FRAGMENT_CACHE_ALIAS = getattr(settings, 'FRAGMENT_CACHE_ALIAS', 'fragments')
+
+
+class FragmentCache:
+    """
+    Serializes a queryset, assembling the list from cached per-object fragments.
+
+    Usage:
+        user_fragments = FragmentCache(UserSerializer, variant='list')
+        data = user_fragments.serialize_list(User.objects.select_related('department'))
+    """
+
+    def __init__(self, serializer_class, variant='default'):
+        self.serializer_class = serializer_class
+        self.model = serializer_class.Meta.model
+        self.variant = variant
+
+    @property
+    def cache(self):
+        return caches[FRAGMENT_CACHE_ALIAS]
+
+    def key(self, pk, updated_at):
+        stamp = int(updated_at.timestamp() * 1_000_000) if updated_at else 0
+        return f'frag:{self.model._meta.label_lower}:{self.variant}:{pk}:{stamp}'
+
+    def serialize_list(self, queryset, context=None):
+        """
+        Only (pk, updated_at) is read for the whole list. Rows that miss the
+        cache are fetched with the full queryset (joins, prefetches) in a
+        single batch, serialized and written back with set_many.
+        """
+        stamps = list(queryset.values_list('pk', 'updated_at'))
+        keys = [self.key(pk, updated_at) for pk, updated_at in stamps]
+        cached = self.cache.get_many(keys)
+
+        fragments = {}
+        missing = []
+        for (pk, _), key in zip(stamps, keys):
+            if key in cached:
+                fragments[pk] = cached[key]
+            else:
+                missing.append(pk)
+
+        if missing:
+            objects = list(queryset.filter(pk__in=missing))
+            data = self.serializer_class(objects, many=True, context=context).data
+            fresh = {}
+            for obj, item in zip(objects, data):
+                fragments[obj.pk] = item
+                fresh[self.key(obj.pk, obj.updated_at)] = item
+            self.cache.set_many(fresh)
+
+        return [fragments[pk] for pk, _ in stamps if pk in fragments]
+
+    def invalidate(self, queryset):
+        """Drop the cached fragments of every object in ``queryset``."""
+        keys = [self.key(pk, updated_at) for pk, updated_at in queryset.values_list('pk', 'updated_at')]
+        if keys:
+            self.cache.delete_many(keys)
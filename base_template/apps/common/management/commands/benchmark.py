@@ -0,0 +1,367 @@
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import time
+from io import StringIO
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.common.db_router import mirror_replicas
+from apps.departments.models import Department
+from apps.modules.models import Module
+from apps.modules.snapshot import reset_catalog
+from apps.roles.models import Role
+
+User = get_user_model()
+
+
+# ═══════════════════════════════════════════════════════════════
+#  DATASET SIZES
+#  Passed to `seed_data --scale` on a throwaway test database.
+# ═══════════════════════════════════════════════════════════════
+
+DATASET_SIZES = {
+    'small':  {'users': 1000,   'modules': 100,  'roles': 20},
+    'medium': {'users': 10000,  'modules': 500,  'roles': 100},
+    'large':  {'users': 100000, 'modules': 2000, 'roles': 300},
+}
+
+
+# ═══════════════════════════════════════════════════════════════
+#  ENDPOINTS
+#  Every route in core/urls.py. `budget` is the maximum number of SQL
+#  queries per request, at any dataset size and with cold or warm caches;
+#  None means "measured but not budgeted": module-detail and module-tree
+#  (cold fragment cache) still issue queries per module. Cold runs also
+#  start without the catalog snapshot (apps.modules.snapshot). Writes run
+#  inside a rolled-back transaction so every iteration sees the same
+#  dataset. Path/data placeholders come from Command._context().
+# ═══════════════════════════════════════════════════════════════
+
+ENDPOINTS = [
+    # Auth
+    {'name': 'login',              'method': 'post', 'path': '/api/users/login/',         'user': None,         'budget': 2,
+     'data': {'username': 'superadmin', 'password': 'Test@1234'}},
+    {'name': 'token-refresh',      'method': 'post', 'path': '/api/users/token/refresh/', 'user': None,         'budget': 9,
+     'data': {'refresh': '{refresh_token}'}},
+    {'name': 'signup',             'method': 'post', 'path': '/api/users/signup/',        'user': None,         'budget': 12, 'status': 201,
+     'data': {'username': 'bench_signup', 'email': 'bench_signup@example.com', 'password': 'Bench@12345',
+              'password_confirm': 'Bench@12345', 'first_name': 'Bench', 'last_name': 'Signup'}},
+    {'name': 'register',           'method': 'post', 'path': '/api/users/register/',      'user': 'superadmin', 'budget': 13, 'status': 201,
+     'data': {'username': 'bench_register', 'email': 'bench_register@example.com', 'password': 'Bench@12345',
+              'role_ids': ['{role_id}'], 'department_id': '{department_id}'}},
+    {'name': 'profile',            'method': 'get',  'path': '/api/users/profile/',       'user': '{menu_user}', 'budget': 4},
+    {'name': 'logout',             'method': 'post', 'path': '/api/users/logout/',        'user': 'superadmin', 'budget': 5,
+     'data': {'refresh': '{refresh_token}'}},
+
+    # Users
+    {'name': 'user-list',          'method': 'get',  'path': '/api/users/',               'user': 'superadmin', 'budget': 4},
+    {'name': 'user-detail',        'method': 'get',  'path': '/api/users/{user_id}/',     'user': 'superadmin', 'budget': 3},
+    {'name': 'user-update',        'method': 'put',  'path': '/api/users/{user_id}/',     'user': 'superadmin', 'budget': 5,
+     'data': {'first_name': 'Benchmarked'}},
+
+    # Roles
+    {'name': 'role-list',          'method': 'get',  'path': '/api/roles/',               'user': 'superadmin', 'budget': 3},
+    {'name': 'role-detail',        'method': 'get',  'path': '/api/roles/{role_id}/',     'user': 'superadmin', 'budget': 1},
+    {'name': 'role-permissions',   'method': 'get',  'path': '/api/roles/{role_id}/permissions/', 'user': 'superadmin', 'budget': 5},
+    {'name': 'role-permissions-save', 'method': 'post', 'path': '/api/roles/{role_id}/permissions/', 'user': 'superadmin', 'budget': 6,
+     'data': {'permissions': [{'module_id': '{module_id}', 'granted': ['view', 'edit']}]}},
+
+    # Departments
+    {'name': 'department-list',    'method': 'get',  'path': '/api/departments/',         'user': 'superadmin', 'budget': 3},
+    {'name': 'department-detail',  'method': 'get',  'path': '/api/departments/{department_id}/', 'user': 'superadmin', 'budget': 1},
+
+    # Modules
+    {'name': 'module-tree',        'method': 'get',  'path': '/api/modules/',             'user': 'superadmin', 'budget': None},
+    {'name': 'module-children',    'method': 'get',  'path': '/api/modules/?parent={module_id}', 'user': 'superadmin', 'budget': 3},
+    {'name': 'module-search',      'method': 'get',  'path': '/api/modules/?search=report', 'user': 'superadmin', 'budget': 3},
+    {'name': 'module-detail',      'method': 'get',  'path': '/api/modules/{module_id}/', 'user': 'superadmin', 'budget': None},
+    {'name': 'my-menu',            'method': 'get',  'path': '/api/modules/my-menu/',     'user': '{menu_user}', 'budget': 6},
+    {'name': 'my-menu-mobile',     'method': 'get',  'path': '/api/modules/my-menu/?platform=mobile', 'user': '{menu_user}', 'budget': 6},
+    {'name': 'all-with-permissions', 'method': 'get', 'path': '/api/modules/all-with-permissions/', 'user': 'superadmin', 'budget': 3},
+    {'name': 'module-permissions', 'method': 'get',  'path': '/api/modules/{module_id}/permissions/', 'user': 'superadmin', 'budget': 2},
+    {'name': 'module-with-permissions', 'method': 'get', 'path': '/api/modules/{module_id}/with-permissions/', 'user': 'superadmin', 'budget': 2},
+    {'name': 'module-reorder',     'method': 'post', 'path': '/api/modules/reorder/',     'user': 'superadmin', 'budget': 2,
+     'data': {'parent': None, 'ids': '{root_module_ids}'}},
+    {'name': 'permission-catalog', 'method': 'get',  'path': '/api/modules/catalog/',     'user': 'superadmin', 'budget': 2},
+
+    # Permissions
+    {'name': 'permission-check',   'method': 'get',  'path': '/api/permissions/check/?path=/users/1/edit&perm=view', 'user': '{menu_user}', 'budget': 5},
+
+    # Dashboard
+    {'name': 'dashboard-stats',    'method': 'get',  'path': '/api/dashboard/stats/',     'user': 'superadmin', 'budget': 11},
+
+    # Common
+    {'name': 'bootstrap',          'method': 'get',  'path': '/api/bootstrap/',           'user': '{menu_user}', 'budget': 8},
+    {'name': 'batch',              'method': 'post', 'path': '/api/batch/',               'user': '{menu_user}', 'budget': 12,
+     'data': {'requests': ['/api/users/profile/', '/api/modules/my-menu/', '/api/departments/']}},
+    {'name': 'sync-full',          'method': 'get',  'path': '/api/sync/',                'user': '{menu_user}', 'budget': 10},
+    {'name': 'schema',             'method': 'get',  'path': '/api/schema/',              'user': None,         'budget': 0},
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark every API endpoint on a throwaway test database.\n\n'
+        'Usage:\n'
+        '  python manage.py benchmark                                 → small dataset, all endpoints\n'
+        '  python manage.py benchmark --sizes small medium            → several dataset sizes\n'
+        '  python manage.py benchmark --only my-menu user-list        → selected endpoints\n'
+        '  python manage.py benchmark -o after.json --compare before.json\n\n'
+        'Reports p50/p95/p99 latency and SQL query counts, and exits non-zero\n'
+        'when an endpoint exceeds its query budget or returns an unexpected status.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', choices=DATASET_SIZES, default=['small'], help='Dataset sizes to run.')
+        parser.add_argument('--only', nargs='+', metavar='ENDPOINT', help='Endpoint names to run (default: all).')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per endpoint.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic dataset.')
+        parser.add_argument('-o', '--output', help='Write results as JSON to this file.')
+        parser.add_argument('--compare', help='Baseline results JSON to compare against.')
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            help='With --compare: fail when an endpoint p50 is this many percent slower than the baseline.',
+        )
+
+    def handle(self, *args, **options):
+        endpoints = ENDPOINTS
+        if options['only']:
+            unknown = set(options['only']) - {e['name'] for e in ENDPOINTS}
+            if unknown:
+                raise CommandError(f'Unknown endpoints: {", ".join(sorted(unknown))}')
+            endpoints = [e for e in ENDPOINTS if e['name'] in options['only']]
+
+        report = {
+            'meta': {
+                'commit': _git_commit(),
+                'timestamp': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'iterations': options['iterations'],
+                'seed': options['seed'],
+            },
+            'results': {},
+        }
+
+        setup_test_environment(debug=False)
+        # Query counts are reported below; per-request N+1 warnings would only repeat them
+        logging.getLogger('apps.common.n_plus_one').disabled = True
+        try:
+            for size in options['sizes']:
+                report['results'][size] = self._run_size(size, endpoints, options)
+        finally:
+            teardown_test_environment()
+
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'\n💾 Results written to {options["output"]}'))
+
+        failures = self._failures(report)
+        if options['compare']:
+            failures += self._compare(report, options['compare'], options['max_regression'])
+        if failures:
+            raise CommandError('Benchmark failed:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('\n✅ All endpoints within budget.'))
+
+    # ──────────────────────────────────────────────
+    # RUN
+    # ──────────────────────────────────────────────
+    def _run_size(self, size, endpoints, options):
+        dataset = DATASET_SIZES[size]
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\n📊 Dataset "{size}": {dataset["users"]} users, {dataset["modules"]} modules, {dataset["roles"]} roles'
+        ))
+
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        mirror_replicas()
+        try:
+            start = time.perf_counter()
+            call_command('seed_data', scale=True, seed=options['seed'], stdout=StringIO(), **dataset)
+            self.stdout.write(f'  Seeded in {time.perf_counter() - start:.1f}s\n')
+
+            ctx = self._context()
+            self.stdout.write(
+                f'  {"endpoint":<26} {"status":>6} {"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} '
+                f'{"queries":>8} {"budget":>7} {"KB":>9}'
+            )
+            results = {}
+            for endpoint in endpoints:
+                result = self._run_endpoint(endpoint, ctx, options['iterations'])
+                results[endpoint['name']] = result
+                self._print_result(endpoint['name'], result)
+            return results
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _context(self):
+        """Ids and tokens the endpoint placeholders refer to."""
+        superadmin = User.objects.get(username='superadmin')
+        root_module = (
+            Module.objects.filter(parent=None, children__isnull=False).order_by('-pk').first()
+            or Module.objects.order_by('pk').first()
+        )
+        return {
+            'menu_user': 'manager_combo',
+            'user_id': User.objects.filter(employee_id__startswith='SYN').order_by('pk').values_list('pk', flat=True).first(),
+            'role_id': Role.objects.get(name='Super Admin', department=None).pk,
+            'department_id': Department.objects.order_by('pk').values_list('pk', flat=True).first(),
+            'module_id': root_module.pk,
+            'root_module_ids': list(Module.objects.filter(parent=None).order_by('order', 'pk').values_list('pk', flat=True)),
+            'refresh_token': str(RefreshToken.for_user(superadmin)),
+        }
+
+    def _run_endpoint(self, endpoint, ctx, iterations):
+        client = APIClient()
+        if endpoint['user']:
+            client.force_authenticate(User.objects.get(username=_fill(endpoint['user'], ctx)))
+        request = getattr(client, endpoint['method'])
+        path = _fill(endpoint['path'], ctx)
+        data = _fill(endpoint.get('data'), ctx)
+        expected = endpoint.get('status', 200)
+        is_write = endpoint['method'] != 'get'
+
+        for cache in caches.all():
+            cache.clear()
+        reset_catalog()
+
+        timings, queries, statuses, size = [], [], set(), 0
+        for _ in range(iterations + 1):  # the first request runs on cold caches
+            with transaction.atomic():
+                with CaptureQueriesContext(connection) as captured:
+                    start = time.perf_counter()
+                    response = request(path, data, format='json') if is_write else request(path)
+                    elapsed = time.perf_counter() - start
+                if is_write:
+                    transaction.set_rollback(True)
+            timings.append(elapsed * 1000)
+            # BEGIN/SAVEPOINT bookkeeping, the change-log lock and slow-query-log EXPLAINs are not
+            # queries the endpoint issued; budgets are the same on every backend
+            queries.append(sum(1 for q in captured.captured_queries if not _is_bookkeeping(q['sql'])))
+            statuses.add(response.status_code)
+            size = len(response.content)
+
+        warm = sorted(timings[1:])
+        return {
+            'status': sorted(statuses),
+            'expected_status': expected,
+            'cold_ms': round(timings[0], 3),
+            'p50_ms': round(_percentile(warm, 50), 3),
+            'p95_ms': round(_percentile(warm, 95), 3),
+            'p99_ms': round(_percentile(warm, 99), 3),
+            'mean_ms': round(statistics.fmean(warm), 3),
+            'queries_cold': queries[0],
+            'queries_warm': max(queries[1:]),
+            'budget': endpoint['budget'],
+            'response_bytes': size,
+        }
+
+    # ──────────────────────────────────────────────
+    # REPORT
+    # ──────────────────────────────────────────────
+    def _print_result(self, name, result):
+        queries = max(result['queries_cold'], result['queries_warm'])
+        budget = '-' if result['budget'] is None else result['budget']
+        line = (
+            f'  {name:<26} {",".join(map(str, result["status"])):>6} {result["p50_ms"]:>9.2f} '
+            f'{result["p95_ms"]:>9.2f} {result["p99_ms"]:>9.2f} {queries:>8} {budget:>7} '
+            f'{result["response_bytes"] / 1024:>9.1f}'
+        )
+        if result['status'] != [result['expected_status']] or (result['budget'] is not None and queries > result['budget']):
+            self.stdout.write(self.style.ERROR(line))
+        else:
+            self.stdout.write(line)
+
+    def _failures(self, report):
+        failures = []
+        for size, results in report['results'].items():
+            for name, result in results.items():
+                queries = max(result['queries_cold'], result['queries_warm'])
+                if result['budget'] is not None and queries > result['budget']:
+                    failures.append(f'[{size}] {name}: {queries} queries > budget {result["budget"]}')
+                if result['status'] != [result['expected_status']]:
+                    failures.append(f'[{size}] {name}: status {result["status"]}, expected {result["expected_status"]}')
+        return failures
+
+    def _compare(self, report, baseline_path, max_regression):
+        try:
+            with open(baseline_path) as fh:
+                baseline = json.load(fh)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Could not read baseline: {exc}')
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\n🔍 Compared with {baseline_path} (commit {baseline["meta"].get("commit") or "?"}):'
+        ))
+        failures = []
+        for size, results in report['results'].items():
+            for name, result in results.items():
+                before = baseline['results'].get(size, {}).get(name)
+                if not before:
+                    continue
+                change = (result['p50_ms'] - before['p50_ms']) / before['p50_ms'] * 100 if before['p50_ms'] else 0.0
+                queries_before = max(before['queries_cold'], before['queries_warm'])
+                queries_now = max(result['queries_cold'], result['queries_warm'])
+                line = (
+                    f'  [{size}] {name:<26} p50 {before["p50_ms"]:>8.2f} → {result["p50_ms"]:>8.2f} ms '
+                    f'({change:+6.1f}%)  queries {queries_before:>4} → {queries_now:<4}'
+                )
+                regressed = max_regression is not None and change > max_regression
+                if regressed or queries_now > queries_before:
+                    self.stdout.write(self.style.WARNING(line))
+                else:
+                    self.stdout.write(line)
+                if regressed:
+                    failures.append(f'[{size}] {name}: p50 {change:+.1f}% vs baseline (max {max_regression}%)')
+        return failures
+
+
+def _fill(value, ctx):
+    """Substitute {placeholders}; a string that is exactly one placeholder keeps the value's type."""
+    if isinstance(value, str):
+        key = value[1:-1]
+        if value.startswith('{') and value.endswith('}') and key in ctx:
+            return ctx[key]
+        return value.format(**ctx)
+    if isinstance(value, list):
+        return [_fill(item, ctx) for item in value]
+    if isinstance(value, dict):
+        return {key: _fill(item, ctx) for key, item in value.items()}
+    return value
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _is_bookkeeping(sql):
+    if sql.startswith('SELECT pg_advisory_xact_lock('):
+        return True  # change-log ordering lock, PostgreSQL only (apps.common.changelog)
+    return sql.split(None, 1)[0].upper() in ('BEGIN', 'SAVEPOINT', 'RELEASE', 'ROLLBACK', 'COMMIT', 'EXPLAIN')
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
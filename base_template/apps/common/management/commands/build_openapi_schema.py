@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.common.schema import artifact_path, generate_schema, read_artifact, write_artifact
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate the OpenAPI schema served at /api/schema/ and store it gzipped.\n\n'
+        'Usage:\n'
+        '  python manage.py build_openapi_schema          → Write settings.OPENAPI_SCHEMA_ARTIFACT\n'
+        '  python manage.py build_openapi_schema --check  → Fail if the artifact does not match the code\n'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Compare the artifact with a freshly generated schema instead of writing it.',
+        )
+        parser.add_argument('--output', help='Artifact path (defaults to settings.OPENAPI_SCHEMA_ARTIFACT).')
+
+    def handle(self, *args, **options):
+        path = options['output'] or artifact_path()
+        start = time.perf_counter()
+        content = generate_schema()
+        elapsed = time.perf_counter() - start
+
+        if options['check']:
+            current = read_artifact(path)
+            if current is None:
+                raise CommandError(f'{path} does not exist. Run: python manage.py build_openapi_schema')
+            if current != content:
+                raise CommandError(f'{path} is out of date. Run: python manage.py build_openapi_schema')
+            self.stdout.write(self.style.SUCCESS(f'✅ {path} is up to date.'))
+            return
+
+        write_artifact(content, path)
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ Schema generated in {elapsed:.2f}s → {path} ({len(content) // 1024} KB uncompressed)'
+        ))
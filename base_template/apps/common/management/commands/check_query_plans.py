@@ -0,0 +1,211 @@
+import re
+import time
+from io import StringIO
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Count
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.common.sql import explain
+from apps.dashboard.views import DashboardStatsView
+from apps.modules.menu import get_merged_permissions
+from apps.modules.models import Module, ModulePermission, RoleModulePermission
+from apps.modules.serializers import ModuleSerializer
+from apps.modules.views import ModulePermissionsView
+
+User = get_user_model()
+
+
+# ═══════════════════════════════════════════════════════════════
+#  CHECKS
+#  `run` executes the code behind an endpoint; every statement it sends
+#  that reads `table` (and matches the `match` regex, when set) is
+#  EXPLAINed. The plan must not scan the whole table and, when `index` is
+#  set, must use that index. Modules and their permissions are otherwise
+#  read from the catalog snapshot (apps.modules.snapshot), which loads
+#  both tables whole on purpose.
+# ═══════════════════════════════════════════════════════════════
+
+CHECKS = [
+    {
+        'name': 'menu: role grants',
+        'run': lambda ctx: get_merged_permissions(ctx['menu_roles'], platform='web'),
+        'table': RoleModulePermission._meta.db_table,
+        'index': None,  # unique (role, module)
+    },
+    {
+        'name': 'menu: granted permissions',
+        'run': lambda ctx: get_merged_permissions(ctx['menu_roles'], platform='web'),
+        'table': RoleModulePermission.granted_permissions.through._meta.db_table,
+        # Joined on rolemodulepermission_id, reading modulepermission_id: the
+        # unique (rolemodulepermission, modulepermission) index has exactly
+        # that shape, and the FK index on rolemodulepermission_id serves the
+        # join as well, so either may show up in the plan
+        'index': None,
+    },
+    {
+        # The nested children of GET /api/modules/ and /api/modules/<id>/
+        'name': 'module tree: active children',
+        'run': lambda ctx: ModuleSerializer(ctx['parent']).data,
+        'table': Module._meta.db_table,
+        'index': 'module_active_children_idx',
+    },
+    {
+        'name': 'module permissions',
+        'run': lambda ctx: _get(ModulePermissionsView, ctx, pk=ctx['module_id']),
+        'table': ModulePermission._meta.db_table,
+        'index': 'module_perm_display_idx',
+    },
+    {
+        'name': 'dashboard: recent users',
+        'run': lambda ctx: async_to_sync(DashboardStatsView()._recent_users)(),
+        'table': User._meta.db_table,
+        'index': 'user_date_joined_idx',
+    },
+    {
+        'name': 'dashboard: active/inactive user counts',
+        'run': lambda ctx: async_to_sync(DashboardStatsView().compute)(),
+        'table': User._meta.db_table,
+        'match': r'WHERE .*"is_active"',  # the total count reads the whole table by definition
+        'index': 'user_is_active_idx',
+    },
+]
+
+
+def _get(view_class, ctx, **kwargs):
+    request = APIRequestFactory().get('/')
+    force_authenticate(request, ctx['user'])
+    response = view_class.as_view()(request, **kwargs)
+    assert response.status_code == 200, response.data
+    return response.data
+
+
+FULL_SCAN_PATTERNS = {
+    'sqlite': r'\bSCAN {table}\b(?! USING)',
+    'postgresql': r'\bSeq Scan on {table}\b',
+}
+
+
+def plan_problems(check, ctx, using=DEFAULT_DB_ALIAS):
+    """
+    Run ``check`` and EXPLAIN its statements that read the check's table.
+    Returns one (plan, problem) pair per statement, ``problem`` None when
+    the plan is fine; an empty list when no statement read the table.
+    """
+    connection = connections[using]
+    statements = []
+
+    def capture(execute, sql, params, many, context):
+        statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(capture):
+        check['run'](ctx)
+
+    table = check['table']
+    full_scan = re.compile(FULL_SCAN_PATTERNS[connection.vendor].format(table=re.escape(table)))
+    results = []
+    for sql, params in statements:
+        if not re.search(rf'\b(FROM|JOIN) "?{table}"?\s', sql):
+            continue
+        if check.get('match') and not re.search(check['match'], sql):
+            continue
+        plan = explain(using, sql, params)
+        problem = None
+        if full_scan.search(plan):
+            problem = f'full scan of {table}'
+        elif check['index'] and check['index'] not in plan:
+            problem = f'{check["index"]} not used'
+        results.append((plan, problem))
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Check that the hot RBAC queries use index scans on a large seeded dataset.\n\n'
+        'Usage:\n'
+        '  python manage.py check_query_plans                       → 20k users, 1k modules, 100 roles\n'
+        '  python manage.py check_query_plans --users 200000 --modules 2000 --roles 300\n'
+        '  python manage.py check_query_plans --verbose             → Print every plan\n\n'
+        'A throwaway test database is seeded with seed_data --scale and ANALYZEd, then each\n'
+        'query in CHECKS is run and its statements EXPLAINed. Fails when a plan scans the\n'
+        'whole table or does not use the expected index (SQLite and PostgreSQL).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20000, help='Synthetic users to seed.')
+        parser.add_argument('--modules', type=int, default=1000, help='Synthetic modules to seed.')
+        parser.add_argument('--roles', type=int, default=100, help='Synthetic roles to seed.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the synthetic dataset.')
+        parser.add_argument('--verbose', action='store_true', help='Print the plan of every check.')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in FULL_SCAN_PATTERNS:
+            raise CommandError(f'Plan checks support {", ".join(FULL_SCAN_PATTERNS)}, not {connection.vendor}.')
+
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'\n🔎 Seeding {options["users"]} users, {options["modules"]} modules, {options["roles"]} roles'
+            ))
+            start = time.perf_counter()
+            call_command(
+                'seed_data', scale=True, users=options['users'], modules=options['modules'],
+                roles=options['roles'], seed=options['seed'], stdout=StringIO(),
+            )
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+            self.stdout.write(f'  Seeded and analyzed in {time.perf_counter() - start:.1f}s\n')
+
+            ctx = self._context()
+            failures = []
+            for check in CHECKS:
+                failures += self._run_check(check, ctx, options['verbose'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        if failures:
+            raise CommandError('Plan check failed:\n  ' + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS('\n✅ All hot queries use index scans.'))
+
+    def _context(self):
+        menu_user = User.objects.get(username='manager_combo')
+        parent = (
+            Module.objects.filter(parent=None, is_active=True)
+            .annotate(n=Count('children')).order_by('-n', 'pk').first()
+        )
+        module = (
+            Module.objects.annotate(n=Count('available_permissions')).order_by('-n', 'pk').first()
+        )
+        return {
+            'user': menu_user,
+            'menu_roles': list(menu_user.roles.all()),
+            'parent': parent,
+            'module_id': module.pk,
+        }
+
+    def _run_check(self, check, ctx, verbose):
+        results = plan_problems(check, ctx)
+        if not results:
+            return [f'{check["name"]}: no statement reads {check["table"]}']
+
+        failures = []
+        for plan, problem in results:
+            if problem:
+                failures.append(f'{check["name"]}: {problem}')
+                self.stdout.write(self.style.ERROR(f'  ❌ {check["name"]}: {problem}'))
+            else:
+                used = check['index'] or 'index scan'
+                self.stdout.write(self.style.SUCCESS(f'  ✅ {check["name"]}: {used}'))
+            if problem or verbose:
+                for line in plan.splitlines():
+                    self.stdout.write(f'       {line}')
+        return failures
@@ -0,0 +1,193 @@
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.core.serializers import python
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, IntegrityError, connections, transaction
+from django.db.models import AutoField
+from django.db.models.constants import OnConflict
+
+from apps.common.fixtures import iter_fixture_objects, open_fixture
+from apps.common.versioning import bump_table_versions
+from apps.modules.models import Module
+
+
+class Command(BaseCommand):
+    help = (
+        'Load JSON fixtures (dumpdata / data.json format) with bulk inserts.\n\n'
+        'Usage:\n'
+        '  python manage.py fast_loaddata data.json               → Load a fixture (UTF-8/16/32, optionally .gz)\n'
+        '  python manage.py fast_loaddata a.json b.json.gz        → Load several fixtures in one transaction\n'
+        '  python manage.py fast_loaddata data.json --chunk-size 20000\n\n'
+        'Objects are streamed from the file, grouped per model and written with one\n'
+        'prepared INSERT ... ON CONFLICT per model and executemany (existing primary\n'
+        'keys are overwritten, like loaddata). Signals are not sent and field values,\n'
+        'including auto_now timestamps, are written exactly as they are in the fixture.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixtures', nargs='+', help='Fixture file paths.')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database to load into.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Objects per model buffered before an INSERT.')
+        parser.add_argument(
+            '--ignorenonexistent', '-i',
+            action='store_true',
+            help='Ignore fields in the fixture that no longer exist on the model.',
+        )
+
+    def handle(self, *args, **options):
+        self.using = options['database']
+        self.chunk_size = options['chunk_size']
+        self.counts = defaultdict(int)
+        self.buffers = defaultdict(list)
+        self.statements = {}
+        connection = connections[self.using]
+        start = time.perf_counter()
+
+        try:
+            with transaction.atomic(using=self.using):
+                with connection.constraint_checks_disabled():
+                    for path in options['fixtures']:
+                        self._load_file(path, options['ignorenonexistent'])
+                    for model in self._dependency_order(self.buffers):
+                        self._flush(model)
+
+                loaded = list(self.counts)
+                connection.check_constraints(table_names=[model._meta.db_table for model in loaded])
+                if Module in loaded:
+                    # Fixtures from before the materialized path carry no tree_path
+                    Module.rebuild_tree_paths(using=self.using)
+                self._reset_sequences(connection, loaded)
+                bump_table_versions(*(model._meta.db_table for model in loaded))
+        except (DatabaseError, IntegrityError, ValueError) as exc:
+            raise CommandError(f'Could not load fixtures: {exc}')
+
+        elapsed = time.perf_counter() - start
+        total = sum(self.counts.values())
+        self.stdout.write(self.style.MIGRATE_HEADING('\n📦 Loaded:'))
+        for model in self._dependency_order(self.counts):
+            self.stdout.write(f'  {model._meta.label:<40} {self.counts[model]:>10}')
+        self.stdout.write(self.style.SUCCESS(
+            f'\n✅ {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else total:.0f} rows/s)'
+        ))
+
+    def _load_file(self, path, ignorenonexistent):
+        self.stdout.write(self.style.HTTP_INFO(f'📥 {path}'))
+        try:
+            stream = open_fixture(path)
+        except OSError as exc:
+            raise CommandError(str(exc))
+
+        with stream:
+            objects = python.Deserializer(
+                iter_fixture_objects(stream),
+                using=self.using,
+                ignorenonexistent=ignorenonexistent,
+            )
+            for deserialized in objects:
+                obj = deserialized.object
+                model = type(obj)
+                self._add(model, obj)
+                for name, pks in (deserialized.m2m_data or {}).items():
+                    self._add_through_rows(model, obj.pk, name, pks)
+
+    def _add(self, model, obj):
+        buffer = self.buffers[model]
+        buffer.append(obj)
+        if len(buffer) >= self.chunk_size:
+            self._flush(model)
+
+    def _add_through_rows(self, model, pk, field_name, target_pks):
+        field = model._meta.get_field(field_name)
+        through = field.remote_field.through
+        if not through._meta.auto_created:
+            return  # explicit through models are serialized as their own objects
+        source = through._meta.get_field(field.m2m_field_name()).attname
+        target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+        for target_pk in target_pks:
+            self._add(through, through(**{source: pk, target: target_pk}))
+
+    def _flush(self, model):
+        objs = self.buffers.pop(model, [])
+        if not objs:
+            return
+        if model._meta.parents:
+            # Multi-table inheritance children span several tables
+            for obj in objs:
+                obj.save_base(raw=True, using=self.using)
+        else:
+            connection = connections[self.using]
+            # Like bulk_create: objects without a pk (auto-created through rows,
+            # natural-key fixtures) leave the AutoField to the database
+            with_pk = [obj for obj in objs if obj.pk is not None]
+            without_pk = [obj for obj in objs if obj.pk is None]
+            for group, include_pk in ((with_pk, True), (without_pk, False)):
+                if not group:
+                    continue
+                sql, fields = self._insert_statement(model, include_pk)
+                rows = [
+                    [field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields]
+                    for obj in group
+                ]
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, rows)
+        self.counts[model] += len(objs)
+
+    def _insert_statement(self, model, include_pk=True):
+        """
+        INSERT for every concrete column of ``model``, turned into an upsert on
+        the primary key (through tables: skip duplicates). Without
+        ``include_pk`` an AutoField primary key is left out. Built once per
+        model and variant.
+        """
+        key = (model, include_pk)
+        if key not in self.statements:
+            connection = connections[self.using]
+            opts = model._meta
+            fields = [
+                f for f in opts.concrete_fields
+                if include_pk or not (f.primary_key and isinstance(f, AutoField))
+            ]
+            update_columns = [f.column for f in fields if not f.primary_key]
+            on_conflict = OnConflict.UPDATE if update_columns and not opts.auto_created else OnConflict.IGNORE
+            unique_columns = [opts.pk.column] if connection.features.supports_update_conflicts_with_target else []
+            sql = '%s %s (%s) VALUES (%s) %s' % (
+                connection.ops.insert_statement(on_conflict=on_conflict),
+                connection.ops.quote_name(opts.db_table),
+                ', '.join(connection.ops.quote_name(f.column) for f in fields),
+                ', '.join(['%s'] * len(fields)),
+                connection.ops.on_conflict_suffix_sql(fields, on_conflict, update_columns, unique_columns),
+            )
+            self.statements[key] = (sql, fields)
+        return self.statements[key]
+
+    def _dependency_order(self, models):
+        """
+        Models ordered so that FK targets come before the models pointing at
+        them. Self references and cycles are ignored; FK checks are deferred
+        until the end of the load anyway.
+        """
+        remaining = sorted(models, key=lambda model: model._meta.label)
+        ordered = []
+        while remaining:
+            done = set(ordered)
+            ready = [
+                model for model in remaining
+                if all(
+                    field.related_model in done or field.related_model is model or field.related_model not in remaining
+                    for field in model._meta.concrete_fields
+                    if field.is_relation
+                )
+            ]
+            ordered += ready or remaining[:1]
+            remaining = [model for model in remaining if model not in ordered]
+        return ordered
+
+    def _reset_sequences(self, connection, models):
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
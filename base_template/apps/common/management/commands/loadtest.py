@@ -0,0 +1,510 @@
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from apps.common.db_router import mirror_replicas
+from apps.modules.models import ModulePermission
+from apps.roles.models import Role
+
+User = get_user_model()
+
+
+# ═══════════════════════════════════════════════════════════════
+#  WORKLOAD
+#  Relative weights of what a virtual user does after logging in.
+#  Override with --mix login=5,menu=60,...
+# ═══════════════════════════════════════════════════════════════
+
+DEFAULT_MIX = {
+    'login':     5,    # password check + token pair
+    'menu':      50,   # GET /api/modules/my-menu/
+    'users':     10,   # GET /api/users/ (the endpoint is not paginated)
+    'role_save': 10,   # POST /api/roles/<id>/permissions/
+    'refresh':   25,   # POST /api/users/token/refresh/ (rotating refresh tokens)
+    'profile':   0,    # GET /api/users/profile/ (async view, opt in with --mix)
+    'dashboard': 0,    # GET /api/dashboard/stats/ (async view, opt in with --mix)
+}
+
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000]
+
+PASSWORD = 'Test@1234'  # seed_data.DEFAULT_PASSWORD, shared by every seeded user
+
+
+class Command(BaseCommand):
+    help = (
+        'Run a concurrent mixed workload against core.wsgi in-process (no network, no server).\n\n'
+        'Usage:\n'
+        '  python manage.py loadtest                                  → 8 threads for 30s on a temp SQLite DB\n'
+        '  python manage.py loadtest --concurrency 16 --duration 60\n'
+        '  python manage.py loadtest --processes 4 --concurrency 8    → 4 processes × 8 threads\n'
+        '  python manage.py loadtest --mix menu=80,refresh=20 -o run.json\n'
+        '  python manage.py loadtest --asgi --concurrency 64          → core.asgi, 64 tasks on one event loop\n\n'
+        'Every virtual user logs in at the same moment (login storm), then loops over the\n'
+        'weighted mix. A throwaway test database is created and seeded with seed_data --scale:\n'
+        'a temporary SQLite file (WAL) by default, or a test database on the server in\n'
+        'DATABASE_URL (e.g. a local PostgreSQL). Compare --asgi with the default WSGI run\n'
+        'using the same --mix, e.g. menu=50,profile=25,dashboard=25.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=8, help='Virtual users (threads) per process.')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes (forked).')
+        parser.add_argument(
+            '--asgi', action='store_true',
+            help='Drive core.asgi from one event loop per process; virtual users are tasks, not threads.',
+        )
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run after the login storm starts.')
+        parser.add_argument('--mix', help='Scenario weights, e.g. "login=5,menu=50,users=10,role_save=10,refresh=25".')
+        parser.add_argument('--users', type=int, default=1000, help='Synthetic users to seed.')
+        parser.add_argument('--modules', type=int, default=100, help='Synthetic modules to seed.')
+        parser.add_argument('--roles', type=int, default=20, help='Synthetic roles to seed.')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for the dataset and the workload.')
+        parser.add_argument('-o', '--output', help='Write the report as JSON to this file.')
+
+    def handle(self, *args, **options):
+        mix = self._parse_mix(options['mix'])
+        total_users = options['concurrency'] * options['processes']
+        if total_users < 1:
+            raise CommandError('--concurrency and --processes must be positive.')
+
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict['NAME']
+        tmpdir = self._prepare_database()
+        try:
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            mirror_replicas()
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode=WAL')
+
+            self.stdout.write(self.style.HTTP_INFO(
+                f'🌱 Seeding {options["users"]} users, {options["modules"]} modules, {options["roles"]} roles '
+                f'on {connection.vendor}...'
+            ))
+            call_command(
+                'seed_data', scale=True, users=options['users'], modules=options['modules'],
+                roles=options['roles'], seed=options['seed'], stdout=StringIO(),
+            )
+            ctx = self._context(total_users, options['seed'])
+
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f'\n🚀 {options["processes"]} process(es) × {options["concurrency"]} virtual users '
+                f'on {"ASGI" if options["asgi"] else "WSGI"} for {options["duration"]:.0f}s, mix {mix}'
+            ))
+            samples, elapsed = self._run(ctx, mix, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+            if tmpdir:
+                tmpdir.cleanup()
+
+        report = _report(samples, elapsed, options, mix)
+        self._print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f'\n💾 Report written to {options["output"]}'))
+
+    def _parse_mix(self, value):
+        if not value:
+            return dict(DEFAULT_MIX)
+        mix = {}
+        for part in value.split(','):
+            name, _, weight = part.partition('=')
+            if name not in DEFAULT_MIX:
+                raise CommandError(f'Unknown scenario "{name}". Choices: {", ".join(DEFAULT_MIX)}')
+            try:
+                mix[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Invalid weight in "{part}".')
+        return mix
+
+    def _prepare_database(self):
+        """Point the SQLite test database at a temp file so threads and processes share it."""
+        if connection.vendor != 'sqlite':
+            return None
+        tmpdir = tempfile.TemporaryDirectory(prefix='loadtest-')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(tmpdir.name, 'loadtest.sqlite3')
+        # Take the write lock at BEGIN so concurrent writers wait (timeout)
+        # instead of failing on a read → write lock upgrade
+        connection.settings_dict.setdefault('OPTIONS', {}).update(timeout=30, transaction_mode='IMMEDIATE')
+        return tmpdir
+
+    def _context(self, count, seed):
+        rng = random.Random(seed)
+        usernames = list(
+            User.objects.filter(employee_id__startswith='SYN', is_active=True).values_list('username', flat=True)
+        )
+        if not usernames:
+            raise CommandError('No synthetic users were seeded.')
+        module_permissions = defaultdict(list)
+        for module_id, codename in ModulePermission.objects.values_list('module_id', 'codename'):
+            module_permissions[module_id].append(codename)
+        return {
+            'usernames': [rng.choice(usernames) for _ in range(count)],
+            'role_ids': list(Role.objects.values_list('pk', flat=True)),
+            'module_permissions': dict(module_permissions),
+        }
+
+    # ──────────────────────────────────────────────
+    # RUN
+    # ──────────────────────────────────────────────
+    def _run(self, ctx, mix, options):
+        if options['asgi']:
+            from core.asgi import application
+        else:
+            from core.wsgi import application
+
+        processes, concurrency = options['processes'], options['concurrency']
+        # Every thread waits at the barrier; an event loop waits once for all its tasks
+        parties = 1 if options['asgi'] else concurrency
+        start = time.monotonic()
+        if processes == 1:
+            barrier = threading.Barrier(parties)
+            samples = _run_worker(application, ctx, mix, options, barrier, offset=0)
+        else:
+            # Children must open their own connections
+            connections.close_all()
+            mp = multiprocessing.get_context('fork')
+            barrier = mp.Barrier(processes * parties)
+            queue = mp.Queue()
+            workers = [
+                mp.Process(
+                    target=_process_main,
+                    args=(application, ctx, mix, options, barrier, i * concurrency, queue),
+                )
+                for i in range(processes)
+            ]
+            for worker in workers:
+                worker.start()
+            samples = []
+            for _ in workers:
+                samples += queue.get()
+            for worker in workers:
+                worker.join()
+        return samples, time.monotonic() - start
+
+    # ──────────────────────────────────────────────
+    # REPORT
+    # ──────────────────────────────────────────────
+    def _print_report(self, report):
+        total = report['total']
+        self.stdout.write(self.style.MIGRATE_HEADING('\n📊 Results'))
+        self.stdout.write(
+            f'  {total["requests"]} requests in {report["elapsed_s"]:.1f}s → '
+            f'{total["throughput_rps"]:.1f} req/s, error rate {total["error_rate"] * 100:.2f}%\n'
+        )
+        self.stdout.write(
+            f'  {"scenario":<12} {"requests":>9} {"req/s":>8} {"errors":>7} '
+            f'{"p50 ms":>9} {"p95 ms":>9} {"p99 ms":>9} {"max ms":>9}'
+        )
+        for name, row in list(report['scenarios'].items()) + [('TOTAL', total)]:
+            line = (
+                f'  {name:<12} {row["requests"]:>9} {row["throughput_rps"]:>8.1f} {row["errors"]:>7} '
+                f'{row["p50_ms"]:>9.1f} {row["p95_ms"]:>9.1f} {row["p99_ms"]:>9.1f} {row["max_ms"]:>9.1f}'
+            )
+            self.stdout.write(self.style.ERROR(line) if row['errors'] else line)
+
+        self.stdout.write(self.style.HTTP_INFO('\n  Latency histogram (all requests):'))
+        peak = max(total['histogram'].values()) or 1
+        for bucket, count in total['histogram'].items():
+            bar = '█' * round(40 * count / peak)
+            self.stdout.write(f'  {bucket:>10} ms │ {bar:<40} {count}')
+
+        if report['error_samples']:
+            self.stdout.write(self.style.WARNING('\n  Sample errors:'))
+            for error in report['error_samples']:
+                self.stdout.write(f'    {error}')
+
+
+# ══════════════════════════════════════════════════════════════
+#  WORKERS
+# ══════════════════════════════════════════════════════════════
+
+class WSGIClient:
+    """Calls a WSGI application directly with a hand-built environ."""
+
+    def __init__(self, application, multiprocess=False):
+        self.application = application
+        self.multiprocess = multiprocess
+
+    def request(self, method, path, data=None, token=None):
+        path, _, query = path.partition('?')
+        body = json.dumps(data).encode() if data is not None else b''
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SERVER_NAME': 'loadtest',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'HTTP_HOST': 'loadtest',
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': self.multiprocess,
+            'wsgi.run_once': False,
+        }
+        if token:
+            environ['HTTP_AUTHORIZATION'] = f'Bearer {token}'
+
+        status = []
+        result = self.application(environ, lambda s, headers, exc_info=None: status.append(s))
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return int(status[0].split()[0]), content
+
+
+class ASGIClient:
+    """Calls an ASGI application directly with a hand-built scope."""
+
+    def __init__(self, application):
+        self.application = application
+
+    async def request(self, method, path, data=None, token=None):
+        path, _, query = path.partition('?')
+        body = json.dumps(data).encode() if data is not None else b''
+        headers = [
+            (b'host', b'loadtest'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+        ]
+        if token:
+            headers.append((b'authorization', f'Bearer {token}'.encode()))
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'query_string': query.encode(),
+            'root_path': '',
+            'headers': headers,
+            'client': ('127.0.0.1', 0),
+            'server': ('loadtest', 80),
+        }
+
+        pending = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        done = asyncio.Event()
+
+        async def receive():
+            if pending:
+                return pending.pop()
+            # Django listens for a disconnect while the view runs
+            await done.wait()
+            return {'type': 'http.disconnect'}
+
+        status, chunks = [], []
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+
+        try:
+            await self.application(scope, receive, send)
+        finally:
+            done.set()
+        return status[0], b''.join(chunks)
+
+
+class VirtualUser:
+    """One logged-in client. Each scenario returns the request to send: (method, path, data, token)."""
+
+    def __init__(self, username, ctx, rng):
+        self.username = username
+        self.ctx = ctx
+        self.rng = rng
+        self.access = None
+        self.refresh_token = None
+
+    def login(self):
+        return 'POST', '/api/users/login/', {'username': self.username, 'password': PASSWORD}, None
+
+    def menu(self):
+        return 'GET', '/api/modules/my-menu/', None, self.access
+
+    def users(self):
+        return 'GET', '/api/users/', None, self.access
+
+    def role_save(self):
+        module_id = self.rng.choice(list(self.ctx['module_permissions']))
+        codenames = self.ctx['module_permissions'][module_id]
+        granted = self.rng.sample(codenames, self.rng.randint(1, len(codenames)))
+        return (
+            'POST', f'/api/roles/{self.rng.choice(self.ctx["role_ids"])}/permissions/',
+            {'permissions': [{'module_id': module_id, 'granted': granted}]},
+            self.access,
+        )
+
+    def refresh(self):
+        return 'POST', '/api/users/token/refresh/', {'refresh': self.refresh_token}, None
+
+    def profile(self):
+        return 'GET', '/api/users/profile/', None, self.access
+
+    def dashboard(self):
+        return 'GET', '/api/dashboard/stats/', None, self.access
+
+    def sample(self, scenario, start, status, content):
+        """Keep the tokens of a login or refresh and return the sample row."""
+        if isinstance(content, Exception):
+            return scenario, 0, (time.perf_counter() - start) * 1000, f'{scenario}: {type(content).__name__}: {content}'
+        if scenario in ('login', 'refresh') and status == 200:
+            tokens = json.loads(content)
+            self.access = tokens['access']
+            self.refresh_token = tokens.get('refresh', self.refresh_token)
+        error = None if status < 400 else f'{scenario}: HTTP {status} {content[:120]!r}'
+        return scenario, status, (time.perf_counter() - start) * 1000, error
+
+    def next_scenario(self, names, weights):
+        # Without a token every other scenario would only measure 401s
+        return 'login' if self.access is None else self.rng.choices(names, weights)[0]
+
+
+def _virtual_user_loop(client, username, ctx, mix, deadline, barrier, seed, samples):
+    user = VirtualUser(username, ctx, random.Random(seed))
+    names, weights = list(mix), list(mix.values())
+    barrier.wait()
+
+    scenario = 'login'  # everybody logs in at once: the login storm
+    while True:
+        start = time.perf_counter()
+        try:
+            status, content = client.request(*getattr(user, scenario)())
+        except Exception as exc:
+            status, content = 0, exc
+        samples.append(user.sample(scenario, start, status, content))
+
+        if time.monotonic() >= deadline:
+            break
+        scenario = user.next_scenario(names, weights)
+    connections.close_all()
+
+
+async def _async_virtual_user(client, username, ctx, mix, deadline, seed, samples):
+    user = VirtualUser(username, ctx, random.Random(seed))
+    names, weights = list(mix), list(mix.values())
+
+    scenario = 'login'
+    while True:
+        start = time.perf_counter()
+        try:
+            status, content = await client.request(*getattr(user, scenario)())
+        except Exception as exc:
+            status, content = 0, exc
+        samples.append(user.sample(scenario, start, status, content))
+
+        if time.monotonic() >= deadline:
+            break
+        scenario = user.next_scenario(names, weights)
+
+
+def _run_worker(application, ctx, mix, options, barrier, offset):
+    """Run this process's virtual users: threads for WSGI, tasks on one event loop for ASGI."""
+    if options['asgi']:
+        return _run_event_loop(application, ctx['usernames'], ctx, mix, options, barrier, offset)
+    return _run_threads(application, ctx['usernames'], ctx, mix, options, barrier, offset)
+
+
+def _run_threads(application, usernames, ctx, mix, options, barrier, offset):
+    client = WSGIClient(application, multiprocess=options['processes'] > 1)
+    deadline = time.monotonic() + options['duration']
+    samples = []  # list.append is atomic, threads share one list
+    threads = [
+        threading.Thread(
+            target=_virtual_user_loop,
+            args=(client, usernames[offset + i], ctx, mix, deadline, barrier, options['seed'] + offset + i, samples),
+        )
+        for i in range(options['concurrency'])
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def _run_event_loop(application, usernames, ctx, mix, options, barrier, offset):
+    client = ASGIClient(application)
+    samples = []
+    barrier.wait()
+    deadline = time.monotonic() + options['duration']
+
+    async def main():
+        await asyncio.gather(*(
+            _async_virtual_user(client, usernames[offset + i], ctx, mix, deadline, options['seed'] + offset + i, samples)
+            for i in range(options['concurrency'])
+        ))
+
+    asyncio.run(main())
+    connections.close_all()
+    return samples
+
+
+def _process_main(application, ctx, mix, options, barrier, offset, queue):
+    queue.put(_run_worker(application, ctx, mix, options, barrier, offset))
+
+
+def _report(samples, elapsed, options, mix):
+    def summarize(rows):
+        latencies = sorted(row[2] for row in rows)
+        errors = sum(1 for row in rows if row[3])
+
+        def pct(p):
+            return latencies[min(len(latencies) - 1, max(0, round(p / 100 * len(latencies)) - 1))] if latencies else 0.0
+
+        histogram = {}
+        lower = 0
+        for upper in HISTOGRAM_BUCKETS_MS + [None]:
+            label = f'{lower}-{upper}' if upper else f'>{lower}'
+            histogram[label] = sum(1 for ms in latencies if ms >= lower and (upper is None or ms < upper))
+            lower = upper
+        return {
+            'requests': len(rows),
+            'errors': errors,
+            'error_rate': errors / len(rows) if rows else 0.0,
+            'throughput_rps': len(rows) / elapsed if elapsed else 0.0,
+            'p50_ms': pct(50), 'p95_ms': pct(95), 'p99_ms': pct(99),
+            'max_ms': latencies[-1] if latencies else 0.0,
+            'histogram': histogram,
+        }
+
+    by_scenario = defaultdict(list)
+    for row in samples:
+        by_scenario[row[0]].append(row)
+    return {
+        'config': {
+            key: options[key]
+            for key in ('concurrency', 'processes', 'asgi', 'duration', 'users', 'modules', 'roles', 'seed')
+        } | {'mix': mix, 'database': connection.vendor},
+        'elapsed_s': elapsed,
+        'total': summarize(samples),
+        'scenarios': {name: summarize(rows) for name, rows in sorted(by_scenario.items())},
+        'error_samples': list(dict.fromkeys(row[3] for row in samples if row[3]))[:10],
+    }
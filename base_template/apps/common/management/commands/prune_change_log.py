@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.common.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete change-log entries older than settings.SYNC_RETENTION_DAYS.\n\n'
+        'Usage:\n'
+        '  python manage.py prune_change_log            → Keep SYNC_RETENTION_DAYS (default 30)\n'
+        '  python manage.py prune_change_log --days 7   → Keep one week\n'
+        '  python manage.py prune_change_log --dry-run  → Only count what would go\n\n'
+        'The newest expired entry is kept as a marker: GET /api/sync/ answers a cursor\n'
+        'older than the oldest remaining entry with a full resync.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'SYNC_RETENTION_DAYS', 30),
+                            help='Days of change log to keep.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Entries deleted per statement.')
+        parser.add_argument('--dry-run', action='store_true', help='Report the count without deleting.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        marker = (
+            ChangeLog.objects.filter(changed_at__lt=cutoff)
+            .order_by('-id').values_list('id', flat=True).first()
+        )
+        expired = ChangeLog.objects.filter(id__lt=marker) if marker else ChangeLog.objects.none()
+
+        if options['dry_run']:
+            self.stdout.write(f'{expired.count()} entries older than {options["days"]} days would be deleted.')
+            return
+
+        deleted = 0
+        while True:
+            ids = list(expired.order_by('id').values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            deleted += ChangeLog.objects.filter(id__in=ids).delete()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f'🗑️  Deleted {deleted} change-log entries older than {options["days"]} days.'
+        ))
@@ -1,5 +1,14 @@
-from django.core.management.base import BaseCommand
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from apps.common.changelog import record_changes
+from apps.common.versioning import bump_table_versions
 from apps.departments.models import Department
 from apps.roles.models import Role
 from apps.modules.models import Module, ModulePermission, RoleModulePermission
@@ -223,6 +232,43 @@ USERS = [
 ]
 
 
+# ═══════════════════════════════════════════════════════════════
+#  SYNTHETIC DATA (--scale)
+#  Word lists used to generate production-sized datasets.
+# ═══════════════════════════════════════════════════════════════
+
+SCALE_FIRST_NAMES = [
+    'Aarav', 'Aisha', 'Ananya', 'Arjun', 'Carlos', 'Chen', 'Diya', 'Elena', 'Fatima', 'Hiro',
+    'Isha', 'James', 'Kabir', 'Kavya', 'Liam', 'Maria', 'Meera', 'Nikhil', 'Olivia', 'Priya',
+    'Rahul', 'Riya', 'Rohan', 'Sanjay', 'Sara', 'Tara', 'Vikram', 'Wei', 'Yusuf', 'Zoya',
+]
+
+SCALE_LAST_NAMES = [
+    'Agarwal', 'Bose', 'Chopra', 'Das', 'Fernandes', 'Garcia', 'Iyer', 'Joshi', 'Kapoor', 'Khan',
+    'Kim', 'Menon', 'Mishra', 'Nair', 'Patel', 'Rao', 'Reddy', 'Shah', 'Smith', 'Wang',
+]
+
+SCALE_DEPARTMENT_WORDS = [
+    'Operations', 'Support', 'Marketing', 'Legal', 'Procurement', 'Logistics', 'Engineering',
+    'Research', 'Quality', 'Security', 'Training', 'Facilities', 'Compliance', 'Analytics',
+]
+
+SCALE_ROLE_WORDS = ['Manager', 'Lead', 'Staff', 'Analyst', 'Auditor', 'Intern', 'Coordinator', 'Viewer']
+
+SCALE_MODULE_WORDS = [
+    'Reports', 'Invoices', 'Orders', 'Inventory', 'Tickets', 'Contracts', 'Payroll', 'Assets',
+    'Leads', 'Projects', 'Timesheets', 'Vendors', 'Shipments', 'Budgets', 'Audits', 'Documents',
+]
+
+SCALE_ICONS = ['chart', 'file', 'box', 'ticket', 'folder', 'calendar', 'truck', 'wallet']
+
+# Module trees are generated up to this depth (0 = root)
+SCALE_MAX_DEPTH = 3
+
+# --scale dates count back from here, so the same --seed gives the same rows
+SCALE_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
 # ═══════════════════════════════════════════════════════════════
 #  AVAILABLE SEED TARGETS
 # ═══════════════════════════════════════════════════════════════
@@ -251,6 +297,8 @@ class Command(BaseCommand):
         '  python manage.py seed_data --flush             → Delete all data and re-seed\n'
         '  python manage.py seed_data --flush --only users→ Delete only users and re-seed them\n'
         '  python manage.py seed_data --list              → Show available seed targets\n'
+        '  python manage.py seed_data --scale --users 200000 --modules 2000 --roles 300 --seed 42\n'
+        '                                                 → Seed everything, then add a synthetic dataset\n'
     )
 
     def add_arguments(self, parser):
@@ -270,6 +318,21 @@ class Command(BaseCommand):
             action='store_true',
             help='List all available seed targets with descriptions.',
         )
+        parser.add_argument(
+            '--scale',
+            action='store_true',
+            help='After the base seed, generate a synthetic dataset with bulk inserts (see --users/--modules/--roles).',
+        )
+        parser.add_argument('--users', type=int, default=10000, help='--scale: number of synthetic users.')
+        parser.add_argument('--modules', type=int, default=200, help='--scale: number of synthetic modules.')
+        parser.add_argument('--roles', type=int, default=50, help='--scale: number of synthetic roles.')
+        parser.add_argument(
+            '--departments',
+            type=int,
+            help='--scale: number of synthetic departments (default: one per 10 roles, at least 4).',
+        )
+        parser.add_argument('--seed', type=int, default=0, help='--scale: random seed, same seed gives the same dataset.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='--scale: rows per bulk INSERT.')
 
     def handle(self, *args, **options):
         # --list: just show targets and exit
@@ -315,6 +378,9 @@ class Command(BaseCommand):
         if 'users' in targets:
             users = self._seed_users(departments, roles)
 
+        if options['scale']:
+            self._seed_synthetic(options)
+
         self.stdout.write(self.style.SUCCESS('\n✅ Seed complete!'))
 
         # Print summary only if users were seeded
@@ -537,6 +603,200 @@ class Command(BaseCommand):
 
         return users
 
+    # ──────────────────────────────────────────────
+    # SYNTHETIC DATA (--scale)
+    # ──────────────────────────────────────────────
+    def _seed_synthetic(self, options):
+        """
+        Generate departments, module trees, roles with grants, and users with
+        bulk_create. bulk_create skips save() and signals, so tree paths,
+        the sync change log and table versions are written here directly.
+        Names are suffixed past the current max id, so repeated runs add
+        to the dataset instead of colliding.
+        """
+        n_users, n_modules, n_roles = options['users'], options['modules'], options['roles']
+        n_departments = options['departments'] or max(4, n_roles // 10)
+        if min(n_users, n_modules, n_roles, n_departments) < 1:
+            raise CommandError('--users, --modules, --roles and --departments must be positive.')
+
+        self.chunk_size = options['chunk_size']
+        rng = random.Random(options['seed'])
+        self.stdout.write(self.style.HTTP_INFO(
+            f'\n📈 Generating synthetic data (seed={options["seed"]}): {n_departments} departments, '
+            f'{n_modules} modules, {n_roles} roles, {n_users} users...'
+        ))
+
+        with transaction.atomic():
+            departments = self._timed('Departments', self._synthetic_departments, rng, n_departments)
+            modules = self._timed('Modules', self._synthetic_modules, rng, n_modules)
+            permissions = self._timed('Module permissions', self._synthetic_module_permissions, rng, modules)
+            roles = self._timed('Roles & grants', self._synthetic_roles, rng, n_roles, departments, permissions)
+            self._timed('Users', self._synthetic_users, rng, n_users, departments, roles)
+            bump_table_versions(
+                Department._meta.db_table, Role._meta.db_table, User._meta.db_table,
+                User.roles.through._meta.db_table, Module._meta.db_table, ModulePermission._meta.db_table,
+                RoleModulePermission._meta.db_table, RoleModulePermission.granted_permissions.through._meta.db_table,
+            )
+
+    def _timed(self, label, func, *args):
+        start = time.perf_counter()
+        result = func(*args)
+        count = len(result) if result is not None else ''
+        self.stdout.write(f'  {label:<20} {count:>8}  ({time.perf_counter() - start:.2f}s)')
+        return result
+
+    def _bulk_create(self, model, objs):
+        return model.objects.bulk_create(objs, batch_size=self.chunk_size)
+
+    def _next_suffix(self, model):
+        return (model.objects.aggregate(max_id=Max('pk'))['max_id'] or 0) + 1
+
+    def _synthetic_departments(self, rng, count):
+        start = self._next_suffix(Department)
+        departments = self._bulk_create(Department, [
+            Department(
+                name=f'{rng.choice(SCALE_DEPARTMENT_WORDS)} {start + i}',
+                code=f'D{start + i}',
+                description='Synthetic department',
+            )
+            for i in range(count)
+        ])
+        record_changes(Department, [d.pk for d in departments])
+        return departments
+
+    def _synthetic_modules(self, rng, count):
+        """Random forest: ~5% roots, every other module hangs under an earlier one."""
+        start = self._next_suffix(Module)
+        n_roots = max(1, count // 20)
+        specs = []  # (parent index, depth)
+        for i in range(count):
+            if i < n_roots:
+                specs.append((None, 0))
+                continue
+            parent = rng.randrange(i)
+            while specs[parent][1] >= SCALE_MAX_DEPTH:
+                parent = specs[parent][0]
+            specs.append((parent, specs[parent][1] + 1))
+
+        modules = [None] * count
+        for depth in range(SCALE_MAX_DEPTH + 1):
+            level = [i for i, (_, d) in enumerate(specs) if d == depth]
+            objs = []
+            for i in level:
+                parent = modules[specs[i][0]] if specs[i][0] is not None else None
+                word = rng.choice(SCALE_MODULE_WORDS)
+                objs.append(Module(
+                    name=f'{word} {start + i}',
+                    icon=rng.choice(SCALE_ICONS),
+                    path=f'{parent.path if parent else ""}/{word.lower()}-{start + i}',
+                    order=rng.randint(1, 50),
+                    parent=parent,
+                    depth=depth,
+                    available_on_mobile=rng.random() < 0.6,
+                ))
+            for i, obj in zip(level, self._bulk_create(Module, objs)):
+                parent = modules[specs[i][0]] if specs[i][0] is not None else None
+                obj.tree_path = f'{parent.tree_path if parent else ""}{obj.pk}/'
+                modules[i] = obj
+            Module.objects.bulk_update([modules[i] for i in level], ['tree_path'], batch_size=self.chunk_size)
+
+        record_changes(Module, [m.pk for m in modules])
+        return modules
+
+    def _synthetic_module_permissions(self, rng, modules):
+        """CRUD plus 0-5 extras per module. Returns {module id: [permissions]}."""
+        extras = list({p['codename']: p for perms in EXTRA_MODULE_PERMISSIONS.values() for p in perms}.values())
+        objs = []
+        for module in modules:
+            for perm in DEFAULT_CRUD + rng.sample(extras, rng.randint(0, min(5, len(extras)))):
+                objs.append(ModulePermission(module=module, **perm))
+
+        by_module = {}
+        for perm in self._bulk_create(ModulePermission, objs):
+            by_module.setdefault(perm.module_id, []).append(perm)
+        return by_module
+
+    def _synthetic_roles(self, rng, count, departments, permissions):
+        """
+        ~20% global roles; each role is granted 'view' plus a random half of
+        the other permissions on a random slice of modules. Super Admin is
+        granted everything, like in the base seed.
+        """
+        start = self._next_suffix(Role)
+        roles = self._bulk_create(Role, [
+            Role(
+                name=f'{rng.choice(SCALE_ROLE_WORDS)} {start + i}',
+                department=None if rng.random() < 0.2 else rng.choice(departments),
+                description='Synthetic role',
+            )
+            for i in range(count)
+        ])
+        record_changes(Role, [r.pk for r in roles])
+
+        module_ids = list(permissions)
+        grants = []  # (RoleModulePermission, [permission ids])
+        for role in roles:
+            for module_id in rng.sample(module_ids, rng.randint(1, min(60, len(module_ids)))):
+                perms = permissions[module_id]
+                granted = [p.pk for p in perms if p.codename == 'view' or rng.random() < 0.5]
+                grants.append((RoleModulePermission(role=role, module_id=module_id), granted))
+
+        super_admin = Role.objects.filter(name='Super Admin', department=None).first()
+        if super_admin:
+            for module_id, perms in permissions.items():
+                grants.append((RoleModulePermission(role=super_admin, module_id=module_id), [p.pk for p in perms]))
+
+        self._bulk_create(RoleModulePermission, [rmp for rmp, _ in grants])
+        Through = RoleModulePermission.granted_permissions.through
+        self._bulk_create(Through, [
+            Through(rolemodulepermission_id=rmp.pk, modulepermission_id=perm_id)
+            for rmp, granted in grants
+            for perm_id in granted
+        ])
+        return roles
+
+    def _synthetic_users(self, rng, count, departments, roles):
+        """
+        Users in chunks with 1-3 roles each (role popularity is skewed, like
+        real tenants). The password hash is computed once and shared.
+        """
+        password = make_password(DEFAULT_PASSWORD)
+        start = self._next_suffix(User)
+        role_weights = [1 / (rank + 1) for rank in range(len(roles))]
+        Through = User.roles.through
+
+        created = 0
+        for offset in range(0, count, self.chunk_size):
+            users = []
+            for i in range(offset, min(offset + self.chunk_size, count)):
+                first, last = rng.choice(SCALE_FIRST_NAMES), rng.choice(SCALE_LAST_NAMES)
+                suffix = start + i
+                joined = SCALE_EPOCH - timedelta(days=rng.randint(0, 5 * 365), seconds=rng.randint(0, 86399))
+                users.append(User(
+                    username=f'{first.lower()}.{last.lower()}.{suffix}',
+                    email=f'{first.lower()}.{last.lower()}.{suffix}@example.com',
+                    first_name=first,
+                    last_name=last,
+                    employee_id=f'SYN{suffix:07d}',
+                    password=password,
+                    department=rng.choice(departments),
+                    is_active=rng.random() < 0.95,
+                    date_joined=joined,
+                    last_login=joined + timedelta(days=rng.randint(0, 30)) if rng.random() < 0.8 else None,
+                ))
+            users = self._bulk_create(User, users)
+
+            links = []
+            for user in users:
+                k = rng.choices((1, 2, 3), weights=(70, 25, 5))[0]
+                for role in {r.pk: r for r in rng.choices(roles, weights=role_weights, k=k)}.values():
+                    links.append(Through(user_id=user.pk, role_id=role.pk))
+            self._bulk_create(Through, links)
+            record_changes(User, [u.pk for u in users])
+            created += len(users)
+
+        return range(created)
+
     # ──────────────────────────────────────────────
     # SUMMARY TABLE
     # ──────────────────────────────────────────────
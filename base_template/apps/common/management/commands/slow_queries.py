@@ -0,0 +1,107 @@
+import json
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.common.slow_queries import log_paths
+
+SORT_KEYS = {
+    'total': lambda stats: stats['total_ms'],
+    'count': lambda stats: stats['count'],
+    'max': lambda stats: stats['max_ms'],
+    'avg': lambda stats: stats['total_ms'] / stats['count'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Summarize the slow-query log (settings.SLOW_QUERY_LOG) by query fingerprint.\n\n'
+        'Usage:\n'
+        '  python manage.py slow_queries                     → Top 20 shapes by total time\n'
+        '  python manage.py slow_queries --sort max --top 5  → Worst single executions\n'
+        '  python manage.py slow_queries --hours 24 --plans  → Last day, with EXPLAIN plans\n'
+        '  python manage.py slow_queries --clear             → Empty the log\n'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help='Number of fingerprints to show.')
+        parser.add_argument('--sort', choices=SORT_KEYS, default='total', help='Ranking (default: total time).')
+        parser.add_argument('--hours', type=float, help='Only entries from the last N hours.')
+        parser.add_argument('--plans', action='store_true', help='Print the captured EXPLAIN plan of each fingerprint.')
+        parser.add_argument('--clear', action='store_true', help='Delete the log and its rotated backups.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            for path in log_paths():
+                if os.path.exists(path):
+                    os.remove(path)
+            self.stdout.write(self.style.SUCCESS('🗑️  Slow-query log cleared.'))
+            return
+
+        since = None
+        if options['hours']:
+            since = datetime.now().astimezone() - timedelta(hours=options['hours'])
+        groups = self._aggregate(since)
+        if not groups:
+            self.stdout.write(self.style.WARNING('No slow queries logged.'))
+            return
+
+        ranked = sorted(groups.values(), key=SORT_KEYS[options['sort']], reverse=True)[:options['top']]
+        total = sum(stats['count'] for stats in groups.values())
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'\n🐢 {total} slow queries, {len(groups)} fingerprints - top {len(ranked)} by {options["sort"]}'
+        ))
+        for rank, stats in enumerate(ranked, 1):
+            self._print_group(rank, stats, options['plans'])
+
+    def _aggregate(self, since):
+        groups = {}
+        for path in reversed(log_paths()):  # oldest first, so the latest plan wins
+            if not os.path.exists(path):
+                continue
+            with open(path) as fh:
+                for line in fh:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # truncated by a concurrent rotation
+                    if since and datetime.strptime(entry['time'], '%Y-%m-%dT%H:%M:%S%z') < since:
+                        continue
+                    stats = groups.get(entry['fingerprint'])
+                    if stats is None:
+                        stats = groups[entry['fingerprint']] = {
+                            'fingerprint': entry['fingerprint'],
+                            'shape': entry['shape'],
+                            'count': 0,
+                            'total_ms': 0.0,
+                            'max_ms': 0.0,
+                            'call_sites': Counter(),
+                            'plan': None,
+                            'last_seen': None,
+                        }
+                    stats['count'] += 1
+                    stats['total_ms'] += entry['ms']
+                    stats['max_ms'] = max(stats['max_ms'], entry['ms'])
+                    stats['last_seen'] = entry['time']
+                    if entry['stack']:
+                        stats['call_sites'][entry['stack'][-1]] += 1
+                    if entry.get('plan'):
+                        stats['plan'] = entry['plan']
+        return groups
+
+    def _print_group(self, rank, stats, show_plan):
+        avg = stats['total_ms'] / stats['count']
+        self.stdout.write(self.style.HTTP_INFO(
+            f'\n#{rank} {stats["fingerprint"]}  ×{stats["count"]}  total {stats["total_ms"]:.0f} ms  '
+            f'avg {avg:.1f} ms  max {stats["max_ms"]:.1f} ms  last {stats["last_seen"]}'
+        ))
+        shape = stats['shape']
+        self.stdout.write(f'  {shape[:300]}{"…" if len(shape) > 300 else ""}')
+        for site, count in stats['call_sites'].most_common(3):
+            self.stdout.write(f'  ↳ {site} (×{count})')
+        if show_plan:
+            plan = stats['plan'] or '(no plan captured)'
+            for line in plan.splitlines():
+                self.stdout.write(self.style.NOTICE(f'    {line}'))
@@ -0,0 +1,86 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.modules.catalog import (
+    CatalogError,
+    apply_catalog,
+    diff_catalog,
+    export_catalog,
+    has_changes,
+    load_catalog_file,
+    summarize,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Sync modules and module permissions with a declarative catalog file.\n\n'
+        'Usage:\n'
+        '  python manage.py sync_permissions                        → Apply PERMISSION_CATALOG\n'
+        '  python manage.py sync_permissions catalog.yaml           → Apply a specific file (JSON or YAML)\n'
+        '  python manage.py sync_permissions --dry-run              → Show the diff, change nothing\n'
+        '  python manage.py sync_permissions --export catalog.json  → Write the current database state\n'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'catalog',
+            nargs='?',
+            default=str(settings.PERMISSION_CATALOG),
+            help='Catalog file (.json, .yaml or .yml). Defaults to settings.PERMISSION_CATALOG.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Print the changes that would be applied without writing anything.',
+        )
+        parser.add_argument(
+            '--export',
+            metavar='PATH',
+            help='Export the current modules and permissions to PATH ("-" for stdout) and exit.',
+        )
+
+    def handle(self, *args, **options):
+        if options['export']:
+            data = json.dumps(export_catalog(), indent=2, ensure_ascii=False)
+            if options['export'] == '-':
+                self.stdout.write(data)
+            else:
+                with open(options['export'], 'w', encoding='utf-8') as fh:
+                    fh.write(data + '\n')
+                self.stdout.write(self.style.SUCCESS(f'✅ Exported catalog to {options["export"]}'))
+            return
+
+        try:
+            plan = diff_catalog(load_catalog_file(options['catalog']))
+        except (OSError, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        self._print_plan(summarize(plan))
+        if not has_changes(plan):
+            self.stdout.write(self.style.SUCCESS('\n✅ Already in sync, nothing to do.'))
+            return
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('\n⚠  Dry run, no changes written.'))
+            return
+
+        try:
+            apply_catalog(plan)
+        except CatalogError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS('\n✅ Catalog applied!'))
+
+    def _print_plan(self, plan):
+        self.stdout.write(self.style.MIGRATE_HEADING('\n📋 Catalog diff:\n'))
+        for section, changes in plan.items():
+            counts = ', '.join(f'{action} {len(items)}' for action, items in changes.items())
+            self.stdout.write(self.style.HTTP_INFO(f'  {section:<12} {counts}'))
+            for name in changes.get('create', []):
+                self.stdout.write(self.style.SUCCESS(f'    + {name}'))
+            for name, fields in changes.get('update', {}).items():
+                diff = ', '.join(f'{field}: {old!r} → {new!r}' for field, (old, new) in fields.items())
+                self.stdout.write(self.style.WARNING(f'    ~ {name} ({diff})'))
+            for name in changes.get('delete', []):
+                self.stdout.write(self.style.ERROR(f'    - {name}'))
@@ -0,0 +1,197 @@
+"""
+In-process request metrics in the Prometheus text format.
+
+RequestMetricsMiddleware (apps.common.middleware) feeds the registry below,
+database connection pool stats are read when scraped, and GET /api/metrics/
+renders it all. Every worker process keeps its own registry,
+so scrape each worker (or run a single worker) the way you would with any
+Prometheus client in multi-process mode.
+"""
+import bisect
+import threading
+from collections import defaultdict
+from functools import partial
+
+from django.db import connections
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, like prometheus_client's."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help = help_text
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+        for labels, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                yield f'{self.name}_bucket', labels + (('le', _format_value(bound)),), cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, count
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] += amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield f'{self.name}_total', labels, value
+
+
+class Callback:
+    """Values read from ``callback()`` ({labels: value}) at scrape time."""
+
+    def __init__(self, name, help_text, kind, callback):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.callback = callback
+
+    def samples(self):
+        suffix = '_total' if self.kind == 'counter' else ''
+        for labels, value in sorted(self.callback().items()):
+            yield self.name + suffix, labels, value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{_escape(value)}"' for key, value in labels)
+    return '{' + pairs + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if isinstance(value, str):
+        return value
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+registry = Registry()
+
+request_latency = registry.register(Histogram(
+    'http_request_duration_seconds', 'Time spent in the view and middleware below it.', LATENCY_BUCKETS,
+))
+request_queries = registry.register(Histogram(
+    'http_request_sql_queries', 'SQL statements executed per request.', QUERY_BUCKETS,
+))
+request_sql_time = registry.register(Histogram(
+    'http_request_sql_duration_seconds', 'Time spent in SQL per request.', LATENCY_BUCKETS,
+))
+response_size = registry.register(Histogram(
+    'http_response_size_bytes', 'Response body size (0 for streaming responses).', SIZE_BUCKETS,
+))
+requests_total = registry.register(Counter(
+    'http_requests', 'Requests by view, method and status code.',
+))
+n_plus_one_total = registry.register(Counter(
+    'http_n_plus_one', 'Sampled requests that repeated one query shape at least METRICS_N_PLUS_ONE_THRESHOLD times.',
+))
+db_read_routing = registry.register(Counter(
+    'db_read_routing', 'Requests by database chosen for their reads and why (apps.common.db_router).',
+))
+single_flight_total = registry.register(Counter(
+    'single_flight', 'Cached value lookups by name and outcome: hit, coalesced (waited for another caller) or computed.',
+))
+
+
+# ──────────────────────────────────────────────
+# Connection pools (psycopg_pool, see DATABASE_POOL in settings)
+# ──────────────────────────────────────────────
+POOL_GAUGES = {
+    'pool_min': 'Configured minimum pool size.',
+    'pool_max': 'Configured maximum pool size.',
+    'pool_size': 'Connections currently managed by the pool (in use or idle).',
+    'pool_available': 'Idle connections ready to be handed out.',
+    'requests_waiting': 'Requests currently queued for a connection.',
+}
+POOL_COUNTERS = {
+    'requests_num': 'Connections requested from the pool.',
+    'requests_queued': 'Requests that had to wait for a connection.',
+    'requests_wait_ms': 'Total time spent waiting for a connection (ms).',
+    'requests_errors': 'Requests that timed out or failed waiting for a connection.',
+    'connections_num': 'Connections opened to the server.',
+    'connections_ms': 'Total time spent opening connections (ms).',
+    'connections_errors': 'Failed connection attempts.',
+    'connections_lost': 'Connections found broken by the health check.',
+    'returns_bad': 'Connections returned in a bad state and discarded.',
+    'usage_ms': 'Total time connections were checked out (ms).',
+}
+
+
+def pool_stats():
+    """{alias: psycopg_pool stats} for the pools this worker has already created."""
+    stats = {}
+    for alias in connections:
+        pool = getattr(connections[alias], '_connection_pools', {}).get(alias)
+        if pool is not None:
+            stats[alias] = pool.get_stats()
+    return stats
+
+
+def _pool_stat(stat):
+    return {(('database', alias),): values.get(stat, 0) for alias, values in pool_stats().items()}
+
+
+for _stat, _help in POOL_GAUGES.items():
+    registry.register(Callback(f'db_pool_{_stat}', _help, 'gauge', partial(_pool_stat, _stat)))
+for _stat, _help in POOL_COUNTERS.items():
+    registry.register(Callback(f'db_pool_{_stat}', _help, 'counter', partial(_pool_stat, _stat)))
@@ -0,0 +1,179 @@
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+
+from . import metrics, profiling
+from .sql import normalize_sql
+
+logger = logging.getLogger('apps.common.n_plus_one')
+
+
+class QueryRecorder:
+    """execute_wrapper counting statements and SQL time; keeps the SQL only when asked to."""
+
+    def __init__(self, keep_sql=False):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = [] if keep_sql else None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            if self.statements is not None:
+                self.statements.append(sql)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records latency, SQL statement count and time, and response size per
+    URL name into apps.common.metrics (served at /api/metrics/).
+
+    A sample of requests (METRICS_N_PLUS_ONE_SAMPLE_RATE) also keeps the SQL
+    it ran; when one query shape shows up METRICS_N_PLUS_ONE_THRESHOLD times
+    or more, the request is logged as a likely N+1. Unsampled requests only
+    pay for a counter and two clock reads per query.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'METRICS_ENABLED', True)
+        self.sample_rate = getattr(settings, 'METRICS_N_PLUS_ONE_SAMPLE_RATE', 0.05)
+        self.threshold = getattr(settings, 'METRICS_N_PLUS_ONE_THRESHOLD', 10)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        recorder = QueryRecorder(keep_sql=random.random() < self.sample_rate)
+        start = time.perf_counter()
+        with self._recording(recorder):
+            response = self.get_response(request)
+        self._observe(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        recorder = QueryRecorder(keep_sql=random.random() < self.sample_rate)
+        start = time.perf_counter()
+        # The connections are created in this context, so the ORM's
+        # sync_to_async threads use the same objects and their wrappers
+        with self._recording(recorder):
+            response = await self.get_response(request)
+        self._observe(request, response, recorder, time.perf_counter() - start)
+        return response
+
+    def _recording(self, recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def _observe(self, request, response, recorder, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        labels = (('view', view), ('method', request.method))
+        metrics.request_latency.observe(labels, elapsed)
+        metrics.request_queries.observe(labels, recorder.count)
+        metrics.request_sql_time.observe(labels, recorder.duration)
+        metrics.response_size.observe(labels, 0 if response.streaming else len(response.content))
+        metrics.requests_total.inc(labels + (('status', response.status_code),))
+
+        if recorder.statements:
+            self._check_n_plus_one(request, view, labels, recorder.statements)
+
+    def _check_n_plus_one(self, request, view, labels, statements):
+        shapes = Counter(normalize_sql(sql) for sql in statements)
+        repeated = [(shape, count) for shape, count in shapes.most_common() if count >= self.threshold]
+        if not repeated:
+            return
+        metrics.n_plus_one_total.inc(labels)
+        shape, count = repeated[0]
+        logger.warning(
+            'Possible N+1 in %s %s (%s): %d queries, %d repeated shape(s); top shape ran %d times: %s',
+            request.method, request.path, view, len(statements), len(repeated), count, shape,
+        )
+
+
+class ProfilingMiddleware:
+    """
+    Profiles requests carrying a valid profiling token (see apps.common.profiling).
+
+    The token must be signed, unexpired and issued to a user who is still
+    active staff. The profile id is returned in the ``X-Profile-Id`` header;
+    the profile itself is listed at /admin/profiles/. Other requests only pay
+    for a header and a query parameter lookup.
+
+    Under ASGI, cProfile only sees the event loop thread: the ORM work done
+    in sync_to_async threads is missing from the call graph (the SQL capture
+    is complete), and other requests running meanwhile show up in it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = profiling.request_token(request)
+        if not token:
+            return self.get_response(request)
+        user_id = profiling.check_token(token)
+        if user_id is None or not self._is_staff(user_id):
+            return self.get_response(request)
+
+        start = time.perf_counter()
+        response, profiler, statements = profiling.profile_call(lambda: self.get_response(request))
+        self._save(request, response, profiler, statements, time.perf_counter() - start, user_id)
+        return response
+
+    async def __acall__(self, request):
+        token = profiling.request_token(request)
+        if not token:
+            return await self.get_response(request)
+        user_id = profiling.check_token(token)
+        if user_id is None or not await sync_to_async(self._is_staff)(user_id):
+            return await self.get_response(request)
+
+        start = time.perf_counter()
+        response, profiler, statements = await profiling.aprofile_call(lambda: self.get_response(request))
+        elapsed = time.perf_counter() - start
+        await sync_to_async(self._save)(request, response, profiler, statements, elapsed, user_id)
+        return response
+
+    def _is_staff(self, user_id):
+        return get_user_model().objects.filter(pk=user_id, is_active=True, is_staff=True).exists()
+
+    def _save(self, request, response, profiler, statements, elapsed, user_id):
+        match = getattr(request, 'resolver_match', None)
+        profile_id = profiling.save_profile(profiler, statements, {
+            'method': request.method,
+            'path': profiling.request_path(request),
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 3),
+            'user_id': user_id,
+        })
+        response[profiling.PROFILE_ID_HEADER] = profile_id
@@ -0,0 +1,67 @@
+import hashlib
+
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .versioning import get_table_versions
+
+
+class NotModified(APIException):
+    status_code = status.HTTP_304_NOT_MODIFIED
+    default_detail = ''
+
+
+class TableVersionETagMixin:
+    """
+    Conditional GET support for APIViews backed by rarely-changing tables.
+
+    The ETag is derived from the TableVersion counters in ``etag_tables``,
+    the full request path (query params such as ?platform= change the
+    payload) and, when ``etag_per_role`` is set, the caller's role ids.
+    A matching If-None-Match is answered with 304 before the handler runs,
+    so the main tables are never read. The counters stay available to the
+    handler as ``self.table_versions``.
+
+    Usage:
+        class ModuleListCreateView(TableVersionETagMixin, APIView):
+            etag_tables = ('modules',)
+    """
+    etag_tables = ()
+    etag_per_role = False
+
+    def get_etag(self, request):
+        versions = self.table_versions = get_table_versions(self.etag_tables)
+        parts = [request.get_full_path()]
+        parts += [f'{name}:{versions[name]}' for name in sorted(versions)]
+        if self.etag_per_role:
+            role_ids = sorted(request.user.roles.values_list('pk', flat=True))
+            parts.append('roles:' + ','.join(map(str, role_ids)))
+        digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        self.table_versions = None
+        if request.method in ('GET', 'HEAD') and self.etag_tables:
+            self.etag = self.get_etag(request)
+            if self.etag in parse_etags(request.headers.get('If-None-Match', '')):
+                raise NotModified()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return Response(status=status.HTTP_304_NOT_MODIFIED)
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        etag = getattr(self, 'etag', None)
+        if etag and response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            # Let browsers keep the body but revalidate on every use
+            response['Cache-Control'] = 'private, no-cache'
+            patch_vary_headers(response, ('Authorization',))
+        return response
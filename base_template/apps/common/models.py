@@ -1,3 +1,58 @@
 from django.db import models
 
-# Create your models here.
+
+class TableVersion(models.Model):
+    """
+    Monotonic change counter per table.
+
+    Bumped by apps.common.signals whenever a row of the table is saved,
+    deleted or has its m2m links changed. Conditional GETs compare ETags
+    built from these counters instead of reading the tables themselves.
+    """
+
+    name = models.CharField(max_length=100, primary_key=True)  # db_table, e.g. 'modules'
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'table_versions'
+        verbose_name = 'Table Version'
+        verbose_name_plural = 'Table Versions'
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+
+class ChangeLog(models.Model):
+    """
+    Append-only feed of row changes consumed by GET /api/sync/.
+
+    The auto-increment id doubles as the sync cursor: a client that last
+    saw id N asks for everything after N. Deletes are kept as tombstones
+    so they propagate to offline clients.
+    """
+
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = [
+        (UPSERT, 'Upsert'),
+        (DELETE, 'Delete'),
+    ]
+
+    model = models.CharField(max_length=50)  # db_table, e.g. 'users', 'modules'
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES, default=UPSERT)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'change_log'
+        verbose_name = 'Change Log Entry'
+        verbose_name_plural = 'Change Log'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['model', 'object_id'], name='change_log_model_obj_idx'),
+            models.Index(fields=['changed_at'], name='change_log_changed_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.model}:{self.object_id}"
@@ -0,0 +1,12 @@
+from rest_framework.permissions import BasePermission
+
+from .authentication import METRICS_SCRAPER
+
+
+class CanReadMetrics(BasePermission):
+    """Staff users, or a scraper presenting settings.METRICS_TOKEN."""
+
+    def has_permission(self, request, view):
+        if request.auth == METRICS_SCRAPER:
+            return True
+        return bool(request.user and request.user.is_staff)
@@ -0,0 +1,209 @@
+"""
+On-demand profiling of single requests.
+
+A staff user gets a signed token from the admin page (/admin/profiles/) and
+sends it with the request to profile, as an ``X-Profile-Token`` header or a
+``_profile`` query parameter. ProfilingMiddleware then runs that request
+under cProfile, records every SQL statement with its parameters and time,
+and EXPLAINs the slowest SELECT of each query shape. The result is stored
+in settings.PROFILING_DIR as ``<id>.prof`` (pstats, for snakeviz & co.) and
+``<id>.json``; only the newest PROFILING_MAX_PROFILES are kept.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import secrets
+import time
+from contextlib import ExitStack
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.db import connections
+
+from .sql import explain, normalize_sql
+
+SALT = 'apps.common.profiling'
+HEADER = 'X-Profile-Token'
+QUERY_PARAM = '_profile'
+PROFILE_ID_HEADER = 'X-Profile-Id'
+PROFILE_ID = re.compile(r'^\d{8}T\d{12}-[0-9a-f]{8}$')
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILING_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def make_token(user):
+    """Signed token allowing ``user`` (a staff member) to profile requests until it expires."""
+    return signing.dumps({'user': user.pk}, salt=SALT, compress=True)
+
+
+def check_token(token):
+    """User id the token was issued to, or None if it is forged or expired."""
+    try:
+        data = signing.loads(token, salt=SALT, max_age=getattr(settings, 'PROFILING_TOKEN_MAX_AGE', 3600))
+    except signing.BadSignature:
+        return None
+    return data.get('user')
+
+
+def request_token(request):
+    return request.headers.get(HEADER) or request.GET.get(QUERY_PARAM)
+
+
+def request_path(request):
+    """Path and query string of ``request`` without the token."""
+    query = request.GET.copy()
+    query.pop(QUERY_PARAM, None)
+    return f'{request.path}?{query.urlencode()}' if query else request.path
+
+
+class SQLCapture:
+    """execute_wrapper keeping every statement with its parameters and duration."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.statements.append({
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': None if many else params,
+                'many': many,
+                'ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def profile_call(func):
+    """Run ``func()`` under cProfile and SQL capture → (result, profiler, statements)."""
+    capture = SQLCapture()
+    profiler = cProfile.Profile()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(capture))
+        profiler.enable()
+        try:
+            result = func()
+        finally:
+            profiler.disable()
+    return result, profiler, capture.statements
+
+
+async def aprofile_call(func):
+    """profile_call for an async ``func`` (see ProfilingMiddleware about ASGI)."""
+    capture = SQLCapture()
+    profiler = cProfile.Profile()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(capture))
+        profiler.enable()
+        try:
+            result = await func()
+        finally:
+            profiler.disable()
+    return result, profiler, capture.statements
+
+
+def explain_statements(statements, limit=None):
+    """
+    EXPLAIN (without ANALYZE) the slowest SELECT of each query shape, at most
+    ``limit`` shapes, slowest first.
+    """
+    limit = getattr(settings, 'PROFILING_EXPLAIN_LIMIT', 20) if limit is None else limit
+    slowest = {}
+    for entry in statements:
+        if entry['many'] or not entry['sql'].lstrip().upper().startswith('SELECT'):
+            continue
+        shape = normalize_sql(entry['sql'])
+        if shape not in slowest or entry['ms'] > slowest[shape]['ms']:
+            slowest[shape] = entry
+    chosen = sorted(slowest.items(), key=lambda item: item[1]['ms'], reverse=True)[:limit]
+    return [
+        {**entry, 'shape': shape, 'plan': explain(entry['alias'], entry['sql'], entry['params'])}
+        for shape, entry in chosen
+    ]
+
+
+def save_profile(profiler, statements, meta):
+    """Write ``<id>.prof`` and ``<id>.json``, trim the ring buffer and return the id."""
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    # Sorts chronologically: the ring buffer and the admin list rely on it
+    profile_id = f'{datetime.now().strftime("%Y%m%dT%H%M%S%f")}-{secrets.token_hex(4)}'
+
+    profiler.dump_stats(directory / f'{profile_id}.prof')
+    stats_text = io.StringIO()
+    pstats.Stats(profiler, stream=stats_text).sort_stats('cumulative').print_stats(40)
+
+    explained = explain_statements(statements)
+    for entry in statements + explained:
+        entry['params'] = _jsonable(entry['params'])
+    record = {
+        **meta,
+        'id': profile_id,
+        'created_at': time.time(),
+        'query_count': len(statements),
+        'sql_ms': round(sum(entry['ms'] for entry in statements), 3),
+        'queries': statements,
+        'explained': explained,
+        'stats': stats_text.getvalue(),
+    }
+    tmp = directory / f'{profile_id}.json.tmp'
+    tmp.write_text(json.dumps(record, indent=1, default=str))
+    os.replace(tmp, directory / f'{profile_id}.json')
+    _trim(directory)
+    return profile_id
+
+
+def _trim(directory):
+    keep = getattr(settings, 'PROFILING_MAX_PROFILES', 50)
+    for path in sorted(directory.glob('*.json'))[:-keep or None]:
+        path.unlink(missing_ok=True)
+        path.with_suffix('.prof').unlink(missing_ok=True)
+
+
+def list_profiles():
+    """Stored profiles, newest first, without the bulky parts."""
+    profiles = []
+    for path in sorted(profile_dir().glob('*.json'), reverse=True):
+        try:
+            record = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue  # trimmed or half-written meanwhile
+        for key in ('queries', 'explained', 'stats'):
+            record.pop(key, None)
+        profiles.append(record)
+    return profiles
+
+
+def profile_path(profile_id, suffix):
+    """Path of a stored profile file, or None for an unknown or malformed id."""
+    if not PROFILE_ID.match(profile_id):
+        return None
+    path = profile_dir() / f'{profile_id}{suffix}'
+    return path if path.exists() else None
+
+
+def _jsonable(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _jsonable_value(value) for key, value in params.items()}
+    return [_jsonable_value(value) for value in params]
+
+
+def _jsonable_value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (bytes, memoryview)):
+        return f'<{len(value)} bytes>'
+    return str(value)
@@ -0,0 +1,86 @@
+"""
+Precomputed OpenAPI schema.
+
+Generating the schema introspects every view and serializer, so it is
+done once: at release time (`manage.py build_openapi_schema`, see the
+Procfile) or, when no artifact exists, on the first request. The JSON
+rendering is stored gzipped at settings.OPENAPI_SCHEMA_ARTIFACT and kept in
+memory by each worker together with its ETag. In DEBUG the artifact on disk
+is ignored, so the dev server always describes the code it is running.
+"""
+import gzip
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from drf_spectacular.renderers import OpenApiJsonRenderer, OpenApiYamlRenderer
+from drf_spectacular.settings import spectacular_settings
+
+
+def generate_schema():
+    """Render the schema as JSON bytes, exactly as SpectacularAPIView would."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=spectacular_settings.SERVE_PUBLIC)
+    return OpenApiJsonRenderer().render(schema, renderer_context={})
+
+
+def artifact_path():
+    return Path(settings.OPENAPI_SCHEMA_ARTIFACT)
+
+
+def read_artifact(path=None):
+    """Decompressed JSON bytes of the artifact, or None if there is none."""
+    try:
+        with gzip.open(path or artifact_path(), 'rb') as fh:
+            return fh.read()
+    except FileNotFoundError:
+        return None
+
+
+def write_artifact(content, path=None):
+    """Write atomically; mtime=0 keeps the gzip bytes identical for identical schemas."""
+    path = Path(path or artifact_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(gzip.compress(content, mtime=0))
+    os.replace(tmp, path)
+
+
+class SchemaArtifact:
+    """One schema in every representation the schema view serves."""
+
+    def __init__(self, content):
+        self.json = content
+        self.json_gzip = gzip.compress(content, mtime=0)
+        self.digest = hashlib.sha256(content).hexdigest()[:32]
+        self._yaml = None
+
+    @property
+    def yaml(self):
+        if self._yaml is None:
+            self._yaml = OpenApiYamlRenderer().render(json.loads(self.json))
+        return self._yaml
+
+
+_artifact = None
+_lock = threading.Lock()
+
+
+def get_schema_artifact():
+    global _artifact
+    if _artifact is None:
+        with _lock:
+            if _artifact is None:
+                content = None if settings.DEBUG else read_artifact()
+                if content is None:
+                    content = generate_schema()
+                    if not settings.DEBUG:
+                        try:
+                            write_artifact(content)
+                        except OSError:
+                            pass  # read-only filesystem: keep serving from memory
+                _artifact = SchemaArtifact(content)
+    return _artifact
@@ -0,0 +1,166 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from apps.departments.models import Department
+from apps.modules.models import Module, ModulePermission, RoleModulePermission
+from apps.modules.serializers import module_tree_fragments
+from apps.roles.models import Role
+from apps.roles.serializers import role_list_fragments
+from apps.users.serializers import user_list_fragments
+
+from .changelog import record_changes
+from .models import ChangeLog
+from .versioning import bump_table_versions
+
+User = get_user_model()
+
+
+# ──────────────────────────────────────────────
+# FRAGMENT CACHE INVALIDATION
+# A row's own edits change its updated_at and need no work here. These
+# handlers cover fragments that embed *related* rows.
+# ──────────────────────────────────────────────
+
+@receiver(post_save, sender=Role)
+@receiver(pre_delete, sender=Role)
+def invalidate_role_dependents(sender, instance, **kwargs):
+    # User fragments embed the full role (name, department_name, ...)
+    user_list_fragments.invalidate(User.objects.filter(roles=instance))
+
+
+@receiver(post_save, sender=Department)
+@receiver(pre_delete, sender=Department)
+def invalidate_department_dependents(sender, instance, **kwargs):
+    # Deleting a department SET_NULLs these rows without touching updated_at.
+    # User fragments also embed roles[].department_name.
+    user_list_fragments.invalidate(
+        User.objects.filter(Q(department=instance) | Q(roles__department=instance)).distinct()
+    )
+    role_list_fragments.invalidate(Role.objects.filter(department=instance))
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+def invalidate_user_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        user_list_fragments.invalidate(User.objects.filter(pk=instance.pk))
+    elif action == 'pre_clear':
+        user_list_fragments.invalidate(User.objects.filter(roles=instance))
+    else:
+        user_list_fragments.invalidate(User.objects.filter(pk__in=pk_set))
+
+
+def _module_and_ancestors(pk):
+    """Module ``pk`` and every module above it (none for ``pk=None``)."""
+    if pk is None:
+        return Module.objects.none()
+    # The parent's stored path: save() only fixes the saved module's own
+    # path after post_save, so ``instance.tree_path`` can still be the old one
+    path = Module.objects.filter(pk=pk).values_list('tree_path', flat=True).first() or f'{pk}/'
+    return Module.objects.filter(pk__in=[int(ancestor) for ancestor in path.split('/')[:-1]])
+
+
+@receiver(pre_save, sender=Module)
+def invalidate_old_module_ancestors(sender, instance, **kwargs):
+    # The parent chain the module is leaving
+    old_parent_id = getattr(instance, '_loaded_parent_id', None)
+    if instance.pk and old_parent_id != instance.parent_id:
+        module_tree_fragments.invalidate(_module_and_ancestors(old_parent_id))
+
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def invalidate_module_ancestors(sender, instance, **kwargs):
+    # Module fragments nest their children, so the parent chain is stale
+    module_tree_fragments.invalidate(_module_and_ancestors(instance.parent_id))
+
+
+# ──────────────────────────────────────────────
+# TABLE VERSIONS
+# Every save/delete/m2m change moves the table's counter (see
+# apps.common.versioning). Bulk queryset updates bypass signals and must
+# call bump_table_versions() themselves.
+# ──────────────────────────────────────────────
+
+VERSIONED_MODELS = (User, Role, Department, Module, ModulePermission, RoleModulePermission)
+
+
+def bump_sender_table(sender, **kwargs):
+    bump_table_versions(sender._meta.db_table)
+
+
+def bump_through_table(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_table_versions(sender._meta.db_table)
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_sender_table, sender=model, dispatch_uid=f'table_version_save_{model._meta.label_lower}')
+    post_delete.connect(bump_sender_table, sender=model, dispatch_uid=f'table_version_delete_{model._meta.label_lower}')
+
+for through in (User.roles.through, RoleModulePermission.granted_permissions.through):
+    m2m_changed.connect(bump_through_table, sender=through, dispatch_uid=f'table_version_m2m_{through._meta.label_lower}')
+
+
+@receiver(post_delete, sender=Role)
+def bump_role_cascades(sender, instance, **kwargs):
+    # The users_roles rows go with the role via a signal-less fast delete
+    bump_table_versions(User.roles.through._meta.db_table)
+
+
+@receiver(post_delete, sender=Department)
+def bump_department_cascades(sender, instance, **kwargs):
+    # SET_NULL on roles and users is a plain UPDATE without signals
+    bump_table_versions(Role._meta.db_table, User._meta.db_table)
+
+
+# ──────────────────────────────────────────────
+# SYNC CHANGE LOG
+# Synced payloads embed related rows (a user's roles and department, a
+# role's department_name), so those dependents are logged as upserts too.
+# ──────────────────────────────────────────────
+
+SYNCED_MODELS = (User, Role, Department, Module)
+
+
+def log_upsert(sender, instance, **kwargs):
+    record_changes(sender, [instance.pk])
+
+
+def log_delete(sender, instance, **kwargs):
+    record_changes(sender, [instance.pk], ChangeLog.DELETE)
+
+
+for model in SYNCED_MODELS:
+    post_save.connect(log_upsert, sender=model, dispatch_uid=f'change_log_save_{model._meta.label_lower}')
+    post_delete.connect(log_delete, sender=model, dispatch_uid=f'change_log_delete_{model._meta.label_lower}')
+
+
+@receiver(post_save, sender=Role)
+@receiver(pre_delete, sender=Role)
+def log_role_dependents(sender, instance, **kwargs):
+    record_changes(User, User.objects.filter(roles=instance).values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Department)
+@receiver(pre_delete, sender=Department)
+def log_department_dependents(sender, instance, **kwargs):
+    # Synced users embed their roles' department_name too
+    users = User.objects.filter(Q(department=instance) | Q(roles__department=instance)).distinct()
+    record_changes(User, users.values_list('pk', flat=True))
+    record_changes(Role, Role.objects.filter(department=instance).values_list('pk', flat=True))
+
+
+@receiver(m2m_changed, sender=User.roles.through)
+def log_user_roles(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        record_changes(User, [instance.pk])
+    elif action == 'pre_clear':
+        record_changes(User, User.objects.filter(roles=instance).values_list('pk', flat=True))
+    else:
+        record_changes(User, pk_set)
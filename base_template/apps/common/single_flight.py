@@ -0,0 +1,108 @@
+"""
+Single-flight computation of cached values.
+
+Cached views key their payload on TableVersion counters (usually their
+ETag), so one role permission save makes the menu of every logged-in user
+miss at once. single_flight() lets one caller compute a missing value
+while the others wait for it:
+
+- Threads of one process take a per-key lock; the ones that queued behind
+  the computing thread read its result from the cache.
+- Processes coordinate through a lease, a cache key taken with ``add``.
+  While another process holds it, callers poll the cache for the value
+  every SINGLE_FLIGHT_POLL_SECONDS. After SINGLE_FLIGHT_LEASE_SECONDS
+  without a result (the holder died or is too slow) they compute it
+  themselves, so a lost lease costs time, never an error.
+
+Values and leases live in the default cache, which must be shared
+between workers (Redis, Memcached) for the lease to cover processes;
+with the per-process LocMemCache only threads are coalesced, and
+`check --deploy` warns (common.W002).
+"""
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics
+
+MISSING = object()
+
+_locks = {}                      # cache key → [lock, callers using it]
+_locks_guard = threading.Lock()
+
+
+def single_flight(name, key, compute, timeout=None):
+    """
+    Cached value of ``compute()`` under ``name``/``key``, computed by one caller at a time.
+
+    ``name`` groups the values (and labels the metrics); ``key`` must change
+    whenever the value would, e.g. an ETag built from table versions.
+    """
+    cache_key = f'single-flight:{name}:{key}'
+    value = cache.get(cache_key, MISSING)
+    if value is not MISSING:
+        metrics.single_flight_total.inc((('name', name), ('outcome', 'hit')))
+        return value
+
+    with _key_lock(cache_key):
+        # The thread we waited for may have stored it
+        value = cache.get(cache_key, MISSING)
+        if value is not MISSING:
+            metrics.single_flight_total.inc((('name', name), ('outcome', 'coalesced')))
+            return value
+
+        lease_key = f'{cache_key}:lease'
+        lease_seconds = getattr(settings, 'SINGLE_FLIGHT_LEASE_SECONDS', 10)
+        poll = getattr(settings, 'SINGLE_FLIGHT_POLL_SECONDS', 0.02)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + lease_seconds
+        while not cache.add(lease_key, token, lease_seconds):
+            # Another process is computing it
+            time.sleep(poll)
+            value = cache.get(cache_key, MISSING)
+            if value is not MISSING:
+                metrics.single_flight_total.inc((('name', name), ('outcome', 'coalesced')))
+                return value
+            if time.monotonic() >= deadline:
+                break
+
+        try:
+            value = compute()
+            cache.set(cache_key, value, getattr(settings, 'SINGLE_FLIGHT_TIMEOUT', 300) if timeout is None else timeout)
+        finally:
+            if cache.get(lease_key) == token:
+                cache.delete(lease_key)
+        metrics.single_flight_total.inc((('name', name), ('outcome', 'computed')))
+        return value
+
+
+async def asingle_flight(name, key, compute, timeout=None):
+    """
+    single_flight() for async views; ``compute`` may be a coroutine function.
+
+    Waiting happens in the request's sync_to_async thread, never on the
+    event loop.
+    """
+    if iscoroutinefunction(compute):
+        compute = async_to_sync(compute)
+    return await sync_to_async(single_flight)(name, key, compute, timeout)
+
+
+@contextmanager
+def _key_lock(cache_key):
+    with _locks_guard:
+        entry = _locks.setdefault(cache_key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _locks[cache_key]
@@ -0,0 +1,118 @@
+"""
+Slow-query log.
+
+Every database connection gets an execute wrapper (installed when the
+connection is created) that times each statement. Statements slower than
+settings.SLOW_QUERY_THRESHOLD_MS are appended to settings.SLOW_QUERY_LOG as
+one JSON object per line: fingerprint, normalized and raw SQL, duration,
+the call site in project code and - the first time a worker sees the
+fingerprint - its EXPLAIN plan. `manage.py slow_queries` aggregates the log
+by fingerprint and prints the top offenders.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .sql import explain, fingerprint, normalize_sql
+
+logger = logging.getLogger('apps.common.slow_queries')
+
+EXPLAINABLE = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+MAX_EXPLAINED = 10000
+
+_local = threading.local()
+_explained = set()
+_handler_lock = threading.Lock()
+
+
+def log_paths():
+    """The log file followed by its rotated backups, newest first."""
+    path = settings.SLOW_QUERY_LOG
+    return [path] + [f'{path}.{n}' for n in range(1, getattr(settings, 'SLOW_QUERY_LOG_BACKUPS', 3) + 1)]
+
+
+class SlowQueryLogger:
+    def __init__(self, threshold_ms):
+        self.threshold_ms = threshold_ms
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        result = execute(sql, params, many, context)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms >= self.threshold_ms and not getattr(_local, 'recording', False):
+            _local.recording = True  # the EXPLAIN below goes through this wrapper too
+            try:
+                record(context['connection'].alias, sql, params, many, elapsed_ms)
+            finally:
+                _local.recording = False
+        return result
+
+
+def record(alias, sql, params, many, elapsed_ms):
+    shape = normalize_sql(sql)
+    key = fingerprint(shape, normalized=True)
+    plan = None
+    if not many and key not in _explained and sql.lstrip()[:6].upper().startswith(EXPLAINABLE):
+        if len(_explained) >= MAX_EXPLAINED:
+            _explained.clear()
+        _explained.add(key)
+        plan = explain(alias, sql, params)
+    _emit({
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'fingerprint': key,
+        'ms': round(elapsed_ms, 3),
+        'alias': alias,
+        'many': many,
+        'shape': shape,
+        'sql': sql,
+        'stack': call_site(),
+        'plan': plan,
+    })
+
+
+def call_site():
+    """Innermost project frames (not Django, not site-packages) that led to the query."""
+    root = str(settings.BASE_DIR)
+    frames = [
+        frame for frame in traceback.extract_stack()
+        if frame.filename.startswith(root) and 'site-packages' not in frame.filename and frame.filename != __file__
+    ]
+    depth = getattr(settings, 'SLOW_QUERY_STACK_DEPTH', 6)
+    return [
+        f'{os.path.relpath(frame.filename, root)}:{frame.lineno} in {frame.name}'
+        for frame in frames[-depth:]
+    ]
+
+
+def _emit(entry):
+    if not logger.handlers:
+        with _handler_lock:
+            if not logger.handlers:
+                handler = RotatingFileHandler(
+                    settings.SLOW_QUERY_LOG,
+                    maxBytes=getattr(settings, 'SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+                    backupCount=getattr(settings, 'SLOW_QUERY_LOG_BACKUPS', 3),
+                    delay=True,
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger.addHandler(handler)
+                logger.setLevel(logging.INFO)
+    logger.info(json.dumps(entry, default=str))
+
+
+@receiver(connection_created)
+def install_slow_query_logger(sender, connection, **kwargs):
+    threshold_ms = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', None)
+    if not threshold_ms or any(isinstance(w, SlowQueryLogger) for w in connection.execute_wrappers):
+        return
+    # Outermost, and at index 0 so the LIFO pop() of connection.execute_wrapper()
+    # blocks that are open while the connection is created still removes theirs
+    connection.execute_wrappers.insert(0, SlowQueryLogger(threshold_ms))
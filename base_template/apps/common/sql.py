@@ -0,0 +1,58 @@
+"""
+SQL shape and plan helpers.
+
+Two statements that differ only in their literal values (``WHERE id = 3``
+vs ``WHERE id = 7``, ``IN (1, 2)`` vs ``IN (4, 5, 6)``) have the same shape.
+Shapes are what the N+1 detector counts and what the slow-query log
+aggregates on.
+"""
+import hashlib
+import re
+
+from django.db import DatabaseError, connections, transaction
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'(?<![\w."])-?\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|\?|\$\d+')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'\bVALUES\s*\([^()]*\)(?:\s*,\s*\([^()]*\))*', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """
+    ``sql`` with literals and placeholders replaced by ``?``, IN lists and
+    multi-row VALUES collapsed, and whitespace squeezed.
+
+    >>> normalize_sql('SELECT * FROM "t" WHERE "id" IN (1, 2, 3) AND name = \\'x\\'')
+    'SELECT * FROM "t" WHERE "id" IN (...) AND name = ?'
+    """
+    sql = _STRING.sub('?', sql)
+    sql = _PLACEHOLDER.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _VALUES_LIST.sub('VALUES (...)', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def fingerprint(sql, normalized=False):
+    """Short stable id of the shape of ``sql`` (pass ``normalized=True`` for a shape)."""
+    shape = sql if normalized else normalize_sql(sql)
+    return hashlib.sha1(shape.encode()).hexdigest()[:16]
+
+
+def explain(alias, sql, params):
+    """
+    Plan of ``sql`` on database ``alias`` as text: EXPLAIN without ANALYZE,
+    so the statement itself is not run.
+    """
+    connection = connections[alias]
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        # Savepoint: a failing EXPLAIN must not break the caller's transaction
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return f'EXPLAIN failed: {exc}'
+    return '\n'.join(' '.join(str(col) for col in row) for row in rows)
@@ -0,0 +1,50 @@
+"""
+Base class for the API test cases in apps/*/tests.py.
+
+Each test runs in a transaction that is rolled back, TableVersion counters
+included. Anything this process keys on those counters (the catalog
+snapshot, single-flight values, fragments) would then look current to the
+next test although the rows behind it are gone, so it is dropped before
+every test, like the benchmark does before each endpoint.
+"""
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from apps.modules.snapshot import reset_catalog
+
+User = get_user_model()
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class APITestCase(TestCase):
+    """
+    Seeded with seed_data (departments, roles, modules and the users of the
+    base seed); set ``scale`` to the options of ``seed_data --scale`` to add
+    a synthetic dataset.
+    """
+    scale = None
+
+    @classmethod
+    def setUpTestData(cls):
+        options = {'scale': True, **cls.scale} if cls.scale else {}
+        call_command('seed_data', stdout=StringIO(), **options)
+
+    def setUp(self):
+        for cache in caches.all():
+            cache.clear()
+        reset_catalog()
+        self.client = APIClient()
+
+    def login(self, username='superadmin'):
+        user = User.objects.get(username=username)
+        self.client.force_authenticate(user)
+        return user
+
+    def commit(self):
+        """Context manager running the on_commit callbacks (table-version bumps) of the block."""
+        return self.captureOnCommitCallbacks(execute=True)
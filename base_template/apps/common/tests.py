@@ -1,3 +1,642 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.checks import run_checks
+from django.core import signing
+from django.core.management import call_command
+from django.db import connection, router, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from django.utils import timezone
+
+from apps.departments.models import Department
+from apps.modules.models import RoleModulePermission
+from apps.roles.models import Role
+
+from . import db_router, metrics, profiling, slow_queries
+from .management.commands import benchmark, check_query_plans
+from .middleware import RequestMetricsMiddleware
+from .models import ChangeLog
+from .single_flight import asingle_flight, single_flight
+from .testing import APITestCase
+
+User = get_user_model()
+
+REDIS_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0'},
+    'fragments': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379/0'},
+}
+
+
+class QueryBudgetTests(APITestCase):
+    """Every budgeted endpoint of the benchmark stays within its budget, cold and warm."""
+    scale = {'users': 60, 'modules': 40, 'roles': 8, 'seed': 1}
+
+    def test_endpoints_within_budget(self):
+        command = benchmark.Command(stdout=StringIO())
+        ctx = command._context()
+        for endpoint in benchmark.ENDPOINTS:
+            if endpoint['budget'] is None:
+                continue
+            with self.subTest(endpoint['name']):
+                result = command._run_endpoint(endpoint, ctx, iterations=2)
+                self.assertEqual(result['status'], [result['expected_status']])
+                self.assertLessEqual(result['queries_cold'], endpoint['budget'])
+                self.assertLessEqual(result['queries_warm'], endpoint['budget'])
+
+
+@skipUnless(connection.vendor == 'postgresql', 'query plans are checked on PostgreSQL')
+class QueryPlanTests(APITestCase):
+    """
+    The checks of check_query_plans on a small dataset. Sequential scans and
+    sorts are priced out, so a full scan or a missing index in a plan means
+    no index serves the query, whatever the table sizes.
+    """
+    scale = {'users': 200, 'modules': 60, 'roles': 10, 'seed': 1}
+
+    def test_hot_queries_use_their_index(self):
+        ctx = check_query_plans.Command()._context()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('SET LOCAL enable_sort = off')
+
+        for check in check_query_plans.CHECKS:
+            with self.subTest(check['name']):
+                results = check_query_plans.plan_problems(check, ctx)
+                self.assertTrue(results, f'no statement reads {check["table"]}')
+                for plan, problem in results:
+                    self.assertIsNone(problem, plan)
+
+
+class BootstrapTests(APITestCase):
+    def test_combines_profile_menu_and_catalogs(self):
+        self.login('manager_combo')
+        data = self.client.get('/api/bootstrap/').json()
+
+        self.assertEqual(data['profile']['username'], 'manager_combo')
+        self.assertEqual({item['path'] for item in data['menu']}, {'/dashboard', '/users', '/roles', '/modules'})
+        self.assertIn('export_csv', data['permissions']['/users'])
+        self.assertEqual(len(data['roles']), Role.objects.count())
+        self.assertEqual(len(data['departments']), Department.objects.count())
+
+    def test_warm_query_count(self):
+        self.login('manager_combo')
+        self.client.get('/api/bootstrap/')
+        # user + roles, catalog versions, grants, roles, departments
+        with self.assertNumQueries(6):
+            self.client.get('/api/bootstrap/')
+
+
+class ConditionalGetTests(APITestCase):
+    def test_matching_etag_is_answered_with_304(self):
+        self.login()
+        response = self.client.get('/api/roles/')
+        etag = response['ETag']
+
+        with self.assertNumQueries(1):  # the table versions only
+            response = self.client.get('/api/roles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_the_etag(self):
+        self.login()
+        etag = self.client.get('/api/roles/')['ETag']
+
+        with self.commit():
+            Role.objects.create(name='Auditor')
+
+        response = self.client.get('/api/roles/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn('Auditor', [role['name'] for role in response.json()])
+
+
+class BatchTests(APITestCase):
+    def test_sub_requests_run_independently(self):
+        self.login('manager_combo')
+        response = self.client.post('/api/batch/', {'requests': [
+            {'key': 'profile', 'path': '/api/users/profile/'},
+            '/api/does-not-exist/',
+            'https://example.com/api/roles/',
+        ]}, format='json')
+
+        entries = {entry['key']: entry for entry in response.json()}
+        self.assertEqual(entries['profile']['status'], 200)
+        self.assertEqual(entries['profile']['body']['username'], 'manager_combo')
+        self.assertEqual(entries['/api/does-not-exist/']['status'], 404)
+        self.assertEqual(entries['https://example.com/api/roles/']['status'], 400)
+
+    def test_failing_sub_request_is_isolated(self):
+        self.login()
+        with mock.patch('apps.departments.views.DepartmentListCreateView.get', side_effect=RuntimeError('boom')):
+            with self.assertLogs('apps.common.batch', 'ERROR'):
+                response = self.client.post(
+                    '/api/batch/', {'requests': ['/api/departments/', '/api/roles/']}, format='json',
+                )
+
+        self.assertEqual([entry['status'] for entry in response.json()], [500, 200])
+
+    def test_sub_responses_are_not_compressed(self):
+        self.login()
+        response = self.client.post(
+            '/api/batch/', {'requests': ['/api/roles/']}, format='json', HTTP_ACCEPT_ENCODING='gzip',
+        )
+        self.assertEqual(response.json()[0]['status'], 200)
+
+
+class SyncTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login('manager_combo')
+
+    def test_full_sync_returns_tables_and_cursor(self):
+        data = self.client.get('/api/sync/').json()
+
+        self.assertTrue(data['full'])
+        self.assertEqual(data['cursor'], ChangeLog.objects.order_by('-id').values_list('id', flat=True).first())
+        self.assertEqual(len(data['changes']['users']['upserts']), User.objects.count())
+
+    def test_delta_since_cursor(self):
+        cursor = self.client.get('/api/sync/').json()['cursor']
+        department = Department.objects.get(code='FIN')
+        department.description = 'Finance and Accounting'
+        department.save()
+        removed = Role.objects.create(name='Temporary')
+        removed_id = removed.pk
+        removed.delete()
+
+        data = self.client.get(f'/api/sync/?since={cursor}').json()
+
+        self.assertFalse(data['full'])
+        self.assertFalse(data['has_more'])
+        self.assertGreater(data['cursor'], cursor)
+        departments = data['changes']['departments']
+        self.assertEqual([d['description'] for d in departments['upserts']], ['Finance and Accounting'])
+        self.assertEqual(data['changes']['roles']['deletes'], [removed_id])
+        # Users are serialized with their department
+        self.assertEqual([u['username'] for u in data['changes']['users']['upserts']], ['viewer1'])
+
+        # Nothing new since the returned cursor
+        data = self.client.get(f'/api/sync/?since={data["cursor"]}').json()
+        self.assertEqual(sum(len(c['upserts']) + len(c['deletes']) for c in data['changes'].values()), 0)
+
+    def test_role_department_rename_reaches_its_users(self):
+        cursor = self.client.get('/api/sync/').json()['cursor']
+        department = Department.objects.get(code='SALES')
+        department.name = 'Sales & Marketing'
+        department.save()
+
+        data = self.client.get(f'/api/sync/?since={cursor}').json()
+
+        # tom_sales is in SALES; manager_combo only holds the SALES-department role
+        usernames = {user['username'] for user in data['changes']['users']['upserts']}
+        self.assertIn('tom_sales', usernames)
+        self.assertIn('manager_combo', usernames)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/sync/?since=abc').status_code, 400)
+
+    def test_pruned_cursor_gets_a_full_sync(self):
+        cursor = self.client.get('/api/sync/').json()['cursor']
+        Role.objects.create(name='Auditor')
+        Role.objects.create(name='Reviewer')
+        ChangeLog.objects.update(changed_at=timezone.now() - timedelta(days=60))
+        Role.objects.create(name='Trainee')
+
+        call_command('prune_change_log', days=30, stdout=StringIO())
+
+        # The newest expired entry stays as the marker
+        self.assertEqual(ChangeLog.objects.filter(changed_at__lt=timezone.now() - timedelta(days=30)).count(), 1)
+        self.assertTrue(self.client.get(f'/api/sync/?since={cursor}').json()['full'])
+
+
+class FixtureRoundTripTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        handle, self.path = tempfile.mkstemp(suffix='.json.gz')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def dump(self):
+        call_command(
+            'fast_dumpdata', 'departments', 'roles', 'users', 'modules', output=self.path, stdout=StringIO(), stderr=StringIO(),
+        )
+
+    def load(self):
+        call_command('fast_loaddata', self.path, stdout=StringIO())
+
+    def test_reload_restores_rows_and_many_to_many(self):
+        user_roles = set(User.roles.through.objects.values_list('user_id', 'role_id'))
+        grants = set(RoleModulePermission.granted_permissions.through.objects.values_list(
+            'rolemodulepermission_id', 'modulepermission_id',
+        ))
+        self.dump()
+
+        User.roles.through.objects.all().delete()
+        RoleModulePermission.granted_permissions.through.objects.all().delete()
+        Department.objects.filter(code='FIN').update(description='changed')
+        self.load()
+
+        self.assertEqual(set(User.roles.through.objects.values_list('user_id', 'role_id')), user_roles)
+        self.assertEqual(set(RoleModulePermission.granted_permissions.through.objects.values_list(
+            'rolemodulepermission_id', 'modulepermission_id',
+        )), grants)
+        self.assertEqual(Department.objects.get(code='FIN').description, 'Finance Department')
+
+    def test_loading_twice_does_not_duplicate(self):
+        self.dump()
+        counts = (User.objects.count(), User.roles.through.objects.count())
+        self.load()
+        self.load()
+        self.assertEqual((User.objects.count(), User.roles.through.objects.count()), counts)
+
+    def test_dump_is_loaddata_compatible(self):
+        handle, plain = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, plain)
+        call_command('fast_dumpdata', 'departments', output=plain, stdout=StringIO(), stderr=StringIO())
+
+        with open(plain, encoding='utf-8') as fh:
+            objects = json.load(fh)
+        self.assertEqual({obj['fields']['code'] for obj in objects}, set(Department.objects.values_list('code', flat=True)))
+
+
+class SharedCacheCheckTests(APITestCase):
+    def check_ids(self, **kwargs):
+        return {message.id for message in run_checks(**kwargs) if message.id.startswith('common.')}
+
+    def test_deploy_warns_about_process_local_caches(self):
+        self.assertEqual(self.check_ids(include_deployment_checks=True), {'common.W001', 'common.W002'})
+
+    def test_per_process_single_flight_leases(self):
+        caches = {**REDIS_CACHES, 'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        with override_settings(CACHES=caches):
+            self.assertEqual(self.check_ids(include_deployment_checks=True), {'common.W002'})
+
+    def test_release_gate_passes_without_a_shared_cache(self):
+        # The Procfile release phase
+        call_command('check', deploy=True, fail_level='ERROR', stdout=StringIO(), stderr=StringIO())
+
+    @override_settings(CACHES=REDIS_CACHES)
+    def test_shared_caches_pass(self):
+        self.assertEqual(self.check_ids(include_deployment_checks=True), set())
+
+    def test_replicas_require_a_shared_default_cache(self):
+        with mock.patch('apps.common.db_router.replica_aliases', return_value=['replica_1']):
+            self.assertEqual(self.check_ids(), {'common.E002'})
+            with override_settings(CACHES=REDIS_CACHES):
+                self.assertEqual(self.check_ids(), set())
+
+
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return {'calls': self.calls}
+
+    def outcomes(self, name):
+        return {dict(labels)['outcome']: value for _, labels, value in metrics.single_flight_total.samples()
+                if dict(labels)['name'] == name}
+
+    def test_cached_value_is_a_hit(self):
+        self.assertEqual(single_flight('test-hit', 'v1', self.compute), {'calls': 1})
+        self.assertEqual(single_flight('test-hit', 'v1', self.compute), {'calls': 1})
+        self.assertEqual(single_flight('test-hit', 'v2', self.compute), {'calls': 2})
+
+        self.assertEqual(self.outcomes('test-hit'), {'computed': 2, 'hit': 1})
+
+    def test_concurrent_callers_share_one_computation(self):
+        release = threading.Event()
+
+        def slow_compute():
+            release.wait(5)
+            return self.compute()
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(single_flight('test-threads', 'v1', slow_compute)))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{'calls': 1}] * 5)
+        self.assertEqual(self.outcomes('test-threads')['computed'], 1)
+
+    def test_waits_for_the_lease_holder(self):
+        cache.add('single-flight:test-lease:v1:lease', 'other-process')
+        timer = threading.Timer(0.05, cache.set, ('single-flight:test-lease:v1', {'calls': 0}))
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        self.assertEqual(single_flight('test-lease', 'v1', self.compute), {'calls': 0})
+        self.assertEqual(self.calls, 0)
+        self.assertEqual(self.outcomes('test-lease'), {'coalesced': 1})
+
+    @override_settings(SINGLE_FLIGHT_LEASE_SECONDS=0.05)
+    def test_computes_after_a_lost_lease(self):
+        cache.add('single-flight:test-lost:v1:lease', 'dead-process')
+
+        self.assertEqual(single_flight('test-lost', 'v1', self.compute), {'calls': 1})
+        # The other process's lease is left to expire
+        self.assertEqual(cache.get('single-flight:test-lost:v1:lease'), 'dead-process')
+
+    def test_async_compute(self):
+        async def compute():
+            return self.compute()
+
+        self.assertEqual(async_to_sync(asingle_flight)('test-async', 'v1', compute), {'calls': 1})
+        self.assertEqual(async_to_sync(asingle_flight)('test-async', 'v1', compute), {'calls': 1})
+
+
+class MetricsTests(APITestCase):
+    def test_staff_read_the_metrics(self):
+        self.login()
+        self.client.get('/api/roles/')
+
+        response = self.client.get('/api/metrics/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        self.assertIn('# TYPE http_requests counter\n', body)
+        self.assertIn('# TYPE http_request_duration_seconds histogram\n', body)
+        self.assertRegex(body, r'http_requests_total\{view="role_list_create",method="GET",status="200"\} \d+\n')
+        self.assertRegex(body, r'http_request_sql_queries_bucket\{view="role_list_create",method="GET",le="\+Inf"\} \d+\n')
+
+    def test_other_users_are_refused(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+        self.login('viewer1')
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+
+    @override_settings(METRICS_TOKEN='scrape-secret')
+    def test_scraper_token(self):
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 401)
+
+    def test_token_is_off_by_default(self):
+        response = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 401)
+
+
+@override_settings(METRICS_N_PLUS_ONE_THRESHOLD=3, METRICS_N_PLUS_ONE_SAMPLE_RATE=1.0)
+class NPlusOneTests(APITestCase):
+    def request(self, lookups):
+        def view(request):
+            for username in ('superadmin', 'viewer1', 'tom_sales', 'lisa_hr')[:lookups]:
+                User.objects.filter(username=username).exists()
+            return HttpResponse()
+
+        RequestMetricsMiddleware(view)(RequestFactory().get('/reports/'))
+
+    def detections(self):
+        return sum(value for _, labels, value in metrics.n_plus_one_total.samples() if ('view', 'unresolved') in labels)
+
+    def test_repeated_shape_is_logged(self):
+        before = self.detections()
+        with self.assertLogs('apps.common.n_plus_one', 'WARNING') as logs:
+            self.request(3)
+
+        self.assertIn('Possible N+1 in GET /reports/ (unresolved): 3 queries', logs.output[0])
+        self.assertEqual(self.detections(), before + 1)
+
+    def test_below_threshold(self):
+        with self.assertNoLogs('apps.common.n_plus_one'):
+            self.request(2)
+
+    @override_settings(METRICS_N_PLUS_ONE_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_keep_no_sql(self):
+        with self.assertNoLogs('apps.common.n_plus_one'):
+            self.request(4)
+
+    def test_sampling_follows_the_rate(self):
+        with override_settings(METRICS_N_PLUS_ONE_SAMPLE_RATE=0.25):
+            with mock.patch('apps.common.middleware.random.random', side_effect=[0.2, 0.3]):
+                with self.assertLogs('apps.common.n_plus_one', 'WARNING') as logs:
+                    self.request(3)
+                    self.request(3)
+        self.assertEqual(len(logs.output), 1)
+
+
+class ProfilingTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.dir = directory.name
+        settings_override = override_settings(PROFILING_DIR=self.dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.admin = self.login()
+
+    def get(self, token, path='/api/roles/'):
+        return self.client.get(path, HTTP_X_PROFILE_TOKEN=token)
+
+    def stored(self):
+        return sorted(os.listdir(self.dir))
+
+    def test_signed_token_profiles_the_request(self):
+        response = self.client.get('/api/roles/', {'_profile': profiling.make_token(self.admin), 'page': 1})
+
+        profile_id = response[profiling.PROFILE_ID_HEADER]
+        self.assertEqual(self.stored(), [f'{profile_id}.json', f'{profile_id}.prof'])
+        with open(os.path.join(self.dir, f'{profile_id}.json'), encoding='utf-8') as fh:
+            record = json.load(fh)
+        self.assertEqual(record['path'], '/api/roles/?page=1')
+        self.assertEqual((record['status'], record['user_id']), (200, self.admin.pk))
+        self.assertEqual(record['query_count'], len(record['queries']))
+        self.assertTrue(record['explained'])
+
+    def test_unsigned_or_forged_tokens_are_ignored(self):
+        forged = signing.dumps({'user': self.admin.pk}, salt='another.salt', compress=True)
+        for token in ('', 'not-a-token', forged, profiling.make_token(self.admin) + 'x'):
+            with self.subTest(token=token):
+                self.assertNotIn(profiling.PROFILE_ID_HEADER, self.get(token))
+        self.assertEqual(self.stored(), [])
+
+    def test_expired_token(self):
+        token = profiling.make_token(self.admin)
+        self.assertEqual(profiling.check_token(token), self.admin.pk)
+
+        with mock.patch('django.core.signing.time.time', return_value=time.time() + 3601):
+            self.assertIsNone(profiling.check_token(token))
+            self.assertNotIn(profiling.PROFILE_ID_HEADER, self.get(token))
+        self.assertEqual(self.stored(), [])
+
+    def test_token_of_a_non_staff_user(self):
+        token = profiling.make_token(User.objects.get(username='viewer1'))
+        self.assertNotIn(profiling.PROFILE_ID_HEADER, self.get(token))
+
+    @override_settings(PROFILING_MAX_PROFILES=2)
+    def test_only_the_newest_profiles_are_kept(self):
+        token = profiling.make_token(self.admin)
+        ids = [self.get(token)[profiling.PROFILE_ID_HEADER] for _ in range(3)]
+
+        kept = sorted(f'{profile_id}{suffix}' for profile_id in ids[1:] for suffix in ('.json', '.prof'))
+        self.assertEqual(self.stored(), kept)
+        self.assertEqual([profile['id'] for profile in profiling.list_profiles()], ids[:0:-1])
+
+
+class SlowQueryLogTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = os.path.join(directory.name, 'slow.jsonl')
+        settings_override = override_settings(SLOW_QUERY_LOG=self.log)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # A fresh file handler and plan memo, as in a new worker
+        for patcher in (mock.patch.object(slow_queries.logger, 'handlers', []),
+                        mock.patch.object(slow_queries, '_explained', set())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(lambda: [handler.close() for handler in slow_queries.logger.handlers])
+
+    def query(self, threshold_ms, name='Viewer'):
+        with connection.execute_wrapper(slow_queries.SlowQueryLogger(threshold_ms)):
+            return list(Role.objects.filter(name=name))
+
+    def entries(self, path=None):
+        if not os.path.exists(path or self.log):
+            return []
+        with open(path or self.log, encoding='utf-8') as fh:
+            return [json.loads(line) for line in fh]
+
+    def test_slow_statement_is_one_json_line(self):
+        self.query(threshold_ms=0)
+        self.query(threshold_ms=0, name='Auditor')
+
+        first, second = self.entries()
+        self.assertEqual(first['fingerprint'], second['fingerprint'])
+        self.assertIn('FROM "roles"', first['shape'])
+        self.assertNotIn('Viewer', first['shape'])
+        self.assertTrue(first['plan'])
+        self.assertIsNone(second['plan'])  # one EXPLAIN per fingerprint and worker
+        self.assertTrue(any(frame.startswith('apps/common/tests.py:') for frame in first['stack']))
+
+    def test_fast_statement_is_not_logged(self):
+        self.query(threshold_ms=60_000)
+        self.assertEqual(self.entries(), [])
+
+    def test_threshold_setting(self):
+        for threshold, installed in ((250, [250]), (0, []), (None, [])):
+            with self.subTest(threshold=threshold), override_settings(SLOW_QUERY_THRESHOLD_MS=threshold):
+                fake = SimpleNamespace(execute_wrappers=[])
+                slow_queries.install_slow_query_logger(sender=None, connection=fake)
+                self.assertEqual([wrapper.threshold_ms for wrapper in fake.execute_wrappers], installed)
+
+    @override_settings(SLOW_QUERY_LOG_MAX_BYTES=1, SLOW_QUERY_LOG_BACKUPS=2)
+    def test_log_rotates(self):
+        for name in ('Viewer', 'Auditor', 'HR Staff', 'Sales Manager'):
+            self.query(threshold_ms=0, name=name)
+
+        paths = slow_queries.log_paths()
+        self.assertEqual(paths, [self.log, f'{self.log}.1', f'{self.log}.2'])
+        self.assertEqual([len(self.entries(path)) for path in paths], [1, 1, 1])
+        self.assertFalse(os.path.exists(f'{self.log}.3'))
+
+
+@override_settings(REPLICA_PIN_SECONDS=10, REPLICA_MAX_LAG_SECONDS=5, REPLICA_LAG_CHECK_SECONDS=0)
+class ReplicaRoutingTests(SimpleTestCase):
+    """
+    ReplicaMiddleware and ReplicaRouter with a pretend ``replica_1``; the
+    views only ask the router where the ORM would send their queries.
+    """
+    databases = {'default'}
+
+    def setUp(self):
+        cache.clear()
+        for patcher in (
+            mock.patch('apps.common.db_router.replica_aliases', return_value=['replica_1']),
+            mock.patch.object(db_router.monitor, 'is_healthy', return_value=True),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def request(self, method='get', write=False, atomic=False, credential='Bearer alice'):
+        seen = {}
+
+        def view(request):
+            if atomic:
+                with transaction.atomic():
+                    seen['atomic'] = router.db_for_read(Role)
+            seen['before'] = router.db_for_read(Role)
+            if write:
+                seen['write'] = router.db_for_write(Role)
+                seen['after'] = router.db_for_read(Role)
+            return HttpResponse()
+
+        request = getattr(RequestFactory(), method)('/api/roles/', HTTP_AUTHORIZATION=credential)
+        db_router.ReplicaMiddleware(view)(request)
+        return seen
+
+    def test_safe_reads_go_to_a_replica(self):
+        self.assertEqual(self.request(), {'before': 'replica_1'})
+        self.assertEqual(router.db_for_read(Role), 'default')  # outside the middleware
+
+    def test_writes_stay_on_the_primary(self):
+        self.assertEqual(self.request('post'), {'before': 'default'})
+        self.assertEqual(self.request(write=True), {'before': 'replica_1', 'write': 'default', 'after': 'default'})
+
+    def test_transaction_reads_stay_on_the_primary(self):
+        self.assertEqual(self.request(atomic=True), {'atomic': 'default', 'before': 'replica_1'})
+
+    def test_client_reads_its_writes(self):
+        self.request('post', write=True)
+
+        self.assertEqual(self.request()['before'], 'default')
+        self.assertEqual(self.request(credential='Bearer bob')['before'], 'replica_1')
+        self.assertEqual(self.request(credential='')['before'], 'replica_1')
+
+    def test_pin_expires(self):
+        self.request('post', write=True)
+        later = time.time() + 11
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=later):
+            self.assertEqual(self.request()['before'], 'replica_1')
+
+    def test_lagging_replica_is_skipped(self):
+        db_router.monitor.is_healthy.return_value = False
+        self.assertEqual(self.request()['before'], 'default')
+
+
+@override_settings(REPLICA_MAX_LAG_SECONDS=5, REPLICA_LAG_CHECK_SECONDS=0)
+class ReplicationMonitorTests(SimpleTestCase):
+    def test_lag_is_the_time_since_the_replica_fell_behind(self):
+        monitor = db_router.ReplicationMonitor()
+        markers = {'default': 5, 'replica_1': 5}
+        now = [100.0]
+
+        def health(at, primary, replica):
+            now[0] = at
+            markers.update(default=primary, replica_1=replica)
+            return monitor.lag('replica_1'), monitor.is_healthy('replica_1')
+
+        with mock.patch('apps.common.db_router._change_marker', side_effect=markers.get), \
+                mock.patch('apps.common.db_router.time.monotonic', side_effect=lambda: now[0]):
+            self.assertEqual(health(100, 5, 5), (0.0, True))
+            self.assertEqual(health(101, 6, 5), (0.0, True))
+            self.assertEqual(health(104, 6, 5), (3.0, True))
+            self.assertEqual(health(107, 7, 5), (6.0, False))
+            self.assertEqual(health(108, 7, 6), (1.0, True))
+            self.assertEqual(health(109, 7, 7), (0.0, True))
@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import BatchView, BootstrapView, MetricsView, SyncView
+
+urlpatterns = [
+    path('bootstrap/', BootstrapView.as_view(), name='bootstrap'),
+    path('batch/', BatchView.as_view(), name='batch'),
+    path('sync/', SyncView.as_view(), name='sync'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+]
@@ -0,0 +1,57 @@
+"""
+Table-version registry.
+
+Every tracked table has a counter in TableVersion that only ever goes up.
+Anything derived from a set of tables (an ETag, a cached response) can be
+keyed on those counters and is stale as soon as one of them moves.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import TableVersion
+
+
+def bump_table_versions(*names):
+    """
+    Increment the counters for ``names`` once the current transaction commits,
+    so readers never see a new version before the data it describes.
+
+    Names are collected per connection and flushed by the first commit
+    callback, so deleting 50 rows in one transaction still costs a single
+    UPDATE. Names left behind by a rollback are flushed by the next commit,
+    which only over-invalidates.
+    """
+    if not names:
+        return
+    connection = transaction.get_connection()
+    pending = connection.__dict__.setdefault('pending_table_versions', set())
+    pending.update(names)
+    transaction.on_commit(lambda: _flush(pending))
+
+
+def _flush(pending):
+    names = sorted(pending)
+    pending.clear()
+    if names:
+        _bump(names)
+
+
+def _bump(names):
+    updated = TableVersion.objects.filter(name__in=names).update(version=F('version') + 1)
+    if updated == len(names):
+        return
+    existing = set(TableVersion.objects.filter(name__in=names).values_list('name', flat=True))
+    for name in set(names) - existing:
+        try:
+            with transaction.atomic():
+                TableVersion.objects.create(name=name, version=1)
+        except IntegrityError:
+            # Created concurrently by another worker
+            TableVersion.objects.filter(name=name).update(version=F('version') + 1)
+
+
+def get_table_versions(names):
+    """Return {name: version} for ``names``; untracked tables report 0."""
+    versions = dict.fromkeys(names, 0)
+    versions.update(TableVersion.objects.filter(name__in=names).values_list('name', 'version'))
+    return versions
@@ -1,3 +1,339 @@
-from django.shortcuts import render
+import json
+import logging
+from urllib.parse import urlsplit
 
-# Create your views here.
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Prefetch
+from django.http import HttpRequest, HttpResponse, QueryDict
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from drf_spectacular.utils import extend_schema
+from drf_spectacular.views import SCHEMA_KWARGS, SpectacularAPIView
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.departments.models import Department
+from apps.departments.serializers import DepartmentSerializer, department_list_fragments
+from apps.modules.menu import build_menu, build_permission_map, get_merged_permissions, get_platform
+from apps.modules.models import Module
+from apps.modules.serializers import ModuleFlatSerializer
+from apps.modules.snapshot import CATALOG_TABLES, get_catalog
+from apps.roles.models import Role
+from apps.roles.serializers import RoleSerializer, role_list_fragments
+from apps.users.serializers import UserSerializer, user_list_fragments
+
+from . import metrics
+from .authentication import MetricsTokenAuthentication
+from .changelog import oldest_cursor
+from .models import ChangeLog
+from .permissions import CanReadMetrics
+from .schema import get_schema_artifact
+from .versioning import get_table_versions
+
+User = get_user_model()
+logger = logging.getLogger('apps.common.batch')
+
+
+class BootstrapView(APIView):
+    """
+    GET /api/bootstrap/?platform=web|mobile - Everything a client needs right after login
+
+    Replaces the profile → my-menu → roles → departments round trips with a
+    single response built from a fixed number of queries (6, and 2 more
+    when the catalog snapshot is rebuilt), independent of how many roles or
+    modules the user has. The snapshot is checked against the current
+    catalog version, so the menu is never older than the last catalog write.
+
+    Response format:
+    {
+        "profile": {...},                       # same as /api/users/profile/
+        "menu": [...],                          # same as /api/modules/my-menu/
+        "permissions": {"/users": ["view", "export_csv"], ...},
+        "roles": [...],                         # same as /api/roles/
+        "departments": [...]                    # same as /api/departments/
+    }
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        platform = get_platform(request)
+
+        roles_queryset = Role.objects.select_related('department')
+        user = (
+            User.objects
+            .select_related('department')
+            .prefetch_related(Prefetch('roles', queryset=roles_queryset))
+            .get(pk=request.user.pk)
+        )
+        user_roles = list(user.roles.all())
+
+        merged_permissions = {}
+        if user_roles:
+            catalog = get_catalog(get_table_versions(CATALOG_TABLES))
+            merged_permissions = get_merged_permissions(user_roles, platform, catalog)
+
+        return Response({
+            'profile': UserSerializer(user).data,
+            'menu': build_menu(merged_permissions),
+            'permissions': build_permission_map(merged_permissions),
+            'roles': RoleSerializer(roles_queryset, many=True).data,
+            'departments': DepartmentSerializer(Department.objects.all(), many=True).data,
+        })
+
+
+class BatchView(APIView):
+    """
+    POST /api/batch/ - Run several GET requests in one round trip
+
+    Each sub-request is dispatched in-process through the URL resolver and
+    reuses the already-authenticated user, so JWT decoding, middleware and
+    the HTTP connection are paid once for the whole batch. A sub-request
+    that raises is reported as a 500 entry; the other entries still run.
+
+    Request format:
+    {
+        "requests": [
+            {"key": "roles", "path": "/api/roles/"},
+            "/api/departments/"                     # key defaults to the path
+        ]
+    }
+
+    Response format:
+    [
+        {"key": "roles", "status": 200, "body": [...]},
+        {"key": "/api/departments/", "status": 200, "body": [...]}
+    ]
+    """
+    permission_classes = [IsAuthenticated]
+    max_requests = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+
+    def post(self, request):
+        items = request.data.get('requests')
+        if not isinstance(items, list) or not items:
+            return Response({'error': '"requests" must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > self.max_requests:
+            return Response(
+                {'error': f'A batch may contain at most {self.max_requests} requests'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = []
+        for item in items:
+            if isinstance(item, dict):
+                path, key = item.get('path'), item.get('key')
+            else:
+                path, key = item, None
+            if not isinstance(path, str):
+                results.append({'key': key, 'status': status.HTTP_400_BAD_REQUEST, 'body': {'error': 'Invalid path'}})
+                continue
+            try:
+                result_status, body = self._dispatch(request, path)
+            except Exception:
+                # One failing sub-view must not fail the whole batch
+                logger.exception('Batched request to %s failed', path)
+                result_status, body = status.HTTP_500_INTERNAL_SERVER_ERROR, {'error': 'Internal server error'}
+            results.append({'key': key or path, 'status': result_status, 'body': body})
+
+        return Response(results)
+
+    def _dispatch(self, request, path):
+        url = urlsplit(path)
+        if url.scheme or url.netloc or not url.path.startswith('/api/'):
+            return status.HTTP_400_BAD_REQUEST, {'error': 'Only relative /api/ paths can be batched'}
+
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            return status.HTTP_404_NOT_FOUND, {'error': 'Not found'}
+        if getattr(match.func, 'view_class', None) is type(self):
+            return status.HTTP_400_BAD_REQUEST, {'error': 'Batches cannot be nested'}
+
+        sub_request = HttpRequest()
+        sub_request.method = 'GET'
+        sub_request.path = sub_request.path_info = url.path
+        sub_request.GET = QueryDict(url.query)
+        sub_request.COOKIES = request.COOKIES
+        sub_request.META = {
+            key: value for key, value in request.META.items()
+            # The body is embedded in the batch response, so it must not be compressed
+            if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_IF_NONE_MATCH', 'HTTP_ACCEPT_ENCODING')
+        }
+        sub_request.META.update({'REQUEST_METHOD': 'GET', 'PATH_INFO': url.path, 'QUERY_STRING': url.query})
+        sub_request.resolver_match = match
+        # Picked up by DRF's Request: skips re-running the authenticators
+        sub_request.user = request.user
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+
+        view = async_to_sync(match.func) if iscoroutinefunction(match.func) else match.func
+        response = view(sub_request, *match.args, **match.kwargs)
+        if hasattr(response, 'data'):
+            return response.status_code, response.data
+        if hasattr(response, 'render'):
+            response.render()
+        if response.get('Content-Encoding'):
+            return status.HTTP_406_NOT_ACCEPTABLE, {'error': 'Encoded responses cannot be batched'}
+        try:
+            content = response.content.decode(response.charset or 'utf-8')
+        except UnicodeDecodeError:
+            return status.HTTP_406_NOT_ACCEPTABLE, {'error': 'Binary responses cannot be batched'}
+        if response.get('Content-Type', '').startswith('application/json'):
+            return response.status_code, json.loads(content) if content else None
+        return response.status_code, content
+
+
+class SyncView(APIView):
+    """
+    GET /api/sync/?since=<cursor> - Delta feed of users, roles, departments and modules
+
+    Without ``since`` the full tables are returned along with the current
+    cursor. With it, only rows changed after the cursor are sent: upserts
+    as full objects, deletes as bare ids. Clients store the returned cursor
+    and keep calling while ``has_more`` is true. A cursor older than the
+    pruned part of the change log (prune_change_log) gets the full tables
+    again, with ``full`` set.
+
+    Response format:
+    {
+        "cursor": 1042,
+        "has_more": false,
+        "full": false,
+        "changes": {
+            "users": {"upserts": [{...}], "deletes": [17]},
+            "roles": {"upserts": [], "deletes": []},
+            ...
+        }
+    }
+    """
+    permission_classes = [IsAuthenticated]
+    page_size = getattr(settings, 'SYNC_PAGE_SIZE', 1000)
+
+    def get_synced(self):
+        """{change-log model name: callable(pk list or None) → serialized list}"""
+        users = User.objects.select_related('department').prefetch_related('roles__department')
+        roles = Role.objects.select_related('department')
+
+        def serialize_modules(queryset):
+            return ModuleFlatSerializer(queryset, many=True).data
+
+        return {
+            User._meta.db_table: (users, user_list_fragments.serialize_list),
+            Role._meta.db_table: (roles, role_list_fragments.serialize_list),
+            Department._meta.db_table: (Department.objects.all(), department_list_fragments.serialize_list),
+            Module._meta.db_table: (Module.objects.all(), serialize_modules),
+        }
+
+    def get(self, request):
+        since = request.query_params.get('since')
+        if not since:
+            return self._snapshot()
+        try:
+            since = int(since)
+        except ValueError:
+            return Response({'error': '"since" must be an integer cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+        oldest = oldest_cursor()
+        if oldest is not None and since < oldest:
+            # Entries after ``since`` may have been pruned
+            return self._snapshot()
+
+        # Ids become visible in commit order (see apps.common.changelog)
+        synced = self.get_synced()
+        entries = list(
+            ChangeLog.objects
+            .filter(id__gt=since, model__in=synced)
+            .values_list('id', 'model', 'object_id', 'action')[:self.page_size + 1]
+        )
+        has_more = len(entries) > self.page_size
+        entries = entries[:self.page_size]
+
+        # Only the last action per object matters
+        latest = {}
+        for _, model, object_id, action in entries:
+            latest[(model, object_id)] = action
+
+        changes = {}
+        for model, (queryset, serialize) in synced.items():
+            upsert_ids = [oid for (m, oid), action in latest.items() if m == model and action == ChangeLog.UPSERT]
+            deletes = [oid for (m, oid), action in latest.items() if m == model and action == ChangeLog.DELETE]
+            upserts = serialize(queryset.filter(pk__in=upsert_ids)) if upsert_ids else []
+            # Rows deleted after the upsert was logged, in a later page
+            found = {item['id'] for item in upserts}
+            deletes += [oid for oid in upsert_ids if oid not in found]
+            changes[model] = {'upserts': upserts, 'deletes': sorted(deletes)}
+
+        return Response({
+            'cursor': entries[-1][0] if entries else since,
+            'has_more': has_more,
+            'full': False,
+            'changes': changes,
+        })
+
+    def _snapshot(self):
+        # Read the cursor first: anything written while we serialize is
+        # replayed on the next call instead of being lost.
+        cursor = ChangeLog.objects.aggregate(cursor=Max('id'))['cursor'] or 0
+        changes = {
+            model: {'upserts': serialize(queryset), 'deletes': []}
+            for model, (queryset, serialize) in self.get_synced().items()
+        }
+        return Response({'cursor': cursor, 'has_more': False, 'full': True, 'changes': changes})
+
+
+class CachedSchemaView(SpectacularAPIView):
+    """
+    GET /api/schema/  - OpenAPI schema (YAML, or JSON with Accept: application/json)
+
+    Served from the precomputed artifact (see apps.common.schema) instead of
+    introspecting every view per request. JSON is sent pre-gzipped to
+    clients that accept it, and If-None-Match is answered with 304.
+    ?lang= and ?version= are generated live, like SpectacularAPIView.
+    """
+
+    @extend_schema(**SCHEMA_KWARGS)
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('lang') or request.GET.get('version'):
+            return super().get(request, *args, **kwargs)
+
+        artifact = get_schema_artifact()
+        fmt = request.accepted_renderer.format
+        etag = f'"{artifact.digest}-{fmt}"'
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+        elif fmt == 'json' and 'gzip' in request.headers.get('Accept-Encoding', ''):
+            response = HttpResponse(artifact.json_gzip, content_type=request.accepted_media_type)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            body = artifact.json if fmt == 'json' else artifact.yaml
+            response = HttpResponse(body, content_type=request.accepted_media_type)
+
+        if response.status_code == status.HTTP_200_OK:
+            response['Content-Disposition'] = f'inline; filename="{self._get_filename(request, None)}"'
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
+
+
+class MetricsView(APIView):
+    """
+    GET /api/metrics/ - Request metrics of this worker in the Prometheus text format
+
+    Per URL name and method: latency, SQL statements and SQL time per
+    request, response size, requests by status and sampled N+1 detections
+    (see apps.common.middleware.RequestMetricsMiddleware). Staff users, or
+    scrapers sending ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+    authentication_classes = [MetricsTokenAuthentication, JWTAuthentication]
+    permission_classes = [CanReadMetrics]
+
+    @extend_schema(responses={(200, 'text/plain'): str})
+    def get(self, request):
+        return HttpResponse(metrics.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
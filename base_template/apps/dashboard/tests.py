@@ -1,3 +1,29 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
 
-# Create your tests here.
+from apps.common.testing import APITestCase
+
+User = get_user_model()
+
+
+class DashboardStatsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def test_stats(self):
+        response = self.client.get('/api/dashboard/stats/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total_users'], User.objects.count())
+
+    def test_warm_stats_come_from_the_cache(self):
+        self.client.get('/api/dashboard/stats/')
+        with self.assertNumQueries(1):  # table versions for the ETag / cache key
+            self.client.get('/api/dashboard/stats/')
+
+    def test_new_user_is_counted(self):
+        total = self.client.get('/api/dashboard/stats/').json()['total_users']
+        with self.commit():
+            User.objects.create_user(username='new_user', email='new_user@example.com', password='x')
+
+        self.assertEqual(self.client.get('/api/dashboard/stats/').json()['total_users'], total + 1)
@@ -1,9 +1,13 @@
+import asyncio
+
 from rest_framework import status
 from rest_framework.response import Response
-from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 
 from django.contrib.auth import get_user_model
+from apps.common.async_views import AsyncAPIView
+from apps.common.mixins import TableVersionETagMixin
+from apps.common.single_flight import asingle_flight
 from apps.roles.models import Role
 from apps.departments.models import Department
 from apps.modules.models import Module
@@ -11,28 +15,44 @@ from apps.modules.models import Module
 User = get_user_model()
 
 
-class DashboardStatsView(APIView):
+class DashboardStatsView(TableVersionETagMixin, AsyncAPIView):
     """
     GET /api/dashboard/stats/ - Get dashboard statistics
+
+    Async: the counts and the recent users are independent queries and are
+    awaited together with asyncio.gather. The stats are the same for every
+    user and cached under the ETag; after a change one request recomputes
+    them while concurrent ones wait (apps.common.single_flight).
     """
     permission_classes = [IsAuthenticated]
+    etag_tables = ('users', 'roles', 'departments', 'modules')
     
-    def get(self, request):
-        stats = {
-            'total_users': User.objects.count(),
-            'active_users': User.objects.filter(is_active=True).count(),
-            'inactive_users': User.objects.filter(is_active=False).count(),
-            'total_roles': Role.objects.count(),
-            'active_roles': Role.objects.filter(is_active=True).count(),
-            'total_departments': Department.objects.count(),
-            'active_departments': Department.objects.filter(is_active=True).count(),
-            'total_modules': Module.objects.count(),
-            'active_modules': Module.objects.filter(is_active=True).count(),
+    async def get(self, request):
+        return Response(await asingle_flight('dashboard-stats', self.etag, self.compute))
+
+    async def compute(self):
+        counts = {
+            'total_users': User.objects.acount(),
+            'active_users': User.objects.filter(is_active=True).acount(),
+            'inactive_users': User.objects.filter(is_active=False).acount(),
+            'total_roles': Role.objects.acount(),
+            'active_roles': Role.objects.filter(is_active=True).acount(),
+            'total_departments': Department.objects.acount(),
+            'active_departments': Department.objects.filter(is_active=True).acount(),
+            'total_modules': Module.objects.acount(),
+            'active_modules': Module.objects.filter(is_active=True).acount(),
         }
-        
         # Get recent users (last 5)
-        recent_users = User.objects.order_by('-date_joined')[:5]
-        stats['recent_users'] = [
+        recent_users = self._recent_users()
+
+        *values, recent = await asyncio.gather(*counts.values(), recent_users)
+        stats = dict(zip(counts, values))
+        stats['recent_users'] = recent
+        
+        return stats
+
+    async def _recent_users(self):
+        return [
             {
                 'id': user.id,
                 'username': user.username,
@@ -41,7 +61,5 @@ class DashboardStatsView(APIView):
                 'last_name': user.last_name,
                 'date_joined': user.date_joined,
             }
-            for user in recent_users
+            async for user in User.objects.order_by('-date_joined')[:5]
         ]
-        
-        return Response(stats)
\ No newline at end of file
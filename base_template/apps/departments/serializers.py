@@ -1,4 +1,7 @@
 from rest_framework import serializers
+
+from apps.common.fragment_cache import FragmentCache
+
 from .models import Department
 
 
@@ -11,3 +14,6 @@ class DepartmentSerializer(serializers.ModelSerializer):
         model = Department
         fields = ('id', 'name', 'code', 'description', 'is_active', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
+
+
+department_list_fragments = FragmentCache(DepartmentSerializer, variant='list')
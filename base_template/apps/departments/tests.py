@@ -1,3 +1,31 @@
-from django.test import TestCase
+from apps.common.testing import APITestCase
 
-# Create your tests here.
+from .models import Department
+
+
+class DepartmentListTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def test_create_changes_the_etag(self):
+        etag = self.client.get('/api/departments/')['ETag']
+        self.assertEqual(self.client.get('/api/departments/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.commit():
+            response = self.client.post('/api/departments/', {'name': 'Legal', 'code': 'LEGAL'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get('/api/departments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('LEGAL', [department['code'] for department in response.json()])
+
+    def test_rename_refreshes_the_cached_entry(self):
+        self.client.get('/api/departments/')
+        department = Department.objects.get(code='FIN')
+        department.name = 'Finance & Accounting'
+        with self.commit():
+            department.save()
+
+        names = [d['name'] for d in self.client.get('/api/departments/').json()]
+        self.assertIn('Finance & Accounting', names)
@@ -3,21 +3,23 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 
+from apps.common.mixins import TableVersionETagMixin
+
 from .models import Department
-from .serializers import DepartmentSerializer
+from .serializers import DepartmentSerializer, department_list_fragments
 
 
-class DepartmentListCreateView(APIView):
+class DepartmentListCreateView(TableVersionETagMixin, APIView):
     """
     GET  /api/departments/        - List all departments
     POST /api/departments/        - Create new department
     """
     permission_classes = [IsAuthenticated]
+    etag_tables = ('departments',)
     
     def get(self, request):
         departments = Department.objects.all()
-        serializer = DepartmentSerializer(departments, many=True)
-        return Response(serializer.data)
+        return Response(department_list_fragments.serialize_list(departments))
     
     def post(self, request):
         serializer = DepartmentSerializer(data=request.data)
@@ -0,0 +1,337 @@
+"""
+Declarative permission catalog: export the module/permission tree to a
+JSON (or YAML) document and sync a document back into the database.
+
+Catalog format:
+{
+    "default_permissions": [                      # optional, added to every module
+        {"codename": "view", "label": "Can View", "category": "crud", "order": 1}
+    ],
+    "modules": [
+        {
+            "name": "Users", "icon": "user", "path": "/users", "order": 2,
+            "parent": null,                       # parent module *name*
+            "is_active": true, "available_on_web": true, "available_on_mobile": true,
+            "permissions": [
+                {"codename": "export_csv", "label": "Export CSV", "category": "action", "order": 20}
+            ]
+        }
+    ]
+}
+
+Modules are matched by name. Modules missing from the catalog are left
+alone; for every module in the catalog, permissions missing from it are
+deleted. A sync reads the current state in two queries and applies only
+the difference with bulk INSERT/UPDATE/DELETE statements, so running it
+twice is a no-op.
+"""
+import json
+from pathlib import Path
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.common.changelog import record_changes
+from apps.common.versioning import bump_table_versions
+
+from .models import Module, ModulePermission
+from .serializers import module_tree_fragments
+
+
+MODULE_FIELDS = ('icon', 'path', 'order', 'is_active', 'available_on_web', 'available_on_mobile')
+MODULE_DEFAULTS = {'icon': None, 'order': 0, 'is_active': True, 'available_on_web': True, 'available_on_mobile': True}
+PERMISSION_FIELDS = ('label', 'category', 'order')
+
+
+class CatalogError(ValueError):
+    pass
+
+
+# ──────────────────────────────────────────────
+# LOAD / EXPORT
+# ──────────────────────────────────────────────
+
+def load_catalog_file(path):
+    path = Path(path)
+    text = path.read_text(encoding='utf-8')
+    if path.suffix in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise CatalogError('PyYAML is required to read YAML catalogs (pip install pyyaml).')
+        return yaml.safe_load(text)
+    return json.loads(text)
+
+
+def export_catalog():
+    """Current database state as a catalog document."""
+    modules = list(Module.objects.order_by('depth', 'order', 'name'))
+    names = {module.pk: module.name for module in modules}
+    permissions = {}
+    for perm in ModulePermission.objects.order_by('module_id', 'category', 'order', 'codename'):
+        permissions.setdefault(perm.module_id, []).append(
+            {field: getattr(perm, field) for field in ('codename',) + PERMISSION_FIELDS}
+        )
+    return {
+        'modules': [
+            {
+                'name': module.name,
+                **{field: getattr(module, field) for field in MODULE_FIELDS},
+                'parent': names.get(module.parent_id),
+                'permissions': permissions.get(module.pk, []),
+            }
+            for module in modules
+        ],
+    }
+
+
+# ──────────────────────────────────────────────
+# DIFF
+# ──────────────────────────────────────────────
+
+MODULE_TYPES = {
+    'icon': (str, type(None)),
+    'path': str,
+    'order': int,
+    'is_active': bool,
+    'available_on_web': bool,
+    'available_on_mobile': bool,
+    'parent': (str, type(None)),
+}
+PERMISSION_TYPES = {'codename': str, 'label': str, 'category': str, 'order': int}
+
+
+def _check_types(item, types, where):
+    for field, expected in types.items():
+        value = item.get(field)
+        # bool is an int subclass; a flag is never a valid order
+        if field in item and (not isinstance(value, expected) or (expected is int and isinstance(value, bool))):
+            raise CatalogError(f'{where}: "{field}" has the wrong type.')
+
+
+def _permission_list(value, where):
+    if not isinstance(value, list) or not all(isinstance(perm, dict) for perm in value):
+        raise CatalogError(f'{where}: permissions must be a list of objects.')
+    return value
+
+
+def _normalize(catalog):
+    """Validate the document and return {module name: module spec}."""
+    if not isinstance(catalog, dict) or not isinstance(catalog.get('modules'), list):
+        raise CatalogError('A catalog needs a "modules" list.')
+
+    defaults = _permission_list(catalog.get('default_permissions', []), '"default_permissions"')
+    specs = {}
+    for item in catalog['modules']:
+        if not isinstance(item, dict):
+            raise CatalogError('Every module must be an object.')
+        if not isinstance(item.get('name'), str) or not item['name'] or not item.get('path'):
+            raise CatalogError('Every module needs a name and a path.')
+        if item['name'] in specs:
+            raise CatalogError(f'Module "{item["name"]}" is listed twice.')
+        _check_types(item, MODULE_TYPES, f'Module "{item["name"]}"')
+
+        permissions = {}
+        own = _permission_list(item.get('permissions', []), f'Module "{item["name"]}"')
+        for idx, perm in enumerate(defaults + own):
+            if not perm.get('codename') or not perm.get('label'):
+                raise CatalogError(f'Module "{item["name"]}": every permission needs a codename and a label.')
+            _check_types(perm, PERMISSION_TYPES, f'Module "{item["name"]}"')
+            permissions[perm['codename']] = {
+                'label': perm['label'],
+                'category': perm.get('category', 'crud'),
+                'order': perm.get('order', idx + 1),
+            }
+
+        specs[item['name']] = {
+            **{field: item.get(field, MODULE_DEFAULTS.get(field)) for field in MODULE_FIELDS},
+            'parent': item.get('parent'),
+            'permissions': permissions,
+        }
+    return specs
+
+
+def diff_catalog(catalog):
+    """
+    Compare ``catalog`` with the database (2 queries).
+
+    Returns a plan dict that apply_catalog() executes and that is also the
+    human/API-readable dry-run output.
+    """
+    specs = _normalize(catalog)
+    modules = {}
+    duplicates = set()
+    for module in Module.objects.all():
+        if module.name in modules:
+            duplicates.add(module.name)
+        modules[module.name] = module
+    names_by_id = {module.pk: name for name, module in modules.items()}
+
+    # Modules are matched by name, so a name the catalog uses must be unique
+    referenced = set(specs) | {spec['parent'] for spec in specs.values()}
+    ambiguous = sorted(duplicates & referenced)
+    if ambiguous:
+        raise CatalogError('Module names are not unique in the database: ' + ', '.join(ambiguous))
+
+    for name, spec in specs.items():
+        if spec['parent'] is not None and spec['parent'] not in specs and spec['parent'] not in modules:
+            raise CatalogError(f'Module "{name}" has unknown parent "{spec["parent"]}".')
+
+    # Parent chains of the resulting tree: catalog modules take the catalog's
+    # parent, the others keep their current one
+    for name in specs:
+        parent = specs[name]['parent']
+        seen = {name}
+        while parent is not None:
+            if parent in seen:
+                raise CatalogError(f'Module "{name}" is part of a parent cycle.')
+            seen.add(parent)
+            if parent in specs:
+                parent = specs[parent]['parent']
+            else:
+                parent = names_by_id.get(modules[parent].parent_id)
+
+    existing_perms = {}
+    for perm in ModulePermission.objects.filter(module__name__in=specs):
+        existing_perms.setdefault(names_by_id[perm.module_id], {})[perm.codename] = perm
+
+    plan = {
+        'modules': {'create': [], 'update': {}},
+        'permissions': {'create': [], 'update': {}, 'delete': []},
+    }
+
+    for name, spec in specs.items():
+        module = modules.get(name)
+        if module is None:
+            plan['modules']['create'].append(name)
+        else:
+            changes = {
+                field: [getattr(module, field), spec[field]]
+                for field in MODULE_FIELDS if getattr(module, field) != spec[field]
+            }
+            current_parent = names_by_id.get(module.parent_id)
+            if current_parent != spec['parent']:
+                changes['parent'] = [current_parent, spec['parent']]
+            if changes:
+                plan['modules']['update'][name] = changes
+
+        current = existing_perms.get(name, {})
+        for codename, fields in spec['permissions'].items():
+            perm = current.get(codename)
+            if perm is None:
+                plan['permissions']['create'].append(f'{name}.{codename}')
+                continue
+            changes = {
+                field: [getattr(perm, field), value]
+                for field, value in fields.items() if getattr(perm, field) != value
+            }
+            if changes:
+                plan['permissions']['update'][f'{name}.{codename}'] = changes
+        plan['permissions']['delete'] += [
+            f'{name}.{codename}' for codename in current if codename not in spec['permissions']
+        ]
+
+    plan['_specs'] = specs
+    return plan
+
+
+def summarize(plan):
+    """Plan without internals, safe to print or return from the API."""
+    return {key: value for key, value in plan.items() if not key.startswith('_')}
+
+
+def has_changes(plan):
+    return any(bool(changes) for section in summarize(plan).values() for changes in section.values())
+
+
+# ──────────────────────────────────────────────
+# APPLY
+# ──────────────────────────────────────────────
+
+@transaction.atomic
+def apply_catalog(plan):
+    """Execute a plan from diff_catalog() with bulk statements."""
+    if not has_changes(plan):
+        return
+    specs = plan['_specs']
+    modules = {module.name: module for module in Module.objects.select_for_update()}
+    now = timezone.now()
+    touched = []
+
+    # New modules, one bulk INSERT per tree level so parents get ids first
+    pending = list(plan['modules']['create'])
+    while pending:
+        level = [name for name in pending if specs[name]['parent'] is None or specs[name]['parent'] in modules]
+        if not level:
+            raise CatalogError('Unresolvable parent chain: ' + ', '.join(pending))
+        created = Module.objects.bulk_create([
+            Module(
+                name=name,
+                parent=modules.get(specs[name]['parent']),
+                **{field: specs[name][field] for field in MODULE_FIELDS},
+            )
+            for name in level
+        ])
+        for module in created:
+            parent_path = module.parent.tree_path if module.parent_id else ''
+            module.tree_path = f'{parent_path}{module.pk}/'
+            module.depth = module.tree_path.count('/') - 1
+            modules[module.name] = module
+        Module.objects.bulk_update(created, ['tree_path', 'depth'])
+        touched += created
+        pending = [name for name in pending if name not in modules]
+
+    # Changed modules: field updates in one bulk UPDATE, reparents through
+    # save() so the whole subtree path is rewritten
+    updated = []
+    for name, changes in plan['modules']['update'].items():
+        module = modules[name]
+        for field in MODULE_FIELDS:
+            setattr(module, field, specs[name][field])
+        if 'parent' in changes:
+            module.parent = modules.get(specs[name]['parent'])
+            try:
+                module.save()
+            except ValueError as exc:  # moved under its own subtree
+                raise CatalogError(f'Module "{name}": {exc}') from exc
+        else:
+            module.updated_at = now
+            updated.append(module)
+        touched.append(module)
+    if updated:
+        Module.objects.bulk_update(updated, list(MODULE_FIELDS) + ['updated_at'])
+
+    # Permissions: one DELETE, one INSERT ... ON CONFLICT DO UPDATE
+    to_delete = plan['permissions']['delete']
+    if to_delete:
+        by_module = {}
+        for key in to_delete:
+            name, codename = key.split('.', 1)
+            by_module.setdefault(modules[name].pk, []).append(codename)
+        queryset = ModulePermission.objects.none()
+        for module_id, codenames in by_module.items():
+            queryset |= ModulePermission.objects.filter(module_id=module_id, codename__in=codenames)
+        queryset.delete()
+
+    upserts = [
+        ModulePermission(module=modules[name], codename=codename, **specs[name]['permissions'][codename])
+        for name, codename in (
+            key.split('.', 1)
+            for key in plan['permissions']['create'] + list(plan['permissions']['update'])
+        )
+    ]
+    if upserts:
+        ModulePermission.objects.bulk_create(
+            upserts,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['module', 'codename'],
+            update_fields=list(PERMISSION_FIELDS),
+        )
+
+    # Bulk statements skip signals
+    bump_table_versions(Module._meta.db_table, ModulePermission._meta.db_table)
+    if touched:
+        record_changes(Module, [module.pk for module in touched])
+        ancestor_ids = {pk for module in touched for pk in module.get_ancestor_ids()}
+        module_tree_fragments.invalidate(Module.objects.filter(pk__in=ancestor_ids))
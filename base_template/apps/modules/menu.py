@@ -0,0 +1,87 @@
+"""
+Menu building shared by UserMenuView and the post-login bootstrap endpoint.
+"""
+from collections import defaultdict
+
+from .models import RoleModulePermission
+from .snapshot import get_catalog
+
+
+VALID_PLATFORMS = {'web', 'mobile'}
+
+
+def get_platform(request):
+    platform = request.query_params.get('platform')
+    return platform if platform in VALID_PLATFORMS else None
+
+
+def get_merged_permissions(roles, platform=None, catalog=None):
+    """
+    Get all permissions from all roles and merge using OR logic.
+    Returns: {module_id: {'module': ModuleRecord, 'permissions': set()}}
+
+    Modules and codenames come from the catalog snapshot (``catalog``, or
+    the worker's current one); only the roles' grants are queried.
+    """
+    if catalog is None:
+        catalog = get_catalog()
+    merged = {}
+
+    # One row per (module, granted permission id) of any of the roles
+    grants = RoleModulePermission.objects.filter(role__in=roles).values_list('module_id', 'granted_permissions')
+
+    for module_id, permission_id in grants:
+        module = catalog.modules.get(module_id)
+        if module is None or not module.is_active or not module.is_available_on(platform):
+            continue
+
+        if module_id not in merged:
+            merged[module_id] = {
+                'module': module,
+                'permissions': set(),
+            }
+
+        # OR logic: merge all granted permission codenames
+        permission = catalog.permissions.get(permission_id)
+        if permission is not None:
+            merged[module_id]['permissions'].add(permission.codename)
+
+    return merged
+
+
+def build_menu(merged_permissions):
+    """
+    Build hierarchical menu structure from merged permissions.
+    Only includes modules where 'view' permission is granted, and only
+    below ancestors that are themselves visible. Any depth is supported;
+    each module is visited once.
+    """
+    children_of = defaultdict(list)
+    for data in merged_permissions.values():
+        if 'view' in data['permissions']:
+            children_of[data['module'].parent_id].append(data)
+
+    def build_level(parent_id):
+        level = sorted(children_of.get(parent_id, ()), key=lambda x: x['module'].order)
+        return [
+            {
+                'id': data['module'].id,
+                'module_name': data['module'].name,
+                'icon': data['module'].icon,
+                'path': data['module'].path,
+                'order': data['module'].order,
+                'permissions': sorted(data['permissions']),
+                'children': build_level(data['module'].id),
+            }
+            for data in level
+        ]
+
+    return build_level(None)
+
+
+def build_permission_map(merged_permissions):
+    """Flatten merged permissions to {module path: [codenames]}."""
+    return {
+        data['module'].path: sorted(data['permissions'])
+        for data in merged_permissions.values()
+    }
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+def backfill_tree_paths(apps, schema_editor):
+    Module = apps.get_model('modules', 'Module')
+    parents = dict(Module.objects.values_list('id', 'parent_id'))
+
+    paths = {}
+
+    def path_for(pk, seen=()):
+        if pk not in paths:
+            parent_id = parents[pk]
+            if parent_id is None or parent_id in seen:
+                paths[pk] = f'{pk}/'
+            else:
+                paths[pk] = f'{path_for(parent_id, seen + (pk,))}{pk}/'
+        return paths[pk]
+
+    modules = list(Module.objects.only('id', 'parent_id'))
+    for module in modules:
+        module.tree_path = path_for(module.id)
+        module.depth = module.tree_path.count('/') - 1
+    Module.objects.bulk_update(modules, ['tree_path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0003_module_platform_visibility'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='module',
+            name='tree_path',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='module',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_tree_paths, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('modules', '0004_module_tree_path'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['parent', 'order'], name='module_active_children_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(condition=models.Q(('available_on_web', True), ('is_active', True)), fields=['order', 'name'], name='module_active_web_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='module',
+            index=models.Index(condition=models.Q(('available_on_mobile', True), ('is_active', True)), fields=['order', 'name'], name='module_active_mobile_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='modulepermission',
+            index=models.Index(fields=['module', 'category', 'order', 'codename'], name='module_perm_display_idx'),
+        ),
+    ]
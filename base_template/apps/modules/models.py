@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Concat, Substr
 
 
 class Module(models.Model):
@@ -23,16 +25,115 @@ class Module(models.Model):
     available_on_mobile = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # Materialized path of ids from the root, e.g. '1/5/12/' (maintained in save)
+    tree_path = models.CharField(max_length=500, default='', editable=False, db_index=True)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)  # 0 for root modules
     
     class Meta:
         db_table = 'modules'
         verbose_name = 'Module'
         verbose_name_plural = 'Modules'
         ordering = ['order', 'name']
+        indexes = [
+            # Active children of a parent in menu order (menu, matrix, tree)
+            models.Index(
+                fields=['parent', 'order'], condition=Q(is_active=True), name='module_active_children_idx',
+            ),
+            # Active modules per platform (?platform=web|mobile)
+            models.Index(
+                fields=['order', 'name'], condition=Q(is_active=True, available_on_web=True), name='module_active_web_idx',
+            ),
+            models.Index(
+                fields=['order', 'name'], condition=Q(is_active=True, available_on_mobile=True),
+                name='module_active_mobile_idx',
+            ),
+        ]
     
     def __str__(self):
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_parent_id = instance.__dict__.get('parent_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        reparented = getattr(self, '_loaded_parent_id', None) != self.parent_id
+        if self.pk and not reparented and self.tree_path:
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._move_subtree()
+        self._loaded_parent_id = self.parent_id
+
+    def _move_subtree(self):
+        """
+        Recompute this module's path from its parent and rewrite the paths of
+        every descendant with a single prefix-replacing UPDATE.
+        """
+        parent_path = ''
+        if self.parent_id:
+            parent_path = Module.objects.filter(pk=self.parent_id).values_list('tree_path', flat=True).get()
+        old_path = Module.objects.filter(pk=self.pk).values_list('tree_path', flat=True).get()
+        new_path = f'{parent_path}{self.pk}/'
+
+        if old_path and parent_path.startswith(old_path):
+            raise ValueError('A module cannot be moved under itself or one of its descendants.')
+
+        new_depth = new_path.count('/') - 1
+        if not old_path:
+            Module.objects.filter(pk=self.pk).update(tree_path=new_path, depth=new_depth)
+        elif new_path != old_path:
+            old_depth = old_path.count('/') - 1
+            Module.objects.filter(tree_path__startswith=old_path).update(
+                tree_path=Concat(Value(new_path), Substr('tree_path', len(old_path) + 1)),
+                depth=F('depth') + (new_depth - old_depth),
+            )
+        self.tree_path = new_path
+        self.depth = new_depth
+
+    @classmethod
+    def rebuild_tree_paths(cls, using=None):
+        """
+        Recompute tree_path/depth for every module from parent_id and write
+        the rows that differ. Needed after bulk loads that bypass save().
+        Returns the number of rows fixed.
+        """
+        modules = {m.pk: m for m in cls._base_manager.using(using).only('id', 'parent_id', 'tree_path', 'depth')}
+        paths = {}
+
+        def path_for(pk, seen=()):
+            if pk not in paths:
+                parent_id = modules[pk].parent_id
+                if parent_id is None or parent_id in seen or parent_id not in modules:
+                    paths[pk] = f'{pk}/'
+                else:
+                    paths[pk] = f'{path_for(parent_id, seen + (pk,))}{pk}/'
+            return paths[pk]
+
+        stale = []
+        for pk, module in modules.items():
+            path = path_for(pk)
+            if module.tree_path != path:
+                module.tree_path, module.depth = path, path.count('/') - 1
+                stale.append(module)
+        cls._base_manager.using(using).bulk_update(stale, ['tree_path', 'depth'], batch_size=500)
+        return len(stale)
+
+    def get_ancestor_ids(self):
+        """Ids from the root down to (not including) this module."""
+        return [int(pk) for pk in self.tree_path.split('/')[:-2]]
+
+    def get_ancestors(self):
+        return Module.objects.filter(pk__in=self.get_ancestor_ids())
+
+    def get_descendants(self, include_self=False):
+        descendants = Module.objects.filter(tree_path__startswith=self.tree_path)
+        return descendants if include_self else descendants.exclude(pk=self.pk)
+
 
 class ModulePermission(models.Model):
     """
@@ -83,6 +184,10 @@ class ModulePermission(models.Model):
         verbose_name_plural = 'Module Permissions'
         unique_together = ('module', 'codename')
         ordering = ['category', 'order', 'codename']
+        indexes = [
+            # A module's permissions in display order, without a sort
+            models.Index(fields=['module', 'category', 'order', 'codename'], name='module_perm_display_idx'),
+        ]
     
     def __str__(self):
         return f"{self.module.name} → {self.codename}"
@@ -1,4 +1,7 @@
 from rest_framework import serializers
+
+from apps.common.fragment_cache import FragmentCache
+
 from .models import Module, ModulePermission, RoleModulePermission
 
 
@@ -24,11 +27,50 @@ class ModuleSerializer(serializers.ModelSerializer):
         )
         read_only_fields = ('id',)
     
+    def validate_parent(self, parent):
+        module = self.instance
+        if parent and module and parent.tree_path.startswith(module.tree_path or f'{module.pk}/'):
+            raise serializers.ValidationError('A module cannot be moved under itself or one of its descendants.')
+        return parent
+    
     def get_children(self, obj):
         children = obj.children.filter(is_active=True).order_by('order')
         return ModuleSerializer(children, many=True).data
 
 
+class ModuleFlatSerializer(serializers.ModelSerializer):
+    """
+    Module without nested children (parent is an id).
+    Used by the mobile delta sync, which stores modules as flat rows.
+    """
+    class Meta:
+        model = Module
+        fields = (
+            'id',
+            'name',
+            'icon',
+            'path',
+            'parent',
+            'order',
+            'is_active',
+            'available_on_web',
+            'available_on_mobile',
+            'updated_at',
+        )
+
+
+class ModuleNodeSerializer(ModuleFlatSerializer):
+    """
+    One node of the lazily loaded admin tree.
+    Expects child_count / permission_count annotations (see ModuleListCreateView).
+    """
+    child_count = serializers.IntegerField(read_only=True)
+    permission_count = serializers.IntegerField(read_only=True)
+
+    class Meta(ModuleFlatSerializer.Meta):
+        fields = ModuleFlatSerializer.Meta.fields + ('depth', 'child_count', 'permission_count')
+
+
 class ModulePermissionSerializer(serializers.ModelSerializer):
     """
     Serializer for ModulePermission model.
@@ -99,3 +141,28 @@ class UserMenuSerializer(serializers.Serializer):
     order = serializers.IntegerField()
     permissions = serializers.ListField(child=serializers.CharField())
     children = serializers.ListField(default=[])
+
+
+class ModuleReorderSerializer(serializers.Serializer):
+    """
+    Input of POST /api/modules/reorder/.
+    """
+    parent = serializers.IntegerField(allow_null=True, required=False, default=None)
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    
+    def validate_ids(self, value):
+        if len(set(value)) != len(value):
+            raise serializers.ValidationError('Module ids must be unique.')
+        return value
+
+
+class ModuleSubtreeQuerySerializer(serializers.Serializer):
+    """
+    Query parameters of GET /api/modules/?parent=<id>&depth=<n>.
+    """
+    parent = serializers.IntegerField(allow_null=True, required=False, default=None)
+    depth = serializers.IntegerField(min_value=1, required=False, default=1)
+
+
+# Root fragments embed the whole active subtree; see apps.common.signals
+module_tree_fragments = FragmentCache(ModuleSerializer, variant='tree')
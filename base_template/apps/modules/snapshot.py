@@ -0,0 +1,207 @@
+"""
+In-process snapshot of the permission catalog.
+
+The catalog (modules and the permissions each one offers) changes a few
+times a day but is read by every permission-related request. Each worker
+compiles it once into an immutable CatalogSnapshot:
+
+- ModuleRecord / PermissionRecord objects with __slots__; codenames are
+  interned, so equal codenames are one string across the snapshot
+- ``modules`` and ``permissions`` by id (inactive modules included)
+- ``by_path``: active module for each path
+- ``children``: parent id → tuple of its active children in menu order
+  (roots under None)
+- ``path_index``: a trie over the segments of active module paths, so
+  resolve('/users/12/edit') finds the /users module in O(path length)
+
+get_catalog() swaps in a freshly built snapshot when the catalog version
+(the TableVersion counters of modules and module_permissions) differs from
+the one it was built from. Views that already read those counters for
+their ETag pass them in; other callers check them at most every
+CATALOG_SNAPSHOT_CHECK_SECONDS.
+"""
+import sys
+import threading
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+
+from apps.common.versioning import get_table_versions
+
+from .models import Module, ModulePermission
+
+CATALOG_TABLES = (Module._meta.db_table, ModulePermission._meta.db_table)
+
+
+class _Record:
+    __slots__ = ()
+
+    def __init__(self, **values):
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable')
+
+    def __repr__(self):
+        return f'<{type(self).__name__} {self.id}>'
+
+
+class PermissionRecord(_Record):
+    __slots__ = ('id', 'module_id', 'codename', 'label', 'category', 'order')
+
+
+class ModuleRecord(_Record):
+    # Same attribute names as Module, so menu building accepts either
+    __slots__ = (
+        'id', 'name', 'icon', 'path', 'parent_id', 'order', 'is_active',
+        'available_on_web', 'available_on_mobile', 'permissions',
+    )
+
+    def is_available_on(self, platform):
+        if platform == 'web':
+            return self.available_on_web
+        if platform == 'mobile':
+            return self.available_on_mobile
+        return True
+
+
+class PathNode(_Record):
+    __slots__ = ('module', 'children')  # children: path segment → PathNode
+
+
+class CatalogSnapshot(_Record):
+    __slots__ = ('version', 'modules', 'permissions', 'by_path', 'children', 'path_index')
+
+    @property
+    def roots(self):
+        return self.children.get(None, ())
+
+    def resolve(self, path):
+        """
+        Active module owning ``path``: the one with the longest matching
+        path prefix, compared segment by segment ('/users' owns '/users/12'
+        but not '/users-archive'). None when no module matches.
+        """
+        node = self.path_index
+        module = node.module
+        for segment in path_segments(path):
+            node = node.children.get(segment)
+            if node is None:
+                break
+            module = node.module or module
+        return module
+
+
+def path_segments(path):
+    """'/users/12/' → ['users', '12']; empty segments and the query string are dropped."""
+    return [segment for segment in path.split('?', 1)[0].split('/') if segment]
+
+
+def _build_path_index(by_path):
+    # Mutable [module, {segment: node}] while inserting, frozen afterwards
+    root = [None, {}]
+    for path, module in by_path.items():
+        node = root
+        for segment in path_segments(path):
+            node = node[1].setdefault(sys.intern(segment), [None, {}])
+        if node[0] is None:
+            node[0] = module
+
+    def freeze(node):
+        return PathNode(
+            module=node[0],
+            children=MappingProxyType({segment: freeze(child) for segment, child in node[1].items()}),
+        )
+
+    return freeze(root)
+
+
+def catalog_version(versions=None):
+    """(modules, module_permissions) counters, from ``versions`` when the caller has them."""
+    if versions is None or not all(name in versions for name in CATALOG_TABLES):
+        versions = get_table_versions(CATALOG_TABLES)
+    return tuple(versions[name] for name in CATALOG_TABLES)
+
+
+def build_snapshot(versions=None):
+    # The version is read first: data loaded afterwards is at least that new
+    version = catalog_version(versions)
+
+    permissions = {}
+    by_module = {}
+    rows = ModulePermission.objects.order_by('module_id', 'category', 'order', 'codename').values_list(
+        'id', 'module_id', 'codename', 'label', 'category', 'order',
+    )
+    for pk, module_id, codename, label, category, order in rows:
+        record = PermissionRecord(
+            id=pk, module_id=module_id, codename=sys.intern(codename), label=label,
+            category=sys.intern(category), order=order,
+        )
+        permissions[pk] = record
+        by_module.setdefault(module_id, []).append(record)
+
+    modules = {}
+    by_path = {}
+    children = {}
+    rows = Module.objects.order_by('order', 'id').values_list(
+        'id', 'name', 'icon', 'path', 'parent_id', 'order', 'is_active', 'available_on_web', 'available_on_mobile',
+    )
+    for pk, name, icon, path, parent_id, order, is_active, on_web, on_mobile in rows:
+        record = ModuleRecord(
+            id=pk, name=name, icon=icon, path=path, parent_id=parent_id, order=order, is_active=is_active,
+            available_on_web=on_web, available_on_mobile=on_mobile, permissions=tuple(by_module.get(pk, ())),
+        )
+        modules[pk] = record
+        if is_active:
+            by_path.setdefault(path, record)  # duplicate paths: first in menu order wins
+            children.setdefault(parent_id, []).append(record)
+
+    return CatalogSnapshot(
+        version=version,
+        modules=MappingProxyType(modules),
+        permissions=MappingProxyType(permissions),
+        by_path=MappingProxyType(by_path),
+        children=MappingProxyType({parent_id: tuple(records) for parent_id, records in children.items()}),
+        path_index=_build_path_index(by_path),
+    )
+
+
+_snapshot = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_catalog(versions=None):
+    """
+    The current snapshot, rebuilt first if the catalog changed.
+
+    ``versions`` is a {table: version} dict the caller already read (e.g.
+    for an ETag); it must cover CATALOG_TABLES to save the check query.
+    """
+    global _snapshot, _checked_at
+    snapshot = _snapshot
+    if snapshot is not None:
+        if versions is not None and all(name in versions for name in CATALOG_TABLES):
+            if catalog_version(versions) == snapshot.version:
+                return snapshot
+        elif time.monotonic() - _checked_at < getattr(settings, 'CATALOG_SNAPSHOT_CHECK_SECONDS', 1):
+            return snapshot
+        else:
+            _checked_at = time.monotonic()
+            if catalog_version() == snapshot.version:
+                return snapshot
+
+    with _lock:
+        if _snapshot is snapshot:  # not rebuilt by another thread meanwhile
+            _snapshot = build_snapshot(versions)
+            _checked_at = time.monotonic()
+        return _snapshot
+
+
+def reset_catalog():
+    """Drop this worker's snapshot (tests, benchmarks with a fresh database)."""
+    global _snapshot
+    with _lock:
+        _snapshot = None
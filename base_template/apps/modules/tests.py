@@ -1,3 +1,454 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from importlib import import_module
+from io import StringIO
 
-# Create your tests here.
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.common.testing import APITestCase
+from apps.common.versioning import get_table_versions
+from apps.roles.models import Role
+
+from .catalog import export_catalog
+from .models import Module, ModulePermission, RoleModulePermission
+from .serializers import ModuleSerializer
+from .snapshot import CATALOG_TABLES, get_catalog
+
+
+class ModuleTreeTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+        self.users = Module.objects.get(name='Users')
+        self.roles = Module.objects.get(name='Roles')
+        self.archive = Module.objects.create(name='Archive', path='/users/archive', parent=self.users)
+        self.yearly = Module.objects.create(name='Yearly', path='/users/archive/yearly', parent=self.archive)
+
+    def tree(self):
+        response = self.client.get('/api/modules/')
+        self.assertEqual(response.status_code, 200)
+        return {module['name']: module for module in response.json()}
+
+    def test_path_and_depth_on_create(self):
+        self.assertEqual(self.users.tree_path, f'{self.users.pk}/')
+        self.assertEqual(self.users.depth, 0)
+        self.yearly.refresh_from_db()
+        self.assertEqual(self.yearly.tree_path, f'{self.users.pk}/{self.archive.pk}/{self.yearly.pk}/')
+        self.assertEqual(self.yearly.depth, 2)
+        self.assertEqual(self.yearly.get_ancestor_ids(), [self.users.pk, self.archive.pk])
+
+    def test_reparent_rewrites_the_subtree(self):
+        self.archive.parent = self.roles
+        self.archive.save()
+
+        self.yearly.refresh_from_db()
+        self.assertEqual(self.yearly.tree_path, f'{self.roles.pk}/{self.archive.pk}/{self.yearly.pk}/')
+        self.assertEqual(self.yearly.depth, 2)
+        self.assertEqual(set(self.roles.get_descendants()), {self.archive, self.yearly})
+        self.assertFalse(self.users.get_descendants().exists())
+
+    def test_rejects_cycles(self):
+        self.users.parent = self.yearly
+        with self.assertRaises(ValueError):
+            self.users.save()
+        self.users.refresh_from_db()
+        self.assertIsNone(self.users.parent_id)
+
+        serializer = ModuleSerializer(self.archive, data={'parent': self.yearly.pk}, partial=True)
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('parent', serializer.errors)
+        serializer = ModuleSerializer(self.archive, data={'parent': self.archive.pk}, partial=True)
+        self.assertFalse(serializer.is_valid())
+
+    def test_migration_backfill(self):
+        expected = dict(Module.objects.values_list('pk', 'tree_path'))
+        Module.objects.update(tree_path='', depth=0)
+
+        migration = import_module('apps.modules.migrations.0004_module_tree_path')
+        migration.backfill_tree_paths(apps, None)
+
+        self.assertEqual(dict(Module.objects.values_list('pk', 'tree_path')), expected)
+        self.assertEqual(Module.objects.get(pk=self.yearly.pk).depth, 2)
+
+    def test_cached_list_shows_a_new_child(self):
+        self.tree()
+        response = self.client.post(
+            '/api/modules/', {'name': 'Monthly', 'path': '/users/archive/monthly', 'parent': self.archive.pk}, format='json',
+        )
+        self.assertEqual(response.status_code, 201)
+
+        archive = self.tree()['Users']['children'][0]
+        self.assertEqual({child['name'] for child in archive['children']}, {'Yearly', 'Monthly'})
+
+    def test_cached_list_follows_a_reparent(self):
+        self.tree()
+        response = self.client.put(f'/api/modules/{self.yearly.pk}/', {'parent': self.roles.pk}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        tree = self.tree()
+        self.assertEqual(tree['Users']['children'][0]['children'], [])
+        self.assertEqual([child['name'] for child in tree['Roles']['children']], ['Yearly'])
+
+    def test_menu_deeper_than_two_levels(self):
+        viewer = Role.objects.get(name='Viewer')
+        with self.commit():
+            for module in (self.archive, self.yearly):
+                view = ModulePermission.objects.create(module=module, codename='view', label='Can View')
+                grant = RoleModulePermission.objects.create(role=viewer, module=module)
+                grant.granted_permissions.set([view])
+
+        self.login('viewer1')
+        menu = {item['path']: item for item in self.client.get('/api/modules/my-menu/').json()}
+
+        archive, = menu['/users']['children']
+        self.assertEqual(archive['path'], '/users/archive')
+        self.assertEqual([item['path'] for item in archive['children']], ['/users/archive/yearly'])
+
+
+class LazyTreeTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+        self.users = Module.objects.get(name='Users')
+        self.archive = Module.objects.create(name='Archive', path='/users/archive', parent=self.users)
+        Module.objects.create(name='Yearly Reports', path='/users/archive/yearly', parent=self.archive)
+        ModulePermission.objects.create(module=self.archive, codename='view', label='Can View')
+
+    def get(self, **params):
+        return self.client.get('/api/modules/', params)
+
+    def test_children_with_counts(self):
+        response = self.get(parent=self.users.pk)
+
+        self.assertEqual(response.status_code, 200)
+        archive, = response.json()
+        self.assertEqual((archive['name'], archive['depth']), ('Archive', 1))
+        self.assertEqual((archive['child_count'], archive['permission_count']), (1, 1))
+        self.assertEqual(archive['children'], [])
+
+    def test_depth(self):
+        roots = {module['name']: module for module in self.get(depth=3).json()}
+
+        self.assertEqual(set(roots), set(Module.objects.filter(parent=None).values_list('name', flat=True)))
+        self.assertEqual(roots['Users']['child_count'], 1)
+        archive, = roots['Users']['children']
+        self.assertEqual([child['name'] for child in archive['children']], ['Yearly Reports'])
+        self.assertEqual(self.get(parent='null', depth=1).json()[0]['children'], [])
+
+    def test_invalid_parameters(self):
+        for params in ({'parent': 'abc'}, {'depth': 'x'}, {'depth': 0}, {'parent': self.users.pk, 'depth': '1.5'}):
+            with self.subTest(params=params):
+                response = self.get(**params)
+                self.assertEqual(response.status_code, 400)
+                self.assertTrue(set(response.json()) <= {'parent', 'depth'})
+        self.assertEqual(self.get(parent=0).status_code, 404)
+
+    def test_search_nests_matches_under_their_ancestors(self):
+        users, = self.get(search='yearly').json()
+
+        self.assertEqual(users['name'], 'Users')
+        self.assertFalse(users['matched'])
+        archive, = users['children']
+        self.assertFalse(archive['matched'])
+        yearly, = archive['children']
+        self.assertTrue(yearly['matched'])
+        self.assertEqual(yearly['children'], [])
+
+    def test_search_by_path(self):
+        users, = self.get(search='/users/arch').json()
+
+        self.assertTrue(users['children'][0]['matched'])
+        self.assertTrue(users['children'][0]['children'][0]['matched'])
+        self.assertEqual(self.get(search='  ').json(), [])
+
+
+class ReorderTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+        self.roots = list(Module.objects.filter(parent=None).order_by('order').values_list('pk', flat=True))
+
+    def test_reorders_siblings(self):
+        ids = self.roots[::-1]
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post('/api/modules/reorder/', {'parent': None, 'ids': ids}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        updates = [q['sql'] for q in captured.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(list(Module.objects.filter(parent=None).order_by('order').values_list('pk', flat=True)), ids)
+
+    def test_rejects_invalid_ids(self):
+        for ids in (['x'], [], [self.roots[0], self.roots[0]], 'abc', [None]):
+            with self.subTest(ids=ids):
+                response = self.client.post('/api/modules/reorder/', {'parent': None, 'ids': ids}, format='json')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('ids', response.json())
+
+    def test_rejects_modules_of_another_parent(self):
+        child = Module.objects.create(name='Child', path='/users/child', parent_id=self.roots[0])
+        response = self.client.post(
+            '/api/modules/reorder/', {'parent': None, 'ids': [self.roots[1], child.pk]}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Module.objects.get(pk=self.roots[1]).order, 2)
+
+    def test_unknown_parent(self):
+        response = self.client.post('/api/modules/reorder/', {'parent': 0, 'ids': self.roots}, format='json')
+        self.assertEqual(response.status_code, 404)
+
+
+class ModulePermissionUpsertTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def create(self):
+        return self.client.post('/api/modules/create-with-permissions/', {
+            'name': 'Reports',
+            'path': '/reports',
+            'permissions': [
+                {'codename': 'view', 'label': 'Can View'},
+                {'codename': 'export_pdf', 'label': 'Export PDF', 'category': 'action'},
+            ],
+        }, format='json')
+
+    def test_create(self):
+        response = self.create()
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual([p['codename'] for p in data['permissions']], ['export_pdf', 'view'])
+        self.assertTrue(all(p['id'] for p in data['permissions']))
+
+    def test_update_keeps_ids_updates_labels_and_prunes(self):
+        created = self.create().json()
+        ids = {p['codename']: p['id'] for p in created['permissions']}
+
+        response = self.client.put(f'/api/modules/{created["id"]}/update-with-permissions/', {
+            'permissions': [
+                {'codename': 'view', 'label': 'View Reports'},
+                {'codename': 'schedule', 'label': 'Schedule', 'category': 'action'},
+            ],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        permissions = {p['codename']: p for p in response.json()['permissions']}
+        self.assertEqual(set(permissions), {'view', 'schedule'})
+        self.assertEqual(permissions['view']['id'], ids['view'])
+        self.assertEqual(permissions['view']['label'], 'View Reports')
+        self.assertFalse(ModulePermission.objects.filter(pk=ids['export_pdf']).exists())
+
+    def test_repeated_codename_keeps_the_last(self):
+        created = self.create().json()
+        response = self.client.put(f'/api/modules/{created["id"]}/update-with-permissions/', {
+            'permissions': [{'codename': 'view', 'label': 'First'}, {'codename': 'view', 'label': 'Second'}],
+        }, format='json')
+
+        self.assertEqual([p['label'] for p in response.json()['permissions']], ['Second'])
+
+    def test_invalid_permissions(self):
+        response = self.client.post('/api/modules/create-with-permissions/', {
+            'name': 'Reports', 'path': '/reports', 'permissions': [{'codename': 'view'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Module.objects.filter(name='Reports').exists())
+
+
+class CatalogSyncTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def sync(self, catalog, dry_run=False):
+        url = '/api/modules/catalog/' + ('?dry_run=true' if dry_run else '')
+        return self.client.post(url, catalog, format='json')
+
+    def test_export_then_sync_changes_nothing(self):
+        response = self.sync(self.client.get('/api/modules/catalog/').json())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['applied'])
+
+    def test_sync_creates_updates_and_reparents(self):
+        catalog = export_catalog()
+        catalog['modules'].append({
+            'name': 'Reports', 'path': '/reports', 'parent': 'Dashboard',
+            'permissions': [{'codename': 'export_pdf', 'label': 'Export PDF', 'category': 'action'}],
+        })
+        users = next(m for m in catalog['modules'] if m['name'] == 'Users')
+        users['icon'] = 'people'
+
+        self.assertFalse(self.sync(catalog, dry_run=True).json()['applied'])
+        self.assertFalse(Module.objects.filter(name='Reports').exists())
+
+        response = self.sync(catalog)
+
+        self.assertTrue(response.json()['applied'])
+        reports = Module.objects.get(name='Reports')
+        self.assertEqual(reports.parent.name, 'Dashboard')
+        self.assertEqual(Module.objects.get(name='Users').icon, 'people')
+        self.assertIn('export_pdf', set(reports.available_permissions.values_list('codename', flat=True)))
+
+    def test_malformed_documents_are_rejected(self):
+        documents = [
+            {'modules': ['x']},
+            {'modules': {}},
+            {'modules': [], 'default_permissions': {'codename': 'view'}},
+            {'modules': [{'name': 'A', 'path': '/a', 'permissions': 'view'}]},
+            {'modules': [{'name': 'A', 'path': '/a', 'permissions': ['view']}]},
+            {'modules': [{'name': 'A', 'path': '/a', 'order': '1'}]},
+            {'modules': [{'name': 'A', 'path': '/a', 'is_active': 'yes'}]},
+            {'modules': [{'name': 'A', 'path': '/a'}, {'name': 'A', 'path': '/b'}]},
+            {'modules': [{'name': 'A', 'path': '/a', 'parent': 'Missing'}]},
+        ]
+        for catalog in documents:
+            with self.subTest(catalog=catalog):
+                response = self.sync(catalog)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('error', response.json())
+
+    def test_parent_cycle_through_existing_modules(self):
+        dashboard = Module.objects.get(name='Dashboard')
+        Module.objects.create(name='Reports', path='/reports', parent=dashboard)
+
+        response = self.sync({'modules': [{'name': 'Dashboard', 'path': '/dashboard', 'parent': 'Reports'}]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(Module.objects.get(name='Dashboard').parent_id)
+
+    def test_ambiguous_module_names(self):
+        Module.objects.create(name='Users', path='/users-archive')
+
+        response = self.sync({'modules': [{'name': 'Users', 'path': '/users'}]})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_command_round_trip(self):
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+        call_command('sync_permissions', export=path, stdout=StringIO())
+        with open(path, encoding='utf-8') as fh:
+            catalog = json.load(fh)
+        catalog['modules'][0]['permissions'].append({'codename': 'archive', 'label': 'Archive'})
+        with open(path, 'w', encoding='utf-8') as fh:
+            json.dump(catalog, fh)
+
+        call_command('sync_permissions', path, stdout=StringIO())
+
+        module = Module.objects.get(name=catalog['modules'][0]['name'])
+        self.assertTrue(module.available_permissions.filter(codename='archive').exists())
+
+
+class CatalogSnapshotTests(APITestCase):
+    def test_unchanged_versions_reuse_the_snapshot(self):
+        versions = get_table_versions(CATALOG_TABLES)
+        snapshot = get_catalog(versions)
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_catalog(versions), snapshot)
+
+    def test_catalog_write_rebuilds_the_snapshot(self):
+        snapshot = get_catalog(get_table_versions(CATALOG_TABLES))
+        with self.commit():
+            module = Module.objects.create(name='Reports', path='/reports')
+
+        rebuilt = get_catalog(get_table_versions(CATALOG_TABLES))
+
+        self.assertIsNot(rebuilt, snapshot)
+        self.assertIn(module.pk, rebuilt.modules)
+        self.assertNotIn(module.pk, snapshot.modules)
+
+    def test_records_are_immutable(self):
+        snapshot = get_catalog()
+        module = snapshot.by_path['/users']
+        with self.assertRaises(AttributeError):
+            module.name = 'Changed'
+        with self.assertRaises(TypeError):
+            snapshot.modules[0] = module
+
+    def test_resolve_matches_whole_segments(self):
+        users = Module.objects.get(path='/users')
+        child = Module.objects.create(name='Archive', path='/users/archive', parent=users)
+        Module.objects.create(name='Hidden', path='/users/hidden', parent=users, is_active=False)
+        snapshot = get_catalog()
+
+        self.assertEqual(snapshot.resolve('/users').id, users.pk)
+        self.assertEqual(snapshot.resolve('/users/12/edit?tab=1').id, users.pk)
+        self.assertEqual(snapshot.resolve('/users/archive/3').id, child.pk)
+        self.assertEqual(snapshot.resolve('/users/hidden').id, users.pk)
+        self.assertIsNone(snapshot.resolve('/users-archive'))
+        self.assertIsNone(snapshot.resolve('/'))
+
+
+class UserMenuTests(APITestCase):
+    def test_menu_merges_roles(self):
+        self.login('multi_role')
+        menu = self.client.get('/api/modules/my-menu/').json()
+
+        by_path = {item['path']: item for item in menu}
+        self.assertEqual(set(by_path), {'/dashboard', '/users', '/departments', '/modules'})
+        # IT Developer grants view_email, HR Staff view_phone
+        self.assertTrue({'view', 'view_email', 'view_phone'} <= set(by_path['/users']['permissions']))
+
+    def test_warm_menu_and_304(self):
+        self.login('manager_combo')
+        etag = self.client.get('/api/modules/my-menu/')['ETag']
+
+        # table versions, role ids, cached payload
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/modules/my-menu/')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/modules/my-menu/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+class PermissionCheckTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login('manager_combo')
+
+    def check(self, path, perm=None):
+        query = {'path': path} if perm is None else {'path': path, 'perm': perm}
+        return self.client.get('/api/permissions/check/', query)
+
+    def test_resolves_the_owning_module(self):
+        data = self.check('/users/12/edit', 'export_csv').json()
+
+        self.assertEqual(data['module_path'], '/users')
+        self.assertTrue(data['allowed'])
+        self.assertEqual(data['permissions'], sorted(data['permissions']))
+        self.assertNotIn('view_salary', data['permissions'])
+        self.assertFalse(self.check('/users/12/edit', 'view_salary').json()['allowed'])
+
+    def test_unknown_path(self):
+        data = self.check('/nowhere', 'view').json()
+
+        self.assertIsNone(data['module_id'])
+        self.assertEqual(data['permissions'], [])
+        self.assertFalse(data['allowed'])
+
+    def test_path_must_be_absolute(self):
+        self.assertEqual(self.check('users').status_code, 400)
+        self.assertEqual(self.client.get('/api/permissions/check/').status_code, 400)
+
+    def test_grant_change_is_seen_immediately(self):
+        self.assertFalse(self.check('/departments', 'view').json()['allowed'])
+        sales_manager = Role.objects.get(name='Sales Manager')
+        departments = Module.objects.get(path='/departments')
+        with self.commit():
+            grant = sales_manager.module_permissions.create(module=departments)
+            grant.granted_permissions.set(departments.available_permissions.filter(codename='view'))
+
+        self.assertTrue(self.check('/departments', 'view').json()['allowed'])
+
+    def test_warm_query_count(self):
+        self.check('/users/1', 'view')
+        with self.assertNumQueries(1):  # table versions; catalog and grants are cached
+            self.check('/users/1', 'view')
@@ -2,6 +2,8 @@ from django.urls import path
 from .views import (
     ModuleListCreateView,
     ModuleDetailView,
+    ModuleReorderView,
+    PermissionCatalogView,
     ModulePermissionsView,
     ModulePermissionDetailView,
     ModulesWithPermissionsView,
@@ -15,6 +17,10 @@ urlpatterns = [
     # Module CRUD
     path('', ModuleListCreateView.as_view(), name='module-list-create'),
     path('<int:pk>/', ModuleDetailView.as_view(), name='module-detail'),
+    path('reorder/', ModuleReorderView.as_view(), name='module-reorder'),
+    
+    # Declarative permission catalog (export / sync, staff only)
+    path('catalog/', PermissionCatalogView.as_view(), name='permission-catalog'),
     
     # Dynamic menu for logged-in user
     path('my-menu/', UserMenuView.as_view(), name='user-menu'),
@@ -1,28 +1,118 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+
+from apps.common.async_views import AsyncAPIView
+from apps.common.changelog import record_changes
+from apps.common.mixins import TableVersionETagMixin
+from apps.common.single_flight import asingle_flight, single_flight
+from apps.common.versioning import bump_table_versions, get_table_versions
 
+from .catalog import CatalogError, apply_catalog, diff_catalog, export_catalog, has_changes, summarize
+from .menu import build_menu, get_merged_permissions, get_platform
 from .models import Module, ModulePermission, RoleModulePermission
+from .snapshot import CATALOG_TABLES, get_catalog
 from .serializers import (
+    ModuleNodeSerializer,
+    ModuleReorderSerializer,
     ModuleSerializer,
-    ModuleWithPermissionsSerializer,
+    ModuleSubtreeQuerySerializer,
     ModulePermissionSerializer,
     RoleModulePermissionSerializer,
+    module_tree_fragments,
 )
 
+User = get_user_model()
+
+
+def _count_subquery(queryset, field):
+    """Correlated COUNT(*) of ``queryset`` rows whose ``field`` is the outer module."""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(c=Count('pk')).values('c')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
 
-class ModuleListCreateView(APIView):
+class ModuleListCreateView(TableVersionETagMixin, APIView):
     """
     GET  /api/modules/        - List all modules
     POST /api/modules/        - Create new module
+    
+    Lazy tree loading (for large catalogs):
+    GET /api/modules/?parent=<id>&depth=1  - Only the children of <id> (roots when parent is omitted)
+    GET /api/modules/?search=report        - Matching modules nested under their ancestor chain
+    
+    Lazy nodes carry precomputed child_count / permission_count, so the
+    client knows which nodes can be expanded without loading them.
     """
     permission_classes = [IsAuthenticated]
+    etag_tables = ('modules', 'module_permissions')
     
     def get(self, request):
+        params = request.query_params
+        if 'search' in params:
+            return self._search(params['search'].strip())
+        if 'parent' in params or 'depth' in params:
+            query = params.dict()
+            if query.get('parent') in ('', 'null'):
+                query['parent'] = None
+            serializer = ModuleSubtreeQuerySerializer(data=query)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            return self._subtree(**serializer.validated_data)
+        
         modules = Module.objects.filter(parent=None).order_by('order')
-        serializer = ModuleSerializer(modules, many=True)
-        return Response(serializer.data)
+        return Response(module_tree_fragments.serialize_list(modules))
+    
+    def _annotated(self):
+        return Module.objects.annotate(
+            child_count=_count_subquery(Module.objects.all(), 'parent'),
+            permission_count=_count_subquery(ModulePermission.objects.all(), 'module'),
+        )
+    
+    def _nest(self, modules, root_parent_id, matched_ids=None):
+        """Serialize ``modules`` once and hang each node under its parent."""
+        nodes = ModuleNodeSerializer(modules, many=True).data
+        children_of = defaultdict(list)
+        for module, data in zip(modules, nodes):
+            if matched_ids is not None:
+                data['matched'] = module.pk in matched_ids
+            children_of[module.parent_id].append(data)
+        for data in nodes:
+            data['children'] = children_of.get(data['id'], [])
+        return children_of.get(root_parent_id, [])
+    
+    def _subtree(self, parent, depth):
+        if parent is not None:
+            try:
+                parent = Module.objects.get(pk=parent)
+            except Module.DoesNotExist:
+                return Response({'error': 'Module not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        base_depth = parent.depth + 1 if parent else 0
+        modules = self._annotated().filter(depth__gte=base_depth, depth__lt=base_depth + depth)
+        if parent:
+            modules = modules.filter(tree_path__startswith=parent.tree_path)
+        modules = list(modules.order_by('depth', 'order', 'name'))
+        return Response(self._nest(modules, parent.pk if parent else None))
+    
+    def _search(self, term):
+        if not term:
+            return Response([])
+        matches = Module.objects.filter(Q(name__icontains=term) | Q(path__icontains=term))
+        matched_ids = set()
+        chain_ids = set()
+        for pk, tree_path in matches.values_list('pk', 'tree_path'):
+            matched_ids.add(pk)
+            chain_ids.update(int(ancestor) for ancestor in tree_path.split('/')[:-2])
+        modules = list(self._annotated().filter(pk__in=matched_ids | chain_ids).order_by('depth', 'order', 'name'))
+        return Response(self._nest(modules, None, matched_ids))
     
     def post(self, request):
         serializer = ModuleSerializer(data=request.data)
@@ -71,6 +161,87 @@ class ModuleDetailView(APIView):
         return Response({'message': 'Module deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
 
+class ModuleReorderView(APIView):
+    """
+    POST /api/modules/reorder/  - Reorder the children of one parent in a single UPDATE
+    
+    Request format:
+    {
+        "parent": 2,              # null for root modules
+        "ids": [7, 5, 6]          # new order; position i gets order i + 1
+    }
+    
+    Every id must be a child of ``parent``. Siblings left out keep their order.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        serializer = ModuleReorderSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        parent_id = serializer.validated_data['parent']
+        ids = serializer.validated_data['ids']
+        
+        parent = None
+        if parent_id is not None:
+            try:
+                parent = Module.objects.get(pk=parent_id)
+            except Module.DoesNotExist:
+                return Response({'error': 'Parent module not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        siblings = Module.objects.filter(parent=parent, pk__in=ids)
+        with transaction.atomic():
+            updated = siblings.update(
+                order=Case(*[When(pk=pk, then=Value(position)) for position, pk in enumerate(ids, start=1)]),
+                updated_at=timezone.now(),
+            )
+            if updated != len(ids):
+                transaction.set_rollback(True)
+                return Response({'error': 'Every id must be a child of the given parent'}, status=status.HTTP_400_BAD_REQUEST)
+            
+            # .update() skips signals: bump versions / sync feed / fragments once here
+            bump_table_versions(Module._meta.db_table)
+            record_changes(Module, ids)
+            if parent:
+                module_tree_fragments.invalidate(parent.get_ancestors() | Module.objects.filter(pk=parent.pk))
+        
+        return Response({'message': 'Modules reordered successfully'})
+
+
+class PermissionCatalogView(APIView):
+    """
+    GET  /api/modules/catalog/               - Export modules and permissions as a catalog document
+    POST /api/modules/catalog/               - Sync the database with a catalog document
+    POST /api/modules/catalog/?dry_run=true  - Return the diff without applying it
+    
+    Request format: see apps/modules/catalog.py
+    
+    Response format:
+    {
+        "applied": true,
+        "changes": {
+            "modules": {"create": ["Reports"], "update": {"Users": {"path": ["/users", "/people"]}}},
+            "permissions": {"create": ["Reports.view"], "update": {}, "delete": ["Users.export_pdf"]}
+        }
+    }
+    """
+    permission_classes = [IsAdminUser]
+    
+    def get(self, request):
+        return Response(export_catalog())
+    
+    def post(self, request):
+        try:
+            plan = diff_catalog(request.data)
+            dry_run = request.query_params.get('dry_run', '').lower() in ('1', 'true', 'yes')
+            applied = has_changes(plan) and not dry_run
+            if applied:
+                apply_catalog(plan)
+        except CatalogError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'applied': applied, 'changes': summarize(plan)})
+
+
 class ModulePermissionsView(APIView):
     """
     GET  /api/modules/<id>/permissions/  - Get all available permissions for a module
@@ -135,22 +306,56 @@ class ModulePermissionDetailView(APIView):
         return Response({'message': 'Permission deleted successfully'}, status=status.HTTP_204_NO_CONTENT)
 
 
-class ModulesWithPermissionsView(APIView):
+class ModulesWithPermissionsView(TableVersionETagMixin, APIView):
     """
     GET /api/modules/all-with-permissions/  - Get all modules with their available permissions
     
     Used by the Role Permissions assignment screen to show what can be toggled.
     Groups permissions by category for clean UI rendering.
+
+    The payload is built from the catalog snapshot (apps.modules.snapshot)
+    and cached under the ETag; after a change one request rebuilds it while
+    concurrent ones wait (apps.common.single_flight).
     """
     permission_classes = [IsAuthenticated]
+    etag_tables = ('modules', 'module_permissions')
     
     def get(self, request):
-        modules = Module.objects.filter(parent=None, is_active=True).order_by('order')
-        serializer = ModuleWithPermissionsSerializer(modules, many=True)
-        return Response(serializer.data)
+        return Response(single_flight('modules-with-permissions', self.etag, self.build))
 
+    def build(self):
+        catalog = get_catalog(self.table_versions)
+        return [_catalog_module_data(catalog, module) for module in catalog.roots]
 
-class UserMenuView(APIView):
+
+def _catalog_module_data(catalog, module):
+    """ModuleWithPermissionsSerializer output, from snapshot records."""
+    return {
+        'id': module.id,
+        'name': module.name,
+        'icon': module.icon,
+        'path': module.path,
+        'parent': module.parent_id,
+        'order': module.order,
+        'is_active': module.is_active,
+        'available_on_web': module.available_on_web,
+        'available_on_mobile': module.available_on_mobile,
+        'available_permissions': [
+            {
+                'id': perm.id,
+                'module': perm.module_id,
+                'codename': perm.codename,
+                'label': perm.label,
+                'category': perm.category,
+                'order': perm.order,
+            }
+            for perm in module.permissions
+        ],
+        'children': [_catalog_module_data(catalog, child) for child in catalog.children.get(module.id, ())],
+    }
+
+
+class UserMenuView(TableVersionETagMixin, AsyncAPIView):
     """
     GET /api/modules/my-menu/  - Get logged-in user's accessible menu
     
@@ -163,124 +368,192 @@ class UserMenuView(APIView):
         "module_name": "Users",
         "permissions": ["view", "add", "edit", "view_email", "export_csv"]
     }
+
+    Menus are cached under the ETag (roles, platform, table versions), so
+    users with the same roles share one; after a permission save one
+    request rebuilds it while concurrent ones wait.
     """
     permission_classes = [IsAuthenticated]
-    VALID_PLATFORMS = {'web', 'mobile'}
+    etag_tables = (
+        'modules',
+        'module_permissions',
+        'role_module_permissions',
+        'role_module_permissions_granted_permissions',
+    )
+    etag_per_role = True
     
-    def get(self, request):
+    async def get(self, request):
+        menu = await asingle_flight('menu', self.etag, lambda: self.build(request))
+        return Response(menu)
+
+    def build(self, request):
         user = request.user
-        platform = self._get_platform(request)
+        platform = get_platform(request)
         
         # Get all user's roles
-        user_roles = user.roles.all()
+        user_roles = list(user.roles.all())
         
         # If user has no roles, return empty menu
-        if not user_roles.exists():
-            return Response([])
+        if not user_roles:
+            return []
         
         # Get all permissions for ALL user's roles and merge them
-        merged_permissions = self._get_merged_permissions(user_roles, platform)
+        merged_permissions = get_merged_permissions(user_roles, platform, get_catalog(self.table_versions))
         
         # Build menu from merged permissions
-        menu = self._build_menu(merged_permissions)
-        
-        return Response(menu)
-    
-    def _get_platform(self, request):
-        platform = request.query_params.get('platform')
-        return platform if platform in self.VALID_PLATFORMS else None
+        return build_menu(merged_permissions)
 
-    def _get_merged_permissions(self, roles, platform=None):
-        """
-        Get all permissions from all roles and merge using OR logic.
-        Returns: {module_id: {'module': Module, 'permissions': set()}}
-        """
-        merged = {}
-        
-        # Get all RoleModulePermissions for all user roles, with related data
-        filters = {
-            'role__in': roles,
-            'module__is_active': True,
+
+class PermissionCheckView(APIView):
+    """
+    GET /api/permissions/check/?path=/users&perm=export_csv  - Authorize the logged-in user by route
+
+    The path is resolved through the catalog snapshot's path index to the
+    module with the longest matching prefix, so sub-routes such as
+    /users/12/edit are checked against /users. ``perm`` is optional;
+    without it only the granted codenames are returned. ``platform``
+    (web|mobile) hides modules not available there, as in the menu.
+
+    Response format:
+    {
+        "path": "/users",
+        "module_id": 2,                          # null when no module owns the path
+        "module_path": "/users",
+        "permissions": ["add", "export_csv", "view"],
+        "allowed": true                          # only when perm is given
+    }
+
+    The user's merged grants are cached per user under the table versions
+    they depend on, so a warm check costs a single version read and the
+    lookup itself runs no queries.
+    """
+    permission_classes = [IsAuthenticated]
+    version_tables = CATALOG_TABLES + (
+        User.roles.through._meta.db_table,
+        RoleModulePermission._meta.db_table,
+        RoleModulePermission.granted_permissions.through._meta.db_table,
+    )
+
+    def get(self, request):
+        path = request.query_params.get('path', '').strip()
+        if not path.startswith('/'):
+            return Response(
+                {'error': '"path" must be an absolute route, e.g. /users'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        perm = request.query_params.get('perm')
+        platform = get_platform(request)
+
+        versions = get_table_versions(self.version_tables)
+        catalog = get_catalog(versions)
+        key = f'{request.user.pk}:' + ','.join(str(versions[name]) for name in self.version_tables)
+        grants = single_flight('permission-grants', key, lambda: self.build(request.user, catalog))
+
+        module = catalog.resolve(path)
+        if module is not None and not module.is_available_on(platform):
+            module = None
+        permissions = grants.get(module.id, ()) if module is not None else ()
+
+        data = {
+            'path': path,
+            'module_id': module.id if module is not None else None,
+            'module_path': module.path if module is not None else None,
+            'permissions': list(permissions),
         }
-        if platform == 'web':
-            filters['module__available_on_web'] = True
-        elif platform == 'mobile':
-            filters['module__available_on_mobile'] = True
-
-        role_module_perms = RoleModulePermission.objects.filter(
-            **filters
-        ).select_related('module').prefetch_related('granted_permissions')
-        
-        for rmp in role_module_perms:
-            module_id = rmp.module.id
-            
-            if module_id not in merged:
-                merged[module_id] = {
-                    'module': rmp.module,
-                    'permissions': set(),
-                }
-            
-            # OR logic: merge all granted permission codenames
-            for perm in rmp.granted_permissions.all():
-                merged[module_id]['permissions'].add(perm.codename)
-        
-        return merged
-    
-    def _build_menu(self, merged_permissions):
-        """
-        Build hierarchical menu structure from merged permissions.
-        Only includes modules where 'view' permission is granted.
-        """
-        menu = []
-        
-        # Get parent modules that have 'view' permission
-        parent_modules = [
-            data for module_id, data in merged_permissions.items()
-            if 'view' in data['permissions'] and data['module'].parent is None
-        ]
-        parent_modules.sort(key=lambda x: x['module'].order)
-        
-        for parent_data in parent_modules:
-            parent_module = parent_data['module']
-            
-            # Get children
-            children = []
-            child_modules = [
-                data for module_id, data in merged_permissions.items()
-                if 'view' in data['permissions'] and data['module'].parent_id == parent_module.id
-            ]
-            
-            # Sort children by order
-            child_modules.sort(key=lambda x: x['module'].order)
-            
-            for child_data in child_modules:
-                child_module = child_data['module']
-                children.append({
-                    'id': child_module.id,
-                    'module_name': child_module.name,
-                    'icon': child_module.icon,
-                    'path': child_module.path,
-                    'order': child_module.order,
-                    'permissions': sorted(child_data['permissions']),
-                })
-            
-            menu.append({
-                'id': parent_module.id,
-                'module_name': parent_module.name,
-                'icon': parent_module.icon,
-                'path': parent_module.path,
-                'order': parent_module.order,
-                'permissions': sorted(parent_data['permissions']),
-                'children': children,
-            })
+        if perm is not None:
+            data['allowed'] = perm in permissions
+        return Response(data)
+
+    def build(self, user, catalog):
+        """{module_id: sorted codenames} granted to ``user`` by any of their roles."""
+        user_roles = list(user.roles.all())
+        if not user_roles:
+            return {}
+        merged = get_merged_permissions(user_roles, catalog=catalog)
+        return {module_id: tuple(sorted(data['permissions'])) for module_id, data in merged.items()}
+
+
+def _validate_permissions_data(permissions_data):
+    if not isinstance(permissions_data, list):
+        return {'permissions': ['Expected a list of permissions.']}
+    for perm in permissions_data:
+        if not isinstance(perm, dict) or not perm.get('codename') or not perm.get('label'):
+            return {'permissions': ['Every permission needs a codename and a label.']}
+    return None
+
+
+def _upsert_module_permissions(module, permissions_data, prune=False):
+    """
+    Insert or update ``permissions_data`` for ``module`` with a single
+    INSERT ... ON CONFLICT (module, codename) DO UPDATE and, with ``prune``,
+    delete every codename not in the list with one DELETE.
+    Returns the resulting ModulePermission objects (ids included).
+    """
+    by_codename = {}
+    for idx, perm in enumerate(permissions_data):
+        # A repeated codename would hit the same row twice in one statement; last one wins
+        by_codename[perm['codename']] = ModulePermission(
+            module=module,
+            codename=perm['codename'],
+            label=perm['label'],
+            category=perm.get('category', 'crud'),
+            order=perm.get('order', idx + 1),
+        )
+    permissions = list(by_codename.values())
+    
+    if prune:
+        module.available_permissions.exclude(codename__in=by_codename).delete()
+    if permissions:
+        ModulePermission.objects.bulk_create(
+            permissions,
+            update_conflicts=True,
+            unique_fields=['module', 'codename'],
+            update_fields=['label', 'category', 'order'],
+        )
+        # bulk_create skips post_save, so bump the catalog version by hand
+        bump_table_versions(ModulePermission._meta.db_table)
         
-        return menu
+        if any(perm.pk is None for perm in permissions):
+            # Backends that cannot return ids from an upsert
+            ids = dict(module.available_permissions.values_list('codename', 'id'))
+            for perm in permissions:
+                perm.pk = ids.get(perm.codename)
     
+    return permissions
+
+
+def _module_with_permissions_data(module, permissions):
+    return {
+        'id': module.id,
+        'name': module.name,
+        'icon': module.icon,
+        'path': module.path,
+        'parent': module.parent_id,
+        'order': module.order,
+        'is_active': module.is_active,
+        'available_on_web': module.available_on_web,
+        'available_on_mobile': module.available_on_mobile,
+        'permissions': [
+            {
+                'id': perm.pk,
+                'codename': perm.codename,
+                'label': perm.label,
+                'category': perm.category,
+                'order': perm.order,
+            }
+            # Same as ModulePermission.Meta.ordering
+            for perm in sorted(permissions, key=lambda p: (p.category, p.order, p.codename))
+        ],
+    }
+
+
 class ModuleCreateWithPermissionsView(APIView):
     """
     POST /api/modules/create-with-permissions/
     
     Creates a module along with its available permissions in one request.
+    Runs in a single transaction: the module INSERT plus one bulk INSERT
+    for all permissions.
     
     Request format:
     {
@@ -302,36 +575,21 @@ class ModuleCreateWithPermissionsView(APIView):
         data = request.data
         permissions_data = data.pop('permissions', [])
         
+        errors = _validate_permissions_data(permissions_data)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        
         # Create module
         serializer = ModuleSerializer(data=data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        module = serializer.save()
-        
-        # Create permissions
-        for idx, perm in enumerate(permissions_data):
-            ModulePermission.objects.create(
-                module=module,
-                codename=perm.get('codename'),
-                label=perm.get('label'),
-                category=perm.get('category', 'crud'),
-                order=perm.get('order', idx + 1),
-            )
+        with transaction.atomic():
+            module = serializer.save()
+            permissions = _upsert_module_permissions(module, permissions_data)
         
         # Return module with permissions
-        return Response({
-            'id': module.id,
-            'name': module.name,
-            'icon': module.icon,
-            'path': module.path,
-            'parent': module.parent_id,
-            'order': module.order,
-            'is_active': module.is_active,
-            'available_on_web': module.available_on_web,
-            'available_on_mobile': module.available_on_mobile,
-            'permissions': list(module.available_permissions.values('id', 'codename', 'label', 'category', 'order')),
-        }, status=status.HTTP_201_CREATED)
+        return Response(_module_with_permissions_data(module, permissions), status=status.HTTP_201_CREATED)
 
 
 class ModuleUpdateWithPermissionsView(APIView):
@@ -340,6 +598,8 @@ class ModuleUpdateWithPermissionsView(APIView):
     
     Updates a module along with its available permissions.
     Permissions not in the list will be removed.
+    Runs in a single transaction: module UPDATE, one DELETE for removed
+    codenames and one bulk upsert for the rest.
     """
     permission_classes = [IsAuthenticated]
     
@@ -352,48 +612,27 @@ class ModuleUpdateWithPermissionsView(APIView):
         data = request.data
         permissions_data = data.pop('permissions', None)
         
+        if permissions_data is not None:
+            errors = _validate_permissions_data(permissions_data)
+            if errors:
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+        
         # Update module
         serializer = ModuleSerializer(module, data=data, partial=True)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        module = serializer.save()
-        
-        # Update permissions if provided
-        if permissions_data is not None:
-            # Get existing permission codenames
-            existing_codenames = set(module.available_permissions.values_list('codename', flat=True))
-            new_codenames = set(p.get('codename') for p in permissions_data)
+        with transaction.atomic():
+            module = serializer.save()
             
-            # Delete removed permissions
-            to_delete = existing_codenames - new_codenames
-            module.available_permissions.filter(codename__in=to_delete).delete()
-            
-            # Add/update permissions
-            for idx, perm in enumerate(permissions_data):
-                ModulePermission.objects.update_or_create(
-                    module=module,
-                    codename=perm.get('codename'),
-                    defaults={
-                        'label': perm.get('label'),
-                        'category': perm.get('category', 'crud'),
-                        'order': perm.get('order', idx + 1),
-                    }
-                )
+            # Update permissions if provided
+            if permissions_data is not None:
+                permissions = _upsert_module_permissions(module, permissions_data, prune=True)
+            else:
+                permissions = list(module.available_permissions.all())
         
         # Return module with permissions
-        return Response({
-            'id': module.id,
-            'name': module.name,
-            'icon': module.icon,
-            'path': module.path,
-            'parent': module.parent_id,
-            'order': module.order,
-            'is_active': module.is_active,
-            'available_on_web': module.available_on_web,
-            'available_on_mobile': module.available_on_mobile,
-            'permissions': list(module.available_permissions.values('id', 'codename', 'label', 'category', 'order')),
-        })
+        return Response(_module_with_permissions_data(module, permissions))
 
 
 class ModuleDetailWithPermissionsView(APIView):
@@ -1,4 +1,7 @@
 from rest_framework import serializers
+
+from apps.common.fragment_cache import FragmentCache
+
 from .models import Role
 
 
@@ -13,3 +16,6 @@ class RoleSerializer(serializers.ModelSerializer):
         model = Role
         fields = ('id', 'name', 'description', 'department', 'department_name',  'is_active', 'created_at', 'updated_at')
         read_only_fields = ('id', 'created_at', 'updated_at')
+
+
+role_list_fragments = FragmentCache(RoleSerializer, variant='list')
@@ -1,3 +1,57 @@
-from django.test import TestCase
+from apps.common.testing import APITestCase
+from apps.modules.models import Module
 
-# Create your tests here.
+from .models import Role
+
+
+class RolePermissionsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+        self.role = Role.objects.get(name='HR Staff')
+
+    def get_tree(self):
+        response = self.client.get(f'/api/roles/{self.role.pk}/permissions/')
+        self.assertEqual(response.status_code, 200)
+        return {item['module_name']: item for item in response.json()}
+
+    def test_lists_every_module_with_the_role_grants(self):
+        tree = self.get_tree()
+
+        self.assertEqual(set(tree), set(Module.objects.filter(parent=None).values_list('name', flat=True)))
+        self.assertEqual(set(tree['Users']['granted_permissions']), {'view', 'view_email', 'view_phone'})
+        self.assertEqual(tree['Roles']['granted_permissions'], [])
+        self.assertIn('export_csv', [perm['codename'] for perm in tree['Users']['available_permissions']])
+
+    def test_save_replaces_the_grants(self):
+        users = Module.objects.get(name='Users')
+        roles = Module.objects.get(name='Roles')
+
+        response = self.client.post(f'/api/roles/{self.role.pk}/permissions/', {'permissions': [
+            {'module_id': users.pk, 'granted': ['view']},
+            {'module_id': roles.pk, 'granted': ['view', 'not_a_permission']},
+        ]}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        tree = self.get_tree()
+        self.assertEqual(tree['Users']['granted_permissions'], ['view'])
+        self.assertEqual(tree['Roles']['granted_permissions'], ['view'])
+
+    def test_new_module_is_listed_right_away(self):
+        self.get_tree()
+        with self.commit():
+            parent = Module.objects.get(name='Users')
+            Module.objects.create(name='Archive', path='/users/archive', parent=parent)
+
+        children = self.get_tree()['Users']['children']
+
+        self.assertEqual([child['module_name'] for child in children], ['Archive'])
+
+    def test_warm_query_count(self):
+        self.get_tree()
+        # role, catalog versions, grants
+        with self.assertNumQueries(3):
+            self.get_tree()
+
+    def test_unknown_role(self):
+        self.assertEqual(self.client.get('/api/roles/0/permissions/').status_code, 404)
@@ -1,24 +1,29 @@
+from collections import defaultdict
+
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
+from apps.common.mixins import TableVersionETagMixin
+from apps.common.versioning import get_table_versions
 from apps.modules.models import Module, ModulePermission, RoleModulePermission
+from apps.modules.snapshot import CATALOG_TABLES, get_catalog
 
 from .models import Role
-from .serializers import RoleSerializer
+from .serializers import RoleSerializer, role_list_fragments
 
 
-class RoleListCreateView(APIView):
+class RoleListCreateView(TableVersionETagMixin, APIView):
     """
     GET  /api/roles/        - List all roles
     POST /api/roles/        - Create new role
     """
     permission_classes = [IsAuthenticated]
+    etag_tables = ('roles', 'departments')
     
     def get(self, request):
-        roles = Role.objects.all()
-        serializer = RoleSerializer(roles, many=True)
-        return Response(serializer.data)
+        roles = Role.objects.select_related('department')
+        return Response(role_list_fragments.serialize_list(roles))
     
     def post(self, request):
         serializer = RoleSerializer(data=request.data)
@@ -103,34 +108,21 @@ class RolePermissionsView(APIView):
         except Role.DoesNotExist:
             return Response({'error': 'Role not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Get all active modules
-        modules = Module.objects.filter(is_active=True, parent=None).order_by('order')
+        # Modules come from the catalog snapshot, checked against the current
+        # catalog version: an editor sees a module right after creating it
+        catalog = get_catalog(get_table_versions(CATALOG_TABLES))
+        granted_ids = defaultdict(set)
+        grants = RoleModulePermission.objects.filter(role=role).values_list('module_id', 'granted_permissions')
+        for module_id, permission_id in grants:
+            granted_ids[module_id].add(permission_id)
         
-        permissions_data = []
-        for module in modules:
-            module_data = self._get_module_permission_data(role, module)
-            
-            # Get children
-            children_data = []
-            children = module.children.filter(is_active=True).order_by('order')
-            for child in children:
-                children_data.append(self._get_module_permission_data(role, child))
-            
-            module_data['children'] = children_data
-            permissions_data.append(module_data)
-        
-        return Response(permissions_data)
+        return Response([
+            self._get_module_permission_data(catalog, granted_ids, module) for module in catalog.roots
+        ])
     
-    def _get_module_permission_data(self, role, module):
-        """Build permission data for a single module."""
-        # Get all available permissions for this module
-        available = module.available_permissions.all().order_by('category', 'order')
-        
-        # Get granted permissions for this role-module
-        rmp = RoleModulePermission.objects.filter(role=role, module=module).first()
-        granted_codenames = []
-        if rmp:
-            granted_codenames = list(rmp.granted_permissions.values_list('codename', flat=True))
+    def _get_module_permission_data(self, catalog, granted_ids, module):
+        """Build permission data for a module and its active children."""
+        granted = granted_ids.get(module.id, ())
         
         return {
             'module_id': module.id,
@@ -144,9 +136,13 @@ class RolePermissionsView(APIView):
                     'label': perm.label,
                     'category': perm.category,
                 }
-                for perm in available
+                for perm in module.permissions
+            ],
+            'granted_permissions': [perm.codename for perm in module.permissions if perm.id in granted],
+            'children': [
+                self._get_module_permission_data(catalog, granted_ids, child)
+                for child in catalog.children.get(module.id, ())
             ],
-            'granted_permissions': granted_codenames,
         }
     
     def post(self, request, pk):
@@ -35,6 +35,10 @@ class User(AbstractUser):
         db_table = 'users'
         verbose_name = 'User'
         verbose_name_plural = 'Users'
+        indexes = [
+            models.Index(fields=['-date_joined'], name='user_date_joined_idx'),  # recent users
+            models.Index(fields=['is_active'], name='user_is_active_idx'),       # active/inactive counts
+        ]
     
     def __str__(self):
         return self.username
\ No newline at end of file
@@ -2,6 +2,7 @@ from django.contrib.auth import get_user_model
 from django.db import transaction
 from rest_framework import serializers
 
+from apps.common.fragment_cache import FragmentCache
 from apps.roles.serializers import RoleSerializer
 from apps.departments.serializers import DepartmentSerializer
 from apps.roles.models import Role
@@ -143,3 +144,6 @@ class UserSerializer(serializers.ModelSerializer):
         
         instance.save()
         return instance
+
+
+user_list_fragments = FragmentCache(UserSerializer, variant='list')
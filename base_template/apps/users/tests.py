@@ -1,3 +1,62 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
 
-# Create your tests here.
+from apps.common.testing import APITestCase
+from apps.departments.models import Department
+from apps.roles.models import Role
+
+User = get_user_model()
+
+
+class UserListFragmentTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+
+    def users(self):
+        response = self.client.get('/api/users/')
+        self.assertEqual(response.status_code, 200)
+        return {user['username']: user for user in response.json()}
+
+    def test_warm_list_reads_fragments(self):
+        self.users()
+        # Only (pk, updated_at) of every user; the payloads come from the fragment cache
+        with self.assertNumQueries(1):
+            self.users()
+
+    def test_user_save_refreshes_its_fragment(self):
+        self.users()
+        user = User.objects.get(username='viewer1')
+        user.first_name = 'Vera'
+        user.save()
+
+        self.assertEqual(self.users()['viewer1']['first_name'], 'Vera')
+
+    def test_role_change_refreshes_the_fragment(self):
+        self.users()
+        user = User.objects.get(username='viewer1')
+        user.roles.add(Role.objects.get(name='HR Staff'))
+
+        names = {role['name'] for role in self.users()['viewer1']['roles']}
+        self.assertEqual(names, {'Viewer', 'HR Staff'})
+
+    def test_role_department_rename_refreshes_its_users(self):
+        self.users()
+        sales = Department.objects.get(code='SALES')
+        sales.name = 'Sales & Marketing'
+        sales.save()
+
+        # manager_combo belongs to IT but holds the SALES-department role
+        departments = {role['department_name'] for role in self.users()['manager_combo']['roles']}
+        self.assertIn('Sales & Marketing', departments)
+
+
+class ProfileTests(APITestCase):
+    def test_profile(self):
+        self.login('multi_role')
+        response = self.client.get('/api/users/profile/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({role['name'] for role in response.json()['roles']}, {'IT Developer', 'HR Staff'})
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 401)
@@ -4,12 +4,17 @@ from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
+from django.db.models import Prefetch
+
+from apps.common.async_views import AsyncAPIView
+from apps.roles.models import Role
 
 from .serializers import (
     PublicSignupSerializer,
     UserProfileSerializer,
     UserRegistrationSerializer,
     UserSerializer,
+    user_list_fragments,
 )
 
 User = get_user_model()
@@ -54,19 +59,21 @@ class PublicSignupView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProfileView(APIView):
+class ProfileView(AsyncAPIView):
     """
     API for viewing logged-in user's profile.
     GET /api/users/profile/
     """
     permission_classes = [IsAuthenticated]
     
-    def get(self, request):
-        user = (
+    async def get(self, request):
+        # The serializer must not query lazily in async code: the roles'
+        # departments (department_name) are fetched with the roles
+        user = await (
             User.objects
             .select_related('department')
-            .prefetch_related('roles')
-            .get(pk=request.user.pk)
+            .prefetch_related(Prefetch('roles', queryset=Role.objects.select_related('department')))
+            .aget(pk=request.user.pk)
         )
         serializer = UserSerializer(user)
         return Response(serializer.data)
@@ -95,9 +102,8 @@ class UserListView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        users = User.objects.select_related('department').prefetch_related('roles')  # Fixed: added 'users ='
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data)
+        users = User.objects.select_related('department').prefetch_related('roles__department')
+        return Response(user_list_fragments.serialize_list(users))
 
 
 class UserDetailView(APIView):
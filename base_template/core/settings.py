@@ -57,6 +57,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'apps.common.middleware.RequestMetricsMiddleware',
+    'apps.common.middleware.ProfilingMiddleware',
+    'apps.common.db_router.ReplicaMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -103,6 +106,97 @@ DATABASES = {
     # }
 }
 
+# Optional read replicas, comma-separated URLs → aliases replica_1, replica_2, ...
+# Safe requests read from a replica; see apps.common.db_router for pinning
+# after writes and the lag fallback. Tests mirror them onto 'default'.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+for _index, _url in enumerate(DATABASE_REPLICA_URLS, 1):
+    DATABASES[f'replica_{_index}'] = {
+        **dj_database_url.parse(_url, conn_max_age=600),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Optional psycopg 3 connection pool per worker process (PostgreSQL only),
+# replacing persistent connections. Connections are health-checked when they
+# are handed out, so one killed by a failover is replaced instead of failing
+# the request. Pool stats are exported at /api/metrics/ (db_pool_*).
+DATABASE_POOL = os.environ.get('DATABASE_POOL', 'False') == 'True'
+if DATABASE_POOL:
+    for _db in DATABASES.values():
+        if _db.get('ENGINE') == 'django.db.backends.postgresql':
+            _db['CONN_MAX_AGE'] = 0
+            _db['CONN_HEALTH_CHECKS'] = True
+            _db.setdefault('OPTIONS', {})['pool'] = {
+                'min_size': int(os.environ.get('DATABASE_POOL_MIN_SIZE', 1)),
+                'max_size': int(os.environ.get('DATABASE_POOL_MAX_SIZE', 4)),
+                'timeout': float(os.environ.get('DATABASE_POOL_TIMEOUT', 10)),       # wait for a free connection
+                'max_idle': float(os.environ.get('DATABASE_POOL_MAX_IDLE', 300)),    # close idle extras after
+                'max_lifetime': float(os.environ.get('DATABASE_POOL_MAX_LIFETIME', 1800)),
+            }
+
+DATABASE_ROUTERS = ['apps.common.db_router.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 10))
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_LAG_CHECK_SECONDS = float(os.environ.get('REPLICA_LAG_CHECK_SECONDS', 1))
+
+# Comma-separated check ids, e.g. common.E002 to try replicas with a single
+# runserver process and no shared cache
+SILENCED_SYSTEM_CHECKS = [check.strip() for check in os.environ.get('SILENCED_SYSTEM_CHECKS', '').split(',') if check.strip()]
+
+# Menu, dashboard and module-matrix payloads are cached under their table
+# versions; one caller recomputes a missing value while the others wait
+# (see apps.common.single_flight)
+SINGLE_FLIGHT_TIMEOUT = int(os.environ.get('SINGLE_FLIGHT_TIMEOUT', 300))
+SINGLE_FLIGHT_LEASE_SECONDS = float(os.environ.get('SINGLE_FLIGHT_LEASE_SECONDS', 10))
+SINGLE_FLIGHT_POLL_SECONDS = float(os.environ.get('SINGLE_FLIGHT_POLL_SECONDS', 0.02))
+
+# Each worker keeps an immutable snapshot of modules and their permissions;
+# callers without fresh table versions re-check it at most this often
+# (see apps.modules.snapshot)
+CATALOG_SNAPSHOT_CHECK_SECONDS = float(os.environ.get('CATALOG_SNAPSHOT_CHECK_SECONDS', 1))
+
+
+# Caches
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+# LocMemCache is per process and evicts least-recently-used entries once
+# MAX_ENTRIES is reached; fine for runserver and a single worker. With
+# several workers set CACHE_URL (redis://host:6379/0) so invalidations
+# reach every worker; `check --deploy` warns without it (apps.common.checks).
+
+CACHE_URL = os.environ.get('CACHE_URL')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'default',
+        },
+        # Per-object serialized fragments (see apps.common.fragment_cache)
+        'fragments': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            'KEY_PREFIX': 'fragments',
+            'TIMEOUT': int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', 60 * 60)),
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'default',
+        },
+        # Per-object serialized fragments (see apps.common.fragment_cache)
+        'fragments': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'fragments',
+            'TIMEOUT': int(os.environ.get('FRAGMENT_CACHE_TIMEOUT', 60 * 60)),
+            'OPTIONS': {
+                'MAX_ENTRIES': int(os.environ.get('FRAGMENT_CACHE_MAX_ENTRIES', 50000)),
+            },
+        },
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -155,6 +249,17 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# Maximum number of sub-requests accepted by POST /api/batch/
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+
+# GET /api/sync/: change-log entries per page, and how many days
+# `manage.py prune_change_log` keeps (clients away longer get a full resync)
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 1000))
+SYNC_RETENTION_DAYS = int(os.environ.get('SYNC_RETENTION_DAYS', 30))
+
+# Declarative module/permission catalog applied by `manage.py sync_permissions`
+PERMISSION_CATALOG = Path(os.environ.get('PERMISSION_CATALOG', BASE_DIR / 'permission_catalog.json'))
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'Base Template API',
     'DESCRIPTION': 'API documentation for the Base Template Django backend.',
@@ -162,6 +267,33 @@ SPECTACULAR_SETTINGS = {
     'SERVE_INCLUDE_SCHEMA': False,
 }
 
+# Request metrics served at /api/metrics/ (apps.common.middleware.RequestMetricsMiddleware).
+# A sampled share of requests is checked for N+1 patterns: the same query
+# shape repeated METRICS_N_PLUS_ONE_THRESHOLD times or more is logged.
+# METRICS_TOKEN lets a scraper authenticate with a static bearer token.
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True') == 'True'
+METRICS_N_PLUS_ONE_SAMPLE_RATE = float(os.environ.get('METRICS_N_PLUS_ONE_SAMPLE_RATE', 1.0 if DEBUG else 0.05))
+METRICS_N_PLUS_ONE_THRESHOLD = int(os.environ.get('METRICS_N_PLUS_ONE_THRESHOLD', 10))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# On-demand request profiles (apps.common.profiling), listed at /admin/profiles/.
+# Only the newest PROFILING_MAX_PROFILES are kept on disk.
+PROFILING_DIR = Path(os.environ.get('PROFILING_DIR', BASE_DIR / 'profiles'))
+PROFILING_MAX_PROFILES = int(os.environ.get('PROFILING_MAX_PROFILES', 50))
+PROFILING_TOKEN_MAX_AGE = int(os.environ.get('PROFILING_TOKEN_MAX_AGE', 60 * 60))
+PROFILING_EXPLAIN_LIMIT = int(os.environ.get('PROFILING_EXPLAIN_LIMIT', 20))
+
+# Statements slower than SLOW_QUERY_THRESHOLD_MS are logged as JSON lines with
+# their call site and EXPLAIN plan (apps.common.slow_queries); 0 disables.
+# Summarize with `manage.py slow_queries`.
+SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 100))
+SLOW_QUERY_LOG = Path(os.environ.get('SLOW_QUERY_LOG', BASE_DIR / 'slow-queries.jsonl'))
+SLOW_QUERY_LOG_MAX_BYTES = int(os.environ.get('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024))
+SLOW_QUERY_LOG_BACKUPS = int(os.environ.get('SLOW_QUERY_LOG_BACKUPS', 3))
+
+# Precomputed schema served at /api/schema/ (manage.py build_openapi_schema)
+OPENAPI_SCHEMA_ARTIFACT = Path(os.environ.get('OPENAPI_SCHEMA_ARTIFACT', BASE_DIR / 'openapi-schema.json.gz'))
+
 # JWT Settings
 from datetime import timedelta
 
@@ -1,10 +1,15 @@
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
+from drf_spectacular.views import SpectacularRedocView, SpectacularSwaggerView
+
+from apps.common.admin import profile_urls
+from apps.common.views import CachedSchemaView
+from apps.modules.views import PermissionCheckView
 
 urlpatterns = [
+    path('admin/profiles/', include(profile_urls)),
     path('admin/', admin.site.urls),
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    path('api/schema/', CachedSchemaView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
     path('api/redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
     path('api/users/', include('apps.users.urls')),
@@ -12,4 +17,6 @@ urlpatterns = [
     path('api/departments/', include('apps.departments.urls')),
     path('api/modules/', include('apps.modules.urls')),
     path('api/dashboard/', include('apps.dashboard.urls')),
+    path('api/permissions/check/', PermissionCheckView.as_view(), name='permission-check'),
+    path('api/', include('apps.common.urls')),
 ]
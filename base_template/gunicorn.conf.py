@@ -0,0 +1,17 @@
+"""
+Gunicorn settings, picked up from the working directory (Procfile: ``web: gunicorn``).
+
+ASGI=True serves core.asgi with uvicorn workers instead of core.wsgi, so the
+async views (apps.common.async_views) wait on the database without holding a
+worker thread. It also turns on the connection pool (DATABASE_POOL): under
+ASGI every request runs in a new context, so persistent connections are
+never reused and each request would otherwise open its own.
+"""
+import os
+
+if os.environ.get('ASGI', 'False') == 'True':
+    wsgi_app = 'core.asgi:application'
+    worker_class = 'uvicorn_worker.UvicornWorker'
+    os.environ.setdefault('DATABASE_POOL', 'True')
+else:
+    wsgi_app = 'core.wsgi:application'
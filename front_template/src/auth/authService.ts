@@ -1,5 +1,5 @@
 import api from '../api/axios';
-import type { LoginCredentials, AuthTokens, AuthResponse, RegisterData, User, MenuItem } from '../types';
+import type { LoginCredentials, AuthTokens, AuthResponse, RegisterData, User, MenuItem, BootstrapResponse } from '../types';
 
 const authService = {
   // Login user
@@ -38,6 +38,14 @@ const authService = {
     return response.data;
   },
 
+  // Get profile, menu, permissions and lookup tables in one request
+  getBootstrap: async (platform: 'web' | 'mobile' = 'web'): Promise<BootstrapResponse> => {
+    const response = await api.get<BootstrapResponse>('/bootstrap/', {
+      params: { platform },
+    });
+    return response.data;
+  },
+
   // Logout user
   logout: (): void => {
     localStorage.removeItem('access_token');
@@ -1,4 +1,5 @@
 import useAuthStore from '../store/authStore';
+import type { MenuItem } from '../types';
 
 interface UsePermissionsReturn {
   permissions: string[];
@@ -12,28 +13,30 @@ interface UsePermissionsReturn {
   canDelete: boolean;
 }
 
-const usePermissions = (path: string): UsePermissionsReturn => {
-  const { menu } = useAuthStore();
-
-  // Find the module by path (check both parent and children)
-  let permissions: string[] = [];
+// path → permissions, built once per menu (menus can be nested to any depth)
+const pathIndexes = new WeakMap<MenuItem[], Map<string, string[]>>();
 
-  for (const item of menu) {
-    // Check parent module
-    if (item.path === path) {
-      permissions = item.permissions;
-      break;
-    }
-
-    // Check children
-    if (item.children) {
-      const child = item.children.find((c) => c.path === path);
-      if (child) {
-        permissions = child.permissions;
-        break;
+const getPathIndex = (menu: MenuItem[]): Map<string, string[]> => {
+  let index = pathIndexes.get(menu);
+  if (!index) {
+    const built = new Map<string, string[]>();
+    const add = (items: MenuItem[]) => {
+      for (const item of items) {
+        if (!built.has(item.path)) built.set(item.path, item.permissions);
+        if (item.children) add(item.children);
       }
-    }
+    };
+    add(menu);
+    pathIndexes.set(menu, built);
+    index = built;
   }
+  return index;
+};
+
+const usePermissions = (path: string): UsePermissionsReturn => {
+  const { menu } = useAuthStore();
+
+  const permissions: string[] = getPathIndex(menu).get(path) ?? [];
 
   // Helper functions
   const hasPermission = (permission: string): boolean => {
@@ -28,8 +28,7 @@ const useAuthStore = create<AuthState>((set) => ({
     set({ isLoading: true, error: null });
     try {
       await authService.login({ username, password });
-      const user = await authService.getProfile();
-      const menu = await authService.getMyMenu('web');
+      const { profile: user, menu } = await authService.getBootstrap('web');
       set({ user, menu, isAuthenticated: true, isLoading: false });
     } catch (error: any) {
       const message = error.response?.data?.detail || 'Login failed';
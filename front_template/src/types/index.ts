@@ -13,6 +13,15 @@ export interface User {
   date_joined: string;
 }
 
+// Post-login bootstrap payload (GET /api/bootstrap/)
+export interface BootstrapResponse {
+  profile: User;
+  menu: MenuItem[];
+  permissions: Record<string, string[]>;
+  roles: Role[];
+  departments: Department[];
+}
+
 // Role types
 export interface Role {
   id: number;